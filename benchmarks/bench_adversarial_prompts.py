@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Measure prompt analysis latency on adversarial prompts
+
+Feeds pathological prompts (megabyte-sized, one giant token, repeated near
+matches of gap keywords, unique typo near-misses that defeat the token
+cache) to analyze_prompt and reports the uncached latency of each, plus the
+growth factor when the prompt size quadruples: about 4 for linear work, 16
+for quadratic. With --budget-ms the run fails when any prompt of the
+hardened size limit takes longer than the budget.
+
+Usage: python benchmarks/bench_adversarial_prompts.py [--size BYTES] [--budget-ms MS]
+"""
+
+import argparse
+import logging
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.playbook_generator import PlaybookGenerator  # noqa: E402
+from src.prompt_analyzer import HARDENED_MAX_PROMPT_LENGTH, TYPE_KEYWORDS  # noqa: E402
+
+
+def _repeat(unit: str, size: int) -> str:
+    return (unit * (size // len(unit) + 1))[:size]
+
+
+def _unique_words(size: int, word, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    parts, length = [], 0
+    while length < size:
+        parts.append(word(rng))
+        length += len(parts[-1]) + 1
+    return " ".join(parts)[:size]
+
+
+def _near_miss(rng: random.Random) -> str:
+    keyword = rng.choice([k for keywords in TYPE_KEYWORDS.values() for k in keywords if len(k) >= 6])
+    pos = rng.randrange(len(keyword))
+    return keyword[:pos] + rng.choice(string.ascii_lowercase) + keyword[pos:]
+
+
+ADVERSARIAL = {
+    "giant token": lambda n: _repeat("a", n),
+    "giant substring bait": lambda n: _repeat("devproductionstaging", n),
+    "gap near-matches": lambda n: _repeat("load-balan high_availabilit auto-sca ", n),
+    "gap pairs": lambda n: _repeat("load load high high ", n),
+    "separators": lambda n: _repeat("-.\n/ ", n),
+    "unicode": lambda n: _repeat("\u0130\xe9\xdf ", n),
+    "secret-like": lambda n: "password: " + _repeat(" ", n - 10),
+    "unique typos": lambda n: _unique_words(n, _near_miss),
+    "unique random": lambda n: _unique_words(
+        n, lambda rng: "".join(rng.choices(string.ascii_lowercase, k=rng.randint(6, 14)))
+    ),
+}
+
+
+def latency(size: int, build) -> float:
+    """Uncached seconds for analyze_prompt on a fresh generator"""
+    prompt = build(size)
+    generator = PlaybookGenerator(use_cache=False)
+    start = time.perf_counter()
+    generator.analyze_prompt(prompt)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=1 << 20, help="largest prompt size in characters")
+    parser.add_argument("--budget-ms", type=float, help="latency budget at the hardened size limit")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    limit = HARDENED_MAX_PROMPT_LENGTH
+    print(f"{'prompt':<22}{limit // 1024:>8} KiB{args.size // 1024:>10} KiB{'growth x4':>11}")
+    over_budget = []
+    for name, build in ADVERSARIAL.items():
+        at_limit = latency(limit, build)
+        quarter = latency(args.size // 4, build)
+        full = latency(args.size, build)
+        print(f"{name:<22}{at_limit * 1000:9.1f} ms{full * 1000:11.1f} ms{full / quarter:10.1f}x")
+        if args.budget_ms is not None and at_limit * 1000 > args.budget_ms:
+            over_budget.append(name)
+
+    if over_budget:
+        sys.exit(f"Over the {args.budget_ms} ms budget: {', '.join(over_budget)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Measure generate_many() throughput as the number of worker processes grows
+
+Usage: python benchmarks/bench_batch.py [--contexts N] [--workers 1,2,4,8]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.playbook_generator import (  # noqa: E402
+    ENHANCED_REQUIREMENTS,
+    PlaybookContext,
+    PlaybookGenerator,
+)
+
+
+def make_contexts(generator: PlaybookGenerator, count: int):
+    """Distinct contexts so deduplication does not hide the fan-out cost"""
+    types = list(generator.parsed_templates) + [None]
+    return [
+        PlaybookContext(
+            prompt=f"service {i}",
+            playbook_type=types[i % len(types)],
+            target_hosts=f"service-{i}",
+            requirements=[ENHANCED_REQUIREMENTS[i % len(ENHANCED_REQUIREMENTS)]],
+        )
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--contexts", type=int, default=10000)
+    parser.add_argument(
+        "--workers",
+        default=",".join(str(n) for n in (1, 2, 4, 8) if n <= (os.cpu_count() or 1)),
+        help="comma-separated worker counts",
+    )
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    generator = PlaybookGenerator(use_cache=False)
+    contexts = make_contexts(generator, args.contexts)
+    print(f"{args.contexts} contexts on {os.cpu_count()} CPUs")
+
+    baseline = None
+    for workers in (int(n) for n in args.workers.split(",")):
+        start = time.perf_counter()
+        results = generator.generate_many(contexts, workers=workers)
+        elapsed = time.perf_counter() - start
+        assert all(r.ok for r in results)
+
+        rate = len(contexts) / elapsed
+        baseline = baseline or rate
+        print(
+            f"workers={workers:<3} {elapsed:7.2f} s  {rate:9.0f} playbooks/s  "
+            f"scaling {rate / baseline:4.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Measure PlaybookLinter on a warm process against linting in a subprocess
+
+Lints each shipped template in-process, where rules and modules are already
+loaded, and the same files through one `python -m src.playbook_lint` process
+per file, which is what shelling out to a linter costs. ansible-lint is timed
+the same way when it is on PATH.
+
+Usage: python benchmarks/bench_lint.py [--repeat N]
+"""
+
+import argparse
+import logging
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.playbook_lint import PlaybookLinter  # noqa: E402
+
+
+def best_of(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    paths = sorted(str(path) for path in (ROOT / "templates").glob("*.yml"))
+    linter = PlaybookLinter()
+    for path in paths:
+        linter.lint_file(path)
+
+    print(f"{'file':<16} {'warm (ms)':>10} {'subprocess (ms)':>16} {'ansible-lint (ms)':>18}")
+    ansible_lint = shutil.which("ansible-lint")
+    for path in paths:
+        warm = best_of(lambda: linter.lint_file(path), args.repeat * 20)
+        cold = best_of(
+            lambda: subprocess.run(
+                [sys.executable, "-m", "src.playbook_lint", path], cwd=ROOT, capture_output=True
+            ),
+            args.repeat,
+        )
+        external = "not installed"
+        if ansible_lint:
+            seconds = best_of(
+                lambda: subprocess.run([ansible_lint, "--offline", path], cwd=ROOT, capture_output=True),
+                args.repeat,
+            )
+            external = f"{seconds * 1000:.0f}"
+        print(f"{Path(path).name:<16} {warm * 1000:>10.2f} {cold * 1000:>16.0f} {external:>18}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Compare YAML, fast YAML and JSON serialization cost for each built-in template
+
+Usage: python benchmarks/bench_output_formats.py [--number N]
+"""
+
+import argparse
+import logging
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src import yaml_backend  # noqa: E402
+from src.playbook_generator import (  # noqa: E402
+    ENHANCED_REQUIREMENTS,
+    OutputFormat,
+    PlaybookContext,
+    PlaybookGenerator,
+)
+
+
+def bench(func, number: int) -> float:
+    """Best-of-five time per call in microseconds"""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=200, help="calls per sample")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    generator = PlaybookGenerator(use_cache=False)
+    serialize = generator._serialize
+    print(f"YAML backend: {yaml_backend.active_backend()}")
+
+    header = (
+        f"{'template':<12} {'yaml µs':>9} {'fast µs':>9} {'json µs':>9} "
+        f"{'fast x':>7} {'json x':>7}"
+    )
+    print(header)
+    print("-" * len(header))
+
+    for playbook_type in generator.parsed_templates:
+        context = PlaybookContext(
+            prompt="bench",
+            playbook_type=playbook_type,
+            requirements=list(ENHANCED_REQUIREMENTS),
+        )
+        data = generator._build_playbook(context)
+        yaml_us = bench(lambda: serialize(data, OutputFormat.YAML), args.number)
+        fast_us = bench(lambda: serialize(data, OutputFormat.FAST_YAML), args.number)
+        json_us = bench(lambda: serialize(data, OutputFormat.JSON), args.number)
+        print(
+            f"{playbook_type.value:<12} {yaml_us:>9.1f} {fast_us:>9.1f} "
+            f"{json_us:>9.1f} {yaml_us / fast_us:>6.1f}x {yaml_us / json_us:>6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Measure the warm-up table: startup cost, resident memory and per-call latency
+
+Usage: python benchmarks/bench_precompute.py [--number N]
+"""
+
+import argparse
+import itertools
+import logging
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.playbook_generator import (  # noqa: E402
+    ENHANCED_REQUIREMENTS,
+    PlaybookContext,
+    PlaybookGenerator,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=200, help="calls per sample")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    pipeline = PlaybookGenerator(use_cache=False)
+    table = PlaybookGenerator(use_cache=False, precompute=True)
+    report = table.precompute_report
+
+    print(f"entries:        {report['entries']}")
+    print(f"startup cost:   {report['build_seconds'] * 1000:.1f} ms")
+    print(f"table memory:   {report['memory_bytes'] / 1024:.1f} KiB")
+
+    contexts = [
+        PlaybookContext(prompt="bench", playbook_type=t, requirements=list(reqs))
+        for t in pipeline.parsed_templates
+        for reqs in itertools.combinations(ENHANCED_REQUIREMENTS, 2)
+    ]
+
+    def run(generator):
+        for context in contexts:
+            generator.generate(context)
+
+    for name, generator in (("pipeline", pipeline), ("table", table)):
+        seconds = min(timeit.repeat(lambda: run(generator), number=args.number // 10 or 1, repeat=3))
+        per_call = seconds / ((args.number // 10 or 1) * len(contexts)) * 1e6
+        print(f"{name + ':':<15} {per_call:.1f} µs per generate()")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Measure prompt analysis throughput for log replay
+
+Compares analyze_prompt() one prompt at a time with the batched
+analyze_prompts() on synthetic request logs, both with realistic repetition
+and with every prompt unique.
+
+Usage: python benchmarks/bench_prompt_analysis.py [--prompts N] [--chunk-size N]
+"""
+
+import argparse
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.playbook_generator import PlaybookGenerator  # noqa: E402
+
+TEMPLATES = [
+    "Deploy a {stack} application with {extra} in {env}",
+    "Install and configure {stack} on the {env} cluster",
+    "Set up {extra} for our {stack} servers with backup and monitoring",
+    "Harden ssh and the firewall on {env} {stack} hosts",
+    "Create a highly available {stack} setup behind a load balancer",
+]
+STACKS = ["kubernetes", "docker", "postgres", "redis", "nginx", "prometheus", "mysql"]
+EXTRAS = ["grafana dashboards", "tls certificates", "disaster recovery", "auto-scaling", "metrics"]
+ENVIRONMENTS = ["production", "staging", "development", "dev"]
+
+
+def synthetic_log(count: int, unique: bool, seed: int = 0):
+    """Generate ``count`` prompts, optionally made unique by a request id"""
+    rng = random.Random(seed)
+    for idx in range(count):
+        prompt = rng.choice(TEMPLATES).format(
+            stack=rng.choice(STACKS), extra=rng.choice(EXTRAS), env=rng.choice(ENVIRONMENTS)
+        )
+        yield f"{prompt} (request {idx})" if unique else prompt
+
+
+def rate(count: int, seconds: float) -> str:
+    return f"{count / seconds * 60 / 1e6:6.2f}M prompts/min"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--prompts", type=int, default=200_000, help="prompts per run")
+    parser.add_argument("--chunk-size", type=int, default=65536, help="batch chunk size")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    for unique in (False, True):
+        label = "unique prompts" if unique else "repeated prompts"
+        prompts = list(synthetic_log(args.prompts, unique))
+
+        generator = PlaybookGenerator(use_cache=False)
+        start = time.perf_counter()
+        for prompt in prompts:
+            generator.analyze_prompt(prompt)
+        single = time.perf_counter() - start
+
+        generator = PlaybookGenerator(use_cache=False)
+        start = time.perf_counter()
+        for _ in generator.analyze_prompts(prompts, chunk_size=args.chunk_size):
+            pass
+        batched = time.perf_counter() - start
+
+        print(f"{label}:")
+        print(f"  analyze_prompt   {rate(len(prompts), single)}")
+        print(f"  analyze_prompts  {rate(len(prompts), batched)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Measure template retrieval against a large template catalogue
+
+Builds the TF-IDF index over a synthetic catalogue derived from the shipped
+templates, then reports build time, JSON size and load time, and the
+uncached top-k query latency for generated prompts.
+
+Usage: python benchmarks/bench_template_index.py [--templates N] [--queries N] [--k N]
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.playbook_generator import PlaybookGenerator  # noqa: E402
+from src.template_index import TemplateIndex  # noqa: E402
+
+SERVICES = [
+    "nginx", "apache", "haproxy", "postgres", "mysql", "redis", "mongodb", "kafka",
+    "rabbitmq", "elasticsearch", "grafana", "prometheus", "vault", "consul", "jenkins",
+    "gitlab", "minio", "memcached", "traefik", "keycloak", "zookeeper", "cassandra",
+]
+VERBS = ["install", "configure", "upgrade", "backup", "harden", "monitor", "deploy", "restart"]
+
+
+def catalogue(count: int, seed: int = 0):
+    """``count`` templates: shipped templates renamed around random services"""
+    rng = random.Random(seed)
+    shipped = list(PlaybookGenerator(use_cache=False).parsed_templates.items())
+    templates = {}
+    for idx in range(count):
+        playbook_type, template = shipped[idx % len(shipped)]
+        service = rng.choice(SERVICES)
+        play = dict(template[0])
+        play["name"] = f"{service} {playbook_type.value} playbook {idx}"
+        play["tasks"] = list(play.get("tasks", ())) + [
+            {"name": f"{rng.choice(VERBS)} {service}", "package": {"name": service}, "tags": [service]}
+            for _ in range(rng.randint(1, 4))
+        ]
+        templates[f"{service}-{playbook_type.value}-{idx}"] = [play]
+    return templates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--templates", type=int, default=500, help="templates in the catalogue")
+    parser.add_argument("--queries", type=int, default=2000, help="prompts to retrieve for")
+    parser.add_argument("--k", type=int, default=3, help="templates retrieved per prompt")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    templates = catalogue(args.templates)
+    start = time.perf_counter()
+    index = TemplateIndex.build(templates)
+    build = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index.json")
+        index.save(path)
+        size = os.path.getsize(path)
+        start = time.perf_counter()
+        index = TemplateIndex.load(path)
+        load = time.perf_counter() - start
+
+    rng = random.Random(1)
+    prompts = [
+        f"{rng.choice(VERBS)} {rng.choice(SERVICES)} with {rng.choice(SERVICES)} on the production cluster"
+        for _ in range(args.queries)
+    ]
+    times = []
+    for prompt in prompts:
+        start = time.perf_counter()
+        index._query_uncached(prompt, args.k)
+        times.append(time.perf_counter() - start)
+    times.sort()
+
+    print(f"templates: {len(index)}, terms: {len(index.postings)}")
+    print(f"build {build * 1000:8.1f} ms   file {size / 1024:8.1f} KiB   load {load * 1000:8.1f} ms")
+    print(
+        f"query p50 {times[len(times) // 2] * 1e6:7.1f} us   "
+        f"p99 {times[int(len(times) * 0.99)] * 1e6:7.1f} us   max {times[-1] * 1e6:7.1f} us"
+    )
+
+
+if __name__ == "__main__":
+    main()
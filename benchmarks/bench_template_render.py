@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Measure the cost of pre-rendering context values into templates
+
+Times the first render of each shipped template (Jinja parse and compile of
+every expression), a cached render with the same values, and a render with
+new values whose expressions are already compiled. With --bytecode-cache the
+compiled expressions are also persisted to a directory.
+
+Usage: python benchmarks/bench_template_render.py [--repeat N] [--bytecode-cache DIR]
+"""
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.playbook_generator import PlaybookGenerator, PlaybookType  # noqa: E402
+from src.template_render import TemplateRenderer  # noqa: E402
+
+
+def microseconds(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=10_000, help="renders per measurement")
+    parser.add_argument("--bytecode-cache", help="directory for compiled expression bytecode")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    generator = PlaybookGenerator(use_cache=False)
+    renderer = TemplateRenderer(args.bytecode_cache)
+    values = {"target_hosts": "web", "environment": "staging", "application_name": "shop"}
+
+    print(f"{'template':<12} {'vars':>5} {'first ms':>9} {'cached us':>10} {'new values us':>14}")
+    for playbook_type in PlaybookType:
+        template = generator.parsed_templates.get(playbook_type)
+        if template is None:
+            continue
+        start = time.perf_counter()
+        renderer.render(template, values)
+        first = (time.perf_counter() - start) * 1000
+        cached = microseconds(lambda: renderer.render(template, values), args.repeat)
+
+        counter = iter(range(1 << 30))
+        fresh = microseconds(
+            lambda: renderer.render(template, {**values, "target_hosts": f"h{next(counter)}"}),
+            max(1, args.repeat // 10),
+        )
+        print(
+            f"{playbook_type.value:<12} {len(renderer.variables(template)):>5} "
+            f"{first:>9.2f} {cached:>10.1f} {fresh:>14.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Measure cold start and memory against the size of the template catalogue
+
+Fills a temporary template directory with copies of the shipped templates,
+then reports the generator's start-up time and retained memory, the cost of
+the first and later requests for one template, and the memory after every
+template has been loaded. Finally times a hot reload of an edited file.
+
+Usage: python benchmarks/bench_template_store.py [--templates N]
+"""
+
+import argparse
+import gc
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.playbook_generator import PlaybookContext, PlaybookGenerator, PlaybookType  # noqa: E402
+from src.template_store import DEFAULT_TEMPLATE_DIR  # noqa: E402
+
+
+def fill(directory: str, count: int) -> None:
+    """Shipped templates plus ``count`` renamed copies"""
+    shipped = sorted(DEFAULT_TEMPLATE_DIR.glob("*.yml"))
+    for path in shipped:
+        shutil.copy(path, directory)
+    for idx in range(count):
+        shutil.copy(shipped[idx % len(shipped)], os.path.join(directory, f"custom-{idx:04d}.yml"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--templates", type=int, default=500, help="extra templates in the catalogue")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as directory:
+        fill(directory, args.templates)
+        context = PlaybookContext(prompt="x", playbook_type=PlaybookType.DOCKER)
+
+        gc.collect()
+        tracemalloc.start()
+        start = time.perf_counter()
+        generator = PlaybookGenerator(use_cache=False, template_dir=directory)
+        cold = time.perf_counter() - start
+        cold_memory = tracemalloc.get_traced_memory()[0]
+
+        start = time.perf_counter()
+        generator.generate(context)
+        first = time.perf_counter() - start
+        start = time.perf_counter()
+        generator.generate(context)
+        warm = time.perf_counter() - start
+        one_memory = tracemalloc.get_traced_memory()[0]
+
+        start = time.perf_counter()
+        store = generator.template_store
+        for name in store:
+            store.get(name)
+        load_all = time.perf_counter() - start
+        all_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        path = Path(directory) / "docker.yml"
+        path.write_text(path.read_text().replace("Docker Environment Setup", "Edited"))
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        start = time.perf_counter()
+        generator.reload_templates()
+        reloaded = generator.generate(context)
+        reload = time.perf_counter() - start
+        assert "Edited" in reloaded
+
+    print(f"catalogue: {len(store)} templates")
+    print(f"start-up          {cold * 1000:8.1f} ms   {cold_memory / 1024:8.1f} KiB")
+    print(f"first request     {first * 1000:8.1f} ms   {one_memory / 1024:8.1f} KiB")
+    print(f"next request      {warm * 1000:8.3f} ms")
+    print(f"load everything   {load_all * 1000:8.1f} ms   {all_memory / 1024:8.1f} KiB")
+    print(f"hot reload        {reload * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
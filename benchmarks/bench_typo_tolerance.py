@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Measure the worst-case cost of typo-tolerant prompt analysis
+
+Scans prompts with every cache cleared before each one, so each token goes
+through the typo index, and reports mean, p99 and maximum latency with and
+without typo tolerance. The adversarial prompts are made of near-miss words
+of the longest keyword length, which produce the most index lookups.
+
+Usage: python benchmarks/bench_typo_tolerance.py [--prompts N] [--words N]
+"""
+
+import argparse
+import logging
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.prompt_analyzer import TYPE_KEYWORDS, PromptAnalyzer  # noqa: E402
+
+KEYWORDS = [keyword for keywords in TYPE_KEYWORDS.values() for keyword in keywords if ".?" not in keyword]
+
+
+def near_miss(rng: random.Random, word: str) -> str:
+    """``word`` with one random edit"""
+    pos = rng.randrange(len(word))
+    letter = rng.choice(string.ascii_lowercase)
+    return rng.choice([
+        word[:pos] + word[pos + 1:],
+        word[:pos] + letter + word[pos:],
+        word[:pos] + letter + word[pos + 1:],
+    ])
+
+
+def prompts(kind: str, count: int, words: int, seed: int = 0):
+    rng = random.Random(seed)
+    longest = max(map(len, KEYWORDS)) + 2
+    for _ in range(count):
+        if kind == "typos":
+            tokens = [near_miss(rng, rng.choice(KEYWORDS)) for _ in range(words)]
+        elif kind == "random":
+            tokens = ["".join(rng.choices(string.ascii_lowercase, k=longest)) for _ in range(words)]
+        else:
+            tokens = [rng.choice(KEYWORDS) for _ in range(words)]
+        yield " ".join(tokens)
+
+
+def latencies(analyzer: PromptAnalyzer, batch):
+    result = []
+    for prompt in batch:
+        analyzer._match_token.cache_clear()
+        analyzer.scan.cache_clear()
+        analyzer.scan_masks.cache_clear()
+        start = time.perf_counter()
+        analyzer.scan(prompt)
+        result.append(time.perf_counter() - start)
+    return sorted(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--prompts", type=int, default=2000, help="prompts per run")
+    parser.add_argument("--words", type=int, default=50, help="words per prompt")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    analyzers = {"exact": PromptAnalyzer(typo_tolerance=False), "typo-tolerant": PromptAnalyzer(typo_tolerance=True)}
+    print(f"{'prompts':<10}{'analyzer':<16}{'mean':>10}{'p99':>10}{'max':>10}  (us, {args.words} words)")
+    for kind in ("exact", "typos", "random"):
+        batch = list(prompts(kind, args.prompts, args.words))
+        for label, analyzer in analyzers.items():
+            times = latencies(analyzer, batch)
+            mean = sum(times) / len(times)
+            p99 = times[int(len(times) * 0.99)]
+            print(f"{kind:<10}{label:<16}{mean * 1e6:10.1f}{p99 * 1e6:10.1f}{times[-1] * 1e6:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
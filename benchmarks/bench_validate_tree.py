@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Measure validate_tree() on a generated tree of playbooks, cold and cached
+
+Writes N generated playbooks into a temporary directory, then times a cold
+validation per worker count, a re-run over the unchanged tree and a re-run
+after touching a tenth of the files, against the time it takes just to
+walk and stat the tree.
+
+Usage: python benchmarks/bench_validate_tree.py [--files N] [--workers 1,2,4]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.playbook_generator import ENHANCED_REQUIREMENTS, PlaybookContext, PlaybookGenerator  # noqa: E402
+from src.tree_validator import _walk, validate_tree  # noqa: E402
+
+
+def fill(directory: str, count: int) -> None:
+    generator = PlaybookGenerator(use_cache=False)
+    types = list(generator.parsed_templates) + [None]
+    for idx in range(count):
+        context = PlaybookContext(
+            prompt=f"service {idx}",
+            playbook_type=types[idx % len(types)],
+            target_hosts=f"service-{idx}",
+            requirements=[ENHANCED_REQUIREMENTS[idx % len(ENHANCED_REQUIREMENTS)]],
+        )
+        subdir = os.path.join(directory, f"group{idx % 20:02d}")
+        os.makedirs(subdir, exist_ok=True)
+        with open(os.path.join(subdir, f"play{idx:05d}.yml"), "w", encoding="utf-8") as handle:
+            handle.write(generator.generate(context) + f"# {idx}\n")
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument(
+        "--workers",
+        default=",".join(str(n) for n in (1, 2, 4) if n <= (os.cpu_count() or 1)),
+        help="comma-separated worker counts",
+    )
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as directory:
+        fill(directory, args.files)
+        _, stat_seconds = timed(lambda: list(_walk(directory)))
+        print(f"{args.files} files, walk and stat: {stat_seconds * 1000:.1f} ms")
+
+        for workers in (int(n) for n in args.workers.split(",")):
+            cache = os.path.join(directory, f".cache-{workers}.json")
+            _, cold = timed(lambda: validate_tree(directory, workers=workers, cache_path=cache))
+            print(f"cold, {workers} worker(s): {cold * 1000:.0f} ms")
+
+        report, warm = timed(lambda: validate_tree(directory, cache_path=cache))
+        print(f"unchanged tree: {warm * 1000:.1f} ms ({sum(r.cached for r in report.files)} cached)")
+
+        for _, path, _ in list(_walk(directory))[::10]:
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        _, touched = timed(lambda: validate_tree(directory, cache_path=cache))
+        print(f"10% touched, same content: {touched * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark the libyaml and pure-Python YAML backends on each built-in template
+
+Usage: python benchmarks/bench_yaml_backend.py [--number N]
+"""
+
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src import yaml_backend  # noqa: E402
+from src.playbook_generator import PlaybookContext, PlaybookGenerator  # noqa: E402
+
+REQUIREMENTS = ["high_availability", "security", "monitoring", "backup"]
+
+
+def bench(func, number: int) -> float:
+    """Best-of-five time per call in microseconds"""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=200, help="calls per sample")
+    args = parser.parse_args()
+
+    if not yaml_backend.LIBYAML_AVAILABLE:
+        print("PyYAML was built without libyaml; only the Python backend is available")
+        return 1
+
+    python = yaml_backend.resolve_backend("python")
+    libyaml = yaml_backend.resolve_backend("libyaml")
+    generator = PlaybookGenerator()
+
+    header = f"{'template':<12} {'op':<5} {'python µs':>10} {'libyaml µs':>11} {'speedup':>8}"
+    print(header)
+    print("-" * len(header))
+
+    for playbook_type, source in generator.templates.items():
+        context = PlaybookContext(
+            prompt="bench", playbook_type=playbook_type, requirements=REQUIREMENTS
+        )
+        data = generator._enhance_with_requirements(
+            generator.parsed_templates[playbook_type], context
+        )
+        if python.dump(data) != libyaml.dump(data):
+            print(f"{playbook_type.value}: backends differ!")
+            return 1
+
+        for op, py_call, c_call in (
+            ("load", lambda: python.load(source), lambda: libyaml.load(source)),
+            ("dump", lambda: python.dump(data), lambda: libyaml.dump(data)),
+        ):
+            py_us = bench(py_call, args.number)
+            c_us = bench(c_call, args.number)
+            print(
+                f"{playbook_type.value:<12} {op:<5} {py_us:>10.1f} {c_us:>11.1f} "
+                f"{py_us / c_us:>7.1f}x"
+            )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
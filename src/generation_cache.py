@@ -0,0 +1,170 @@
+"""
+In-process cache for generated playbooks
+
+Entries are keyed by a canonical fingerprint of the PlaybookContext, bounded by
+entry count and total size, and optionally expire after a TTL.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Mapping, Optional, Tuple
+
+
+@dataclass
+class CacheStats:
+    """Counters describing cache effectiveness"""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+    entries: int = 0
+    bytes: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def canonical(value: Any) -> Any:
+    """JSON-serializable form of ``value`` that is independent of key order
+
+    Mapping keys are tagged with their type name, so ``{80: ...}`` and
+    ``{"80": ...}`` stay distinct, and sorted on a string form, so keys of
+    mixed types never have to be compared with each other.
+    """
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, Mapping):
+        items = sorted(
+            value.items(), key=lambda item: (type(item[0]).__name__, repr(item[0]))
+        )
+        return {
+            "map": [
+                [type(key).__name__, canonical(key), canonical(item)]
+                for key, item in items
+            ]
+        }
+    if isinstance(value, (list, tuple)):
+        return [canonical(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return {"set": sorted((canonical(item) for item in value), key=repr)}
+    return {"repr": f"{type(value).__name__}:{value!r}"}
+
+
+def canonical_json(value: Any) -> str:
+    """Compact JSON of canonical(value)"""
+    return json.dumps(canonical(value), separators=(",", ":"))
+
+
+def fingerprint(context: Any, **extra: Any) -> str:
+    """Return a canonical hash of the fields that determine a playbook
+
+    ``extra`` carries any additional inputs the generator depends on, such as
+    prompt-derived actions.
+    """
+    playbook_type = context.playbook_type
+    fields = {
+        "type": playbook_type.value if playbook_type is not None else None,
+        "target_hosts": context.target_hosts,
+        "environment": context.environment,
+        "variables": context.variables,
+        "requirements": list(context.requirements),
+        "tags": sorted(set(context.tags)),
+        "extra": extra,
+    }
+    encoded = canonical_json(fields)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """Thread-safe LRU cache of generated playbook text"""
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        max_bytes: int = 16 * 1024 * 1024,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[str, int, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value for key, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats.misses += 1
+                return None
+
+            value, size, stored_at = entry
+            if self.ttl is not None and self._clock() - stored_at > self.ttl:
+                self._remove(key)
+                self._stats.expirations += 1
+                self._stats.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return value
+
+    def put(self, key: str, value: str) -> None:
+        """Store a value, evicting least recently used entries as needed"""
+        size = len(value.encode("utf-8"))
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (value, size, self._clock())
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats.evictions += 1
+
+    def invalidate(self) -> int:
+        """Drop every entry, e.g. after templates change; returns the count"""
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+            self._stats.invalidations += 1
+            return count
+
+    @property
+    def stats(self) -> CacheStats:
+        """Snapshot of the cache counters"""
+        with self._lock:
+            return CacheStats(
+                hits=self._stats.hits,
+                misses=self._stats.misses,
+                evictions=self._stats.evictions,
+                expirations=self._stats.expirations,
+                invalidations=self._stats.invalidations,
+                entries=len(self._entries),
+                bytes=self._bytes,
+            )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: str) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
@@ -0,0 +1,117 @@
+"""
+Static check that a regular expression scans untrusted text in linear time
+
+Python's ``re`` is a backtracking engine: ``search``/``finditer`` retry the
+pattern at every start position and may backtrack within each attempt, so
+patterns such as ``(a+)+$`` or even ``\\w+x`` take polynomial or exponential
+time on crafted input. ``check_linear`` accepts a conservative subset whose
+scanning cost is linear in the text:
+
+- every element has a bounded width (literals, character classes, anchors,
+  ``{m,n}`` repeats and alternations of such elements), so an attempt that
+  fails costs a constant amount of work, except that
+- the final element may be an unbounded repeat of a single character
+  matcher (``\\w+``, ``[^\\s]{8,}``). It either stops after fewer than its
+  minimum count of characters, or succeeds and the scan resumes after the
+  characters it consumed.
+
+A bounded repeat that may run more than once must have a fixed-width body
+without alternation: ``(?:a|a){1,24}`` or ``(?:a|ab){1,500}`` are bounded
+but can split the text among their iterations in exponentially many ways.
+
+Backreferences, conditionals and lookarounds are rejected outright.
+"""
+
+import re
+from typing import Any, Union
+
+try:
+    import re._parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+# Widest bounded element accepted; wider ones are linear in theory but make
+# every failed attempt arbitrarily expensive
+MAX_BOUNDED_WIDTH = 1024
+
+_SINGLE_CHAR = {sre_parse.LITERAL, sre_parse.NOT_LITERAL, sre_parse.IN, sre_parse.ANY}
+_ZERO_WIDTH = {sre_parse.AT}
+_REPEATS = {sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT}
+
+
+class NonLinearPatternError(ValueError):
+    """Raised for patterns outside the verified linear-time subset"""
+
+
+def check_linear(pattern: Union[str, "re.Pattern"], flags: int = 0) -> None:
+    """Raise NonLinearPatternError unless ``pattern`` scans in linear time"""
+    if isinstance(pattern, re.Pattern):
+        pattern, flags = pattern.pattern, pattern.flags
+    _check_sequence(pattern, sre_parse.parse(pattern, flags), tail=True)
+
+
+def is_linear(pattern: Union[str, "re.Pattern"], flags: int = 0) -> bool:
+    try:
+        check_linear(pattern, flags)
+    except NonLinearPatternError:
+        return False
+    return True
+
+
+def _check_sequence(pattern: str, items: Any, tail: bool) -> None:
+    items = list(items)
+    for idx, (op, arg) in enumerate(items):
+        _check_item(pattern, op, arg, tail and idx == len(items) - 1)
+
+
+def _check_item(pattern: str, op: Any, arg: Any, tail: bool) -> None:
+    if op in _SINGLE_CHAR or op in _ZERO_WIDTH:
+        return
+    if op is sre_parse.SUBPATTERN:
+        _check_sequence(pattern, arg[-1], tail)
+        return
+    if op is sre_parse.BRANCH:
+        for branch in arg[1]:
+            _check_sequence(pattern, branch, tail)
+        return
+    if op in _REPEATS:
+        low, high, body = arg
+        if high is sre_parse.MAXREPEAT:
+            if not tail:
+                raise NonLinearPatternError(
+                    f"Unbounded repeat before the end of pattern {pattern!r}"
+                )
+            body = list(body)
+            if len(body) != 1 or body[0][0] not in _SINGLE_CHAR:
+                raise NonLinearPatternError(
+                    f"Unbounded repeat of more than one character in pattern {pattern!r}"
+                )
+            return
+        _check_sequence(pattern, body, tail=False)
+        if high > 1 and not _unambiguous(body):
+            raise NonLinearPatternError(
+                f"Repeat of a variable-width or alternating body in pattern {pattern!r}"
+            )
+        if body.getwidth()[1] * high > MAX_BOUNDED_WIDTH:
+            raise NonLinearPatternError(
+                f"Repeat wider than {MAX_BOUNDED_WIDTH} in pattern {pattern!r}"
+            )
+        return
+    raise NonLinearPatternError(f"Unsupported construct {op} in pattern {pattern!r}")
+
+
+def _unambiguous(body: Any) -> bool:
+    """Whether a repeat body has a fixed width and no alternation"""
+    low, high = body.getwidth()
+    return low == high and not _has_branch(body)
+
+
+def _has_branch(items: Any) -> bool:
+    for op, arg in items:
+        if op is sre_parse.BRANCH:
+            return True
+        if op is sre_parse.SUBPATTERN and _has_branch(arg[-1]):
+            return True
+        if op in _REPEATS and _has_branch(arg[2]):
+            return True
+    return False
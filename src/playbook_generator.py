@@ -4,13 +4,53 @@ AI-Powered Ansible Playbook Generator
 Integrates with LLMs to generate context-aware Ansible playbooks
 """
 
-import yaml
-import re
-from typing import Dict, List, Any, Optional
-from dataclasses import dataclass
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Any, Optional, Set, Tuple
+from dataclasses import dataclass, field, replace
 from enum import Enum
 import logging
 
+try:
+    from . import yaml_backend, yaml_emitter
+    from .generation_cache import GenerationCache, fingerprint
+    from .playbook_model import FrozenDict, Playbook, freeze, with_appended, with_item
+    from .playbook_validator import PlaybookValidator, ValidationResult
+    from .prompt_analyzer import PromptAnalyzer
+    from .prompt_batch import DEFAULT_CHUNK_SIZE, PromptBatch, analyze_prompts
+    from .prompt_scoring import TypeScorer
+    from .template_index import INDEX_ENV_VAR, TemplateIndex, template_terms
+    from .template_render import RENDER_AVAILABLE, TemplateRenderer, required_variables
+    from .template_store import (
+        DEFAULT_POLL_INTERVAL,
+        DEFAULT_TEMPLATE_DIR,
+        TemplateStore,
+    )
+    from .yaml_fragments import Fragment, SplicedPlay, splice_template
+except ImportError:  # executed directly as a script
+    import yaml_backend
+    import yaml_emitter
+    from generation_cache import GenerationCache, fingerprint
+    from playbook_model import FrozenDict, Playbook, freeze, with_appended, with_item
+    from playbook_validator import PlaybookValidator, ValidationResult
+    from prompt_analyzer import PromptAnalyzer
+    from prompt_batch import DEFAULT_CHUNK_SIZE, PromptBatch, analyze_prompts
+    from prompt_scoring import TypeScorer
+    from template_index import INDEX_ENV_VAR, TemplateIndex, template_terms
+    from template_render import RENDER_AVAILABLE, TemplateRenderer, required_variables
+    from template_store import (
+        DEFAULT_POLL_INTERVAL,
+        DEFAULT_TEMPLATE_DIR,
+        TemplateStore,
+    )
+    from yaml_fragments import Fragment, SplicedPlay, splice_template
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -28,6 +68,18 @@ class PlaybookType(Enum):
     CICD = "cicd"
 
 
+class OutputFormat(Enum):
+    """Serialization formats for generated playbooks"""
+
+    YAML = "yaml"
+    # JSON is a YAML subset that ansible-playbook reads directly; it is
+    # meant for machine consumers and skips PyYAML's emitter entirely
+    JSON = "json"
+    # Block YAML from the specialized emitter in yaml_emitter: loads to the
+    # same data as YAML but does not wrap long lines
+    FAST_YAML = "fast-yaml"
+
+
 @dataclass
 class PlaybookContext:
     """Context for playbook generation"""
@@ -39,6 +91,10 @@ class PlaybookContext:
     variables: Dict[str, Any] = None
     tags: List[str] = None
     requirements: List[str] = None
+    # Ranked (type, confidence) candidates; playbook_type is the first one
+    type_candidates: List[Tuple[PlaybookType, float]] = None
+    # Most similar templates as (template name, cosine similarity)
+    template_matches: List[Tuple[str, float]] = None
 
     def __post_init__(self):
         if self.variables is None:
@@ -47,145 +103,936 @@ class PlaybookContext:
             self.tags = []
         if self.requirements is None:
             self.requirements = []
+        if self.type_candidates is None:
+            self.type_candidates = []
+        if self.template_matches is None:
+            self.template_matches = []
+
+
+# Order in which requirements are reported and, in canonical mode, applied
+REQUIREMENT_ORDER = (
+    "high_availability",
+    "scalability",
+    "security",
+    "monitoring",
+    "backup",
+    "performance",
+)
+
+# Requirements that have an enhancer, in REQUIREMENT_ORDER. Bit i of a
+# requirement mask stands for ENHANCED_REQUIREMENTS[i].
+ENHANCED_REQUIREMENTS = ("high_availability", "security", "monitoring", "backup")
+
+PRECOMPUTE_ENV_VAR = "ANSIBLE_MCP_PRECOMPUTE"
+# Prompt size limit in characters; setting it enables hardened analysis
+MAX_PROMPT_LENGTH_ENV_VAR = "ANSIBLE_MCP_MAX_PROMPT_LENGTH"
+# Directory of <playbook type>.yml templates, watched for changes
+TEMPLATE_DIR_ENV_VAR = "ANSIBLE_MCP_TEMPLATE_DIR"
+# Fill known context values into template expressions before serializing
+PRERENDER_ENV_VAR = "ANSIBLE_MCP_PRERENDER"
+# Directory for compiled Jinja bytecode shared across processes
+JINJA_CACHE_ENV_VAR = "ANSIBLE_MCP_JINJA_CACHE_DIR"
+# Match misspelled type keywords in prompts without an exact one
+TYPO_TOLERANCE_ENV_VAR = "ANSIBLE_MCP_TYPO_TOLERANCE"
+
+# Splices of pre-rendered templates kept for reuse
+RENDERED_SPLICES = 256
+
+# Template variables always supplied by PlaybookContext fields
+CONTEXT_VARIABLES = ("target_hosts", "environment")
+
+# Templates retrieved into PlaybookContext.template_matches
+TEMPLATE_MATCHES = 3
+
+# Task blocks appended by the requirement enhancers. They are frozen once
+# and shared by every generated playbook.
+HA_TASKS = freeze(
+    [
+        {
+            "name": "Configure keepalived for HA",
+            "package": {"name": "keepalived", "state": "present"},
+            "tags": ["ha", "keepalived"],
+        },
+        {
+            "name": "Setup load balancer health checks",
+            "uri": {"url": "http://localhost/health", "status_code": 200},
+            "tags": ["ha", "healthcheck"],
+        },
+    ]
+)
+
+SECURITY_TASKS = freeze(
+    [
+        {
+            "name": "Configure firewall rules",
+            "firewalld": {
+                "service": "https",
+                "permanent": True,
+                "state": "enabled",
+            },
+            "tags": ["security", "firewall"],
+        },
+        {
+            "name": "Setup fail2ban",
+            "package": {"name": "fail2ban", "state": "present"},
+            "tags": ["security", "fail2ban"],
+        },
+        {
+            "name": "Configure SSH hardening",
+            "lineinfile": {
+                "path": "/etc/ssh/sshd_config",
+                "regexp": "^PermitRootLogin",
+                "line": "PermitRootLogin no",
+            },
+            "notify": "restart sshd",
+            "tags": ["security", "ssh"],
+        },
+    ]
+)
+
+SSHD_HANDLER = freeze(
+    {
+        "name": "restart sshd",
+        "service": {"name": "sshd", "state": "restarted"},
+    }
+)
+
+NODE_EXPORTER_URL = (
+    "https://github.com/prometheus/node_exporter/releases/download/"
+    "v1.5.0/node_exporter-1.5.0.linux-amd64.tar.gz"
+)
+
+MONITORING_TASKS = freeze(
+    [
+        {
+            "name": "Install node exporter",
+            "unarchive": {
+                "src": NODE_EXPORTER_URL,
+                "dest": "/opt",
+                "remote_src": True,
+            },
+            "tags": ["monitoring", "prometheus"],
+        },
+        {
+            "name": "Create systemd service for node exporter",
+            "systemd": {
+                "name": "node_exporter",
+                "state": "started",
+                "enabled": True,
+            },
+            "tags": ["monitoring", "prometheus"],
+        },
+    ]
+)
+
+BACKUP_TASKS = freeze(
+    [
+        {
+            "name": "Create backup directory",
+            "file": {"path": "/backup", "state": "directory", "mode": "0755"},
+            "tags": ["backup"],
+        },
+        {
+            "name": "Setup automated backup cron job",
+            "cron": {
+                "name": "Daily backup",
+                "hour": "2",
+                "minute": "0",
+                "job": "/usr/local/bin/backup.sh",
+            },
+            "tags": ["backup", "cron"],
+        },
+    ]
+)
+
+# What each enhancer appends, as (play key, items, unique) triples. The
+# blocks are serialized once for the text splicing fast path; unique blocks
+# are skipped when an item of the same name is already present.
+ENHANCER_BLOCKS = {
+    "high_availability": (("tasks", HA_TASKS, False),),
+    "security": (
+        ("tasks", SECURITY_TASKS, False),
+        ("handlers", (SSHD_HANDLER,), True),
+    ),
+    "monitoring": (("tasks", MONITORING_TASKS, False),),
+    "backup": (("tasks", BACKUP_TASKS, False),),
+}
+
+
+class MissingVariablesError(ValueError):
+    """Raised in strict mode when a template variable has no value"""
+
+    def __init__(self, playbook_type: "PlaybookType", missing: List[str]):
+        super().__init__(
+            f"Template {playbook_type.value} needs variables: {', '.join(missing)}"
+        )
+        self.missing = missing
+
+
+def _load_template(source: str) -> Any:
+    """Parse a template file, which must be a non-empty list of plays"""
+    data = yaml_backend.load(source)
+    if not isinstance(data, list) or not data:
+        raise ValueError("template is not a non-empty list of plays")
+    if not all(isinstance(play, dict) for play in data):
+        raise ValueError("template has a play that is not a mapping")
+    return data
+
+
+def _parse_template(source: str) -> Playbook:
+    """Parse a template file once into a frozen, shareable document"""
+    return freeze(_load_template(source))
+
+
+def _sort_keys(data: Any) -> Any:
+    """Recursively sort mapping keys for canonical output"""
+    if isinstance(data, dict):
+        return {key: _sort_keys(data[key]) for key in sorted(data, key=str)}
+    if isinstance(data, (list, tuple)):
+        return [_sort_keys(item) for item in data]
+    return data
+
+
+@dataclass
+class BatchResult:
+    """Outcome of one context in PlaybookGenerator.generate_many()"""
+
+    playbook: Optional[str] = None
+    error: Optional[str] = None
+    # Template variables the context left unresolved
+    missing_variables: List[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+# Generator used by batch worker processes, set by _init_batch_worker
+_batch_generator: Optional["PlaybookGenerator"] = None
+
+
+def _init_batch_worker(source: Any) -> None:
+    """Install the generator for a worker process
+
+    With the fork start method ``source`` is the parent's generator, so the
+    pre-loaded templates are shared copy-on-write; otherwise it holds the
+    constructor options and the worker loads its own templates.
+    """
+    global _batch_generator
+    if isinstance(source, PlaybookGenerator):
+        _batch_generator = source
+    else:
+        _batch_generator = PlaybookGenerator(**source)
+    # Contexts are deduplicated before fan-out, a per-worker cache never hits
+    _batch_generator.cache = None
+
+
+def _generate_batch_item(
+    context: "PlaybookContext", output_format: "OutputFormat"
+) -> BatchResult:
+    """Generate one playbook inside a worker, capturing any error"""
+    return _batch_generator._generate_one(context, output_format)
+
+
+def _dump_json(playbook_data: Any) -> str:
+    """Serialize a playbook as compact JSON"""
+    return json.dumps(playbook_data, separators=(",", ":"))
+
+
+def _dump_json_stream(plays: Iterable[Any]) -> Iterator[str]:
+    """Serialize plays as JSON one play header and list item at a time
+
+    The concatenated chunks equal ``_dump_json(list(plays))``.
+    """
+    encode = json.JSONEncoder(separators=(",", ":")).encode
+    yield "["
+    for play_index, play in enumerate(plays):
+        parts = ["," if play_index else "", "{"]
+        for key_index, (key, value) in enumerate(play.items()):
+            parts.append(("," if key_index else "") + encode(key) + ":")
+            if isinstance(value, (list, tuple)) and value:
+                parts.append("[")
+                yield "".join(parts)
+                for item_index, item in enumerate(value):
+                    yield ("," if item_index else "") + encode(item)
+                parts = ["]"]
+            else:
+                parts.append(encode(value))
+        parts.append("}")
+        yield "".join(parts)
+    yield "]"
 
 
 class PlaybookGenerator:
     """Main class for generating Ansible playbooks"""
 
-    def __init__(self):
-        self.templates = self._load_templates()
-        self.patterns = self._compile_patterns()
-
-    def _load_templates(self) -> Dict[PlaybookType, str]:
-        """Load playbook templates"""
-        return {
-            PlaybookType.KUBERNETES: self._kubernetes_template(),
-            PlaybookType.DOCKER: self._docker_template(),
-            PlaybookType.SYSTEM: self._system_template(),
-            PlaybookType.DATABASE: self._database_template(),
-            PlaybookType.MONITORING: self._monitoring_template(),
-            PlaybookType.SECURITY: self._security_template(),
+    def __init__(
+        self,
+        cache: Optional[GenerationCache] = None,
+        use_cache: bool = True,
+        canonical: bool = False,
+        precompute: Optional[bool] = None,
+        template_index_path: Optional[str] = None,
+        max_prompt_length: Optional[int] = None,
+        template_dir: Optional[str] = None,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        prerender: Optional[bool] = None,
+        bytecode_cache_dir: Optional[str] = None,
+        strict_variables: bool = False,
+        typo_tolerance: Optional[bool] = None,
+    ):
+        # Canonical mode guarantees byte-identical output for equivalent
+        # contexts: requirements are deduplicated and applied in
+        # REQUIREMENT_ORDER and variables are emitted with sorted keys
+        self.canonical = canonical
+        # Strict mode raises MissingVariablesError instead of only reporting
+        # unresolved template variables
+        self.strict_variables = strict_variables
+        # Templates are indexed here but only read and parsed on first use
+        if template_dir is None:
+            template_dir = os.environ.get(TEMPLATE_DIR_ENV_VAR, DEFAULT_TEMPLATE_DIR)
+        self.template_store = TemplateStore(
+            template_dir, _parse_template, poll_interval
+        )
+        self.templates = self.template_store.view(PlaybookType, sources=True)
+        self.parsed_templates = self.template_store.view(PlaybookType)
+        # Pre-rendering fills target_hosts, environment and context variables
+        # into template expressions; runtime facts are left to Ansible
+        if prerender is None:
+            prerender = os.environ.get(PRERENDER_ENV_VAR, "").lower() in (
+                "1",
+                "true",
+                "yes",
+            )
+        if bytecode_cache_dir is None:
+            bytecode_cache_dir = os.environ.get(JINJA_CACHE_ENV_VAR)
+        self.renderer: Optional[TemplateRenderer] = None
+        if prerender and not RENDER_AVAILABLE:
+            logger.warning(
+                "Jinja2 is not installed, template pre-rendering is disabled"
+            )
+        elif prerender:
+            self.renderer = TemplateRenderer(bytecode_cache_dir)
+        self._prepare_fragments()
+        # Hardened mode: prompts from untrusted clients over this many
+        # characters are rejected with PromptTooLargeError
+        if max_prompt_length is None and os.environ.get(MAX_PROMPT_LENGTH_ENV_VAR):
+            max_prompt_length = int(os.environ[MAX_PROMPT_LENGTH_ENV_VAR])
+        if typo_tolerance is None:
+            typo_tolerance = os.environ.get(TYPO_TOLERANCE_ENV_VAR, "").lower() in (
+                "1",
+                "true",
+                "yes",
+            )
+        self.analyzer = PromptAnalyzer(
+            max_prompt_length=max_prompt_length, typo_tolerance=typo_tolerance
+        )
+        self.scorer = TypeScorer(self.analyzer)
+        self.validator = PlaybookValidator()
+        if template_index_path is None:
+            template_index_path = os.environ.get(INDEX_ENV_VAR)
+        self._template_index_path = template_index_path
+        self._template_index: Optional[TemplateIndex] = None
+        if cache is None and use_cache:
+            cache = GenerationCache()
+        self.cache = cache
+
+        self._precomputed: Optional[Dict[Tuple[PlaybookType, int], Tuple]] = None
+        self.precompute_report: Optional[Dict[str, Any]] = None
+        if precompute is None:
+            precompute = os.environ.get(PRECOMPUTE_ENV_VAR, "").lower() in (
+                "1",
+                "true",
+                "yes",
+            )
+        if precompute:
+            self.warm_up()
+
+    def reload_templates(self, force: bool = True) -> bool:
+        """Pick up template files changed on disk
+
+        Without ``force`` the directory is only rescanned once per poll
+        interval. On a change the spliced fragments, the precomputed table,
+        the template index and cached playbooks are all invalidated.
+        """
+        store = self.template_store
+        if not (store.refresh() if force else store.poll()):
+            return False
+        self._prepare_fragments()
+        if self.renderer is not None:
+            self.renderer.clear()
+        self._template_index = None
+        self.invalidate_cache()
+        return True
+
+    def invalidate_cache(self) -> int:
+        """Drop cached playbooks; reload_templates() calls this on changes"""
+        if self._precomputed is not None:
+            self.warm_up()
+        if self.cache is None:
+            return 0
+        return self.cache.invalidate()
+
+    def warm_up(self) -> Dict[str, Any]:
+        """Precompute every (playbook type, requirement mask) combination
+
+        Templated requests whose custom-task stage is a no-op then become a
+        table lookup. Returns a report with the entry count, build time and
+        the memory retained by the table.
+        """
+        start = time.perf_counter()
+        table = {}
+        for playbook_type, template in self.parsed_templates.items():
+            for mask in range(1 << len(ENHANCED_REQUIREMENTS)):
+                requirements = [
+                    req
+                    for bit, req in enumerate(ENHANCED_REQUIREMENTS)
+                    if mask & (1 << bit)
+                ]
+                context = PlaybookContext(
+                    prompt="", playbook_type=playbook_type, requirements=requirements
+                )
+                playbook_data = self._enhance_with_requirements(template, context)
+                table[(playbook_type, mask)] = (
+                    playbook_data,
+                    self._splice(context) or yaml_backend.dump(playbook_data),
+                )
+        build_seconds = time.perf_counter() - start
+
+        self._precomputed = table
+        self.precompute_report = {
+            "entries": len(table),
+            "build_seconds": build_seconds,
+            "memory_bytes": self._table_memory(table),
         }
-
-    def _compile_patterns(self) -> Dict[str, re.Pattern]:
-        """Compile regex patterns for prompt analysis"""
-        return {
-            "kubernetes": re.compile(
-                r"\b(k8s|kubernetes|kubectl|pod|deployment|service|ingress)\b", re.I
-            ),
-            "docker": re.compile(
-                r"\b(docker|container|compose|dockerfile|registry)\b", re.I
-            ),
-            "database": re.compile(
-                r"\b(mysql|postgres|mongodb|redis|database|db)\b", re.I
-            ),
-            "monitoring": re.compile(
-                r"\b(prometheus|grafana|monitoring|metrics|alerts)\b", re.I
-            ),
-            "security": re.compile(
-                r"\b(security|firewall|ssh|tls|certificate|vault)\b", re.I
-            ),
-            "network": re.compile(
-                r"\b(network|routing|dns|load.?balanc|nginx|haproxy)\b", re.I
-            ),
+        logger.info(
+            "Precomputed %d playbooks in %.1f ms (%.1f KiB)",
+            len(table),
+            build_seconds * 1000,
+            self.precompute_report["memory_bytes"] / 1024,
+        )
+        return self.precompute_report
+
+    def _table_memory(self, table: Dict) -> int:
+        """Bytes retained by the table beyond the shared template nodes"""
+        seen = set()
+
+        def walk(node: Any) -> int:
+            if id(node) in seen:
+                return 0
+            seen.add(id(node))
+            size = sys.getsizeof(node)
+            if isinstance(node, dict):
+                for key, value in node.items():
+                    size += walk(key) + walk(value)
+            elif isinstance(node, (list, tuple)):
+                for item in node:
+                    size += walk(item)
+            return size
+
+        # Template and enhancer nodes exist without the table
+        for shared in (
+            list(self.parsed_templates.values()),
+            HA_TASKS,
+            SECURITY_TASKS,
+            SSHD_HANDLER,
+            MONITORING_TASKS,
+            BACKUP_TASKS,
+        ):
+            walk(shared)
+        seen.update(id(playbook_type) for playbook_type in PlaybookType)
+
+        return walk(table)
+
+    def _table_key(
+        self, context: PlaybookContext
+    ) -> Optional[Tuple[PlaybookType, int]]:
+        """Table key for the context, or None if the table cannot answer it"""
+        # The table holds unrendered templates
+        if (
+            self.renderer is not None
+            or context.playbook_type not in self.parsed_templates
+        ):
+            return None
+
+        mask = 0
+        last_bit = -1
+        for req in self._requirements_for(context):
+            if req not in ENHANCED_REQUIREMENTS:
+                continue
+            bit = ENHANCED_REQUIREMENTS.index(req)
+            # Repeated or out-of-order requirements change the task order
+            if bit <= last_bit:
+                return None
+            last_bit = bit
+            mask |= 1 << bit
+        return (context.playbook_type, mask)
+
+    def _prepare_fragments(self) -> None:
+        """Serialize enhancer blocks once for splicing
+
+        Templates are serialized key by key on first use, see _spliced().
+        """
+        # (template, its splice or None if it cannot be spliced) per type
+        self.spliced_templates: Dict[
+            PlaybookType, Tuple[Playbook, Optional[SplicedPlay]]
+        ] = {}
+        # The same for pre-rendered templates, by id of the rendered template
+        self._rendered_splices: (
+            "OrderedDict[int, Tuple[Playbook, Optional[SplicedPlay]]]"
+        ) = OrderedDict()
+        # Variables each loaded template needs from the caller
+        self._required_variables: Dict[PlaybookType, FrozenSet[str]] = {}
+        # Types whose unresolved variables have been logged as a warning
+        self._warned_missing: Set[PlaybookType] = set()
+        self._fragments: Dict[str, Tuple[Fragment, ...]] = {
+            req: tuple(Fragment.build(*block) for block in blocks)
+            for req, blocks in ENHANCER_BLOCKS.items()
         }
 
+    @property
+    def template_index(self) -> TemplateIndex:
+        """Retrieval index over the template directory, loaded on first use"""
+        if self._template_index is None:
+            self._template_index = self._load_template_index(self._template_index_path)
+        return self._template_index
+
+    def build_template_index(self) -> TemplateIndex:
+        """Index every template for retrieval by prompt similarity
+
+        Each source is parsed only to take its terms and is not kept in the
+        template store, so indexing does not load the whole catalogue.
+        """
+        store = self.template_store
+        terms = {}
+        for name in store:
+            try:
+                terms[name] = template_terms(name, _load_template(store.read(name)))
+            except Exception as e:
+                logger.warning(f"Not indexing template {name}: {e}")
+        return TemplateIndex.from_terms(terms, self._template_fingerprint())
+
+    def _template_fingerprint(self) -> str:
+        return self.template_store.fingerprint()
+
+    def _load_template_index(self, path: Optional[str]) -> TemplateIndex:
+        """Load the persisted index at ``path``, or build one if it is stale"""
+        if path and os.path.exists(path):
+            try:
+                index = TemplateIndex.load(path)
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Ignoring unreadable template index {path}: {e}")
+            else:
+                if index.fingerprint == self._template_fingerprint():
+                    return index
+                logger.warning(
+                    f"Template index {path} is stale, rebuilding in memory; "
+                    "refresh it with 'python -m src.template_index'"
+                )
+        return self.build_template_index()
+
     def analyze_prompt(self, prompt: str) -> PlaybookContext:
         """Analyze the prompt to extract context"""
+        self.reload_templates(force=False)
+        analysis = self.analyzer.scan(prompt)
         context = PlaybookContext(prompt=prompt)
 
-        # Detect playbook type
-        for pattern_name, pattern in self.patterns.items():
-            if pattern.search(prompt):
-                try:
-                    context.playbook_type = PlaybookType(pattern_name)
-                    break
-                except ValueError:
-                    pass
-
-        # Extract environment
-        if "production" in prompt.lower():
-            context.environment = "production"
-        elif "staging" in prompt.lower():
-            context.environment = "staging"
-        elif "development" in prompt.lower() or "dev" in prompt.lower():
-            context.environment = "development"
-
-        # Extract requirements
-        context.requirements = self._extract_requirements(prompt)
-
-        # Generate appropriate tags
-        context.tags = self._generate_tags(prompt)
+        # Rank every matched type instead of taking the first match
+        context.type_candidates = [
+            (PlaybookType(name), confidence)
+            for name, confidence in self.scorer.rank(analysis)
+        ]
+        if context.type_candidates:
+            context.playbook_type = context.type_candidates[0][0]
+        if analysis.environment is not None:
+            context.environment = analysis.environment
+        context.requirements = list(analysis.requirements)
+        context.tags = list(analysis.tags)
+        context.template_matches = list(
+            self.template_index.query(prompt, TEMPLATE_MATCHES)
+        )
 
         return context
 
-    def _extract_requirements(self, prompt: str) -> List[str]:
-        """Extract specific requirements from the prompt"""
-        requirements = []
-
-        # Common requirement patterns
-        patterns = {
-            "high_availability": r"\b(high.?availability|ha|redundant|failover)\b",
-            "scalability": r"\b(scal[ae]bl|auto.?scal|elastic)\b",
-            "security": r"\b(secur|encrypt|tls|ssl|firewall)\b",
-            "monitoring": r"\b(monitor|metric|log|observ)\b",
-            "backup": r"\b(backup|restore|disaster.?recovery)\b",
-            "performance": r"\b(perform|optimiz|cache|fast)\b",
-        }
+    def analyze_prompts(
+        self, prompts: Iterable[str], chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> Iterator[PromptBatch]:
+        """Analyze many prompts, yielding compact per-chunk arrays
 
-        for req_name, pattern in patterns.items():
-            if re.search(pattern, prompt, re.I):
-                requirements.append(req_name)
+        Meant for replaying request logs: results are type and environment
+        codes plus requirement, tag and action bitmasks (see prompt_batch)
+        rather than PlaybookContext objects.
+        """
+        return analyze_prompts(prompts, chunk_size, self.analyzer, self.scorer)
 
-        return requirements
+    def _extract_requirements(self, prompt: str) -> List[str]:
+        """Extract specific requirements from the prompt"""
+        return list(self.analyzer.scan(prompt).requirements)
 
     def _generate_tags(self, prompt: str) -> List[str]:
         """Generate appropriate tags based on the prompt"""
-        tags = ["setup"]
-
-        keyword_to_tags = {
-            "install": ["install", "setup"],
-            "configure": ["configure", "config"],
-            "deploy": ["deploy", "rollout"],
-            "update": ["update", "upgrade"],
-            "backup": ["backup"],
-            "restore": ["restore"],
-            "monitor": ["monitoring"],
-            "secure": ["security"],
-        }
-
-        for keyword, tag_list in keyword_to_tags.items():
-            if keyword in prompt.lower():
-                tags.extend(tag_list)
+        return list(self.analyzer.scan(prompt).tags)
 
-        return list(set(tags))  # Remove duplicates
-
-    def generate(self, context: PlaybookContext) -> str:
+    def generate(
+        self,
+        context: PlaybookContext,
+        output_format: OutputFormat = OutputFormat.YAML,
+    ) -> str:
         """Generate an Ansible playbook based on context"""
         logger.info(f"Generating playbook for type: {context.playbook_type}")
+        output_format = OutputFormat(output_format)
+        self._prepare(context)
+
+        if self._precomputed is not None:
+            entry = self._precomputed.get(self._table_key(context))
+            if entry is not None:
+                playbook_data, playbook = entry
+                if self._add_custom_tasks(playbook_data, context) is playbook_data:
+                    if output_format is OutputFormat.YAML:
+                        return playbook
+                    return self._serialize(playbook_data, output_format)
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self._cache_key(context, output_format)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        playbook = None
+        if output_format is OutputFormat.YAML:
+            playbook = self._splice(context)
+        if playbook is None:
+            playbook = self._serialize(self._build_playbook(context), output_format)
+
+        if cache_key is not None:
+            self.cache.put(cache_key, playbook)
+        return playbook
 
-        if context.playbook_type and context.playbook_type in self.templates:
-            # Use template as base
-            playbook = self.templates[context.playbook_type]
-        else:
+    def generate_stream(
+        self,
+        context: PlaybookContext,
+        output_format: OutputFormat = OutputFormat.YAML,
+    ) -> Iterator[str]:
+        """Generate a playbook as a stream of serialized chunks
+
+        Chunks are yielded per play header and per task, so they can be
+        written straight to a file or socket; ``"".join()`` of the chunks
+        equals ``generate(context, output_format)``.
+        """
+        logger.info(f"Streaming playbook for type: {context.playbook_type}")
+        self._prepare(context)
+        return self._serialize_stream(
+            self._build_playbook(context), OutputFormat(output_format)
+        )
+
+    def generate_site_stream(
+        self,
+        contexts: Iterable[PlaybookContext],
+        output_format: OutputFormat = OutputFormat.YAML,
+    ) -> Iterator[str]:
+        """Stream one multi-play playbook with a play for each context
+
+        Contexts are consumed lazily, so peak memory stays bounded by a
+        single play no matter how many plays the site playbook has.
+        """
+        self.reload_templates(force=False)
+
+        def plays() -> Iterator[Any]:
+            for context in contexts:
+                self._check_variables(context)
+                yield from self._build_playbook(context)
+
+        return self._serialize_stream(plays(), OutputFormat(output_format))
+
+    @staticmethod
+    def _serialize(playbook_data: Playbook, output_format: OutputFormat) -> str:
+        """Serialize a built playbook in the requested format"""
+        if output_format is OutputFormat.JSON:
+            return _dump_json(playbook_data)
+        if output_format is OutputFormat.FAST_YAML:
+            return yaml_emitter.emit(playbook_data)
+        return yaml_backend.dump(playbook_data)
+
+    @staticmethod
+    def _serialize_stream(
+        plays: Iterable[Any], output_format: OutputFormat
+    ) -> Iterator[str]:
+        """Serialize plays incrementally in the requested format"""
+        if output_format is OutputFormat.JSON:
+            return _dump_json_stream(plays)
+        if output_format is OutputFormat.FAST_YAML:
+            return yaml_emitter.emit_stream(plays)
+        return yaml_backend.dump_stream(plays)
+
+    def _splice(self, context: PlaybookContext) -> Optional[str]:
+        """YAML for a templated context built from pre-serialized fragments
+
+        Returns None unless the context uses a single-play template and the
+        custom-task stage leaves the template unchanged; the text is then
+        identical to dumping ``_build_playbook(context)``.
+        """
+        template, spliced = self._template_for(context)
+        if spliced is None:
+            return None
+        if self._add_custom_tasks(template, context) is not template:
+            return None
+
+        fragments = self._fragments
+        return spliced.render(
+            fragment
+            for req in self._requirements_for(context)
+            for fragment in fragments.get(req, ())
+        )
+
+    def _spliced(
+        self, playbook_type: Optional[PlaybookType]
+    ) -> Tuple[Optional[Playbook], Optional[SplicedPlay]]:
+        """A template and its key-by-key serialization, built on first use"""
+        entry = self.spliced_templates.get(playbook_type)
+        if entry is None:
+            template = self.parsed_templates.get(playbook_type)
+            spliced = splice_template(template) if template is not None else None
+            entry = self.spliced_templates[playbook_type] = (template, spliced)
+        return entry
+
+    def _template_for(
+        self, context: PlaybookContext
+    ) -> Tuple[Optional[Playbook], Optional[SplicedPlay]]:
+        """The context's template, pre-rendered if enabled, and its splice"""
+        entry = self._spliced(context.playbook_type)
+        template = entry[0]
+        if self.renderer is None or template is None:
+            return entry
+        values = {name: getattr(context, name) for name in CONTEXT_VARIABLES}
+        values.update(context.variables)
+        rendered = self.renderer.render(template, values)
+        if rendered is template:
+            return entry
+        splices = self._rendered_splices
+        entry = splices.get(id(rendered))
+        if entry is None or entry[0] is not rendered:
+            entry = splices[id(rendered)] = (rendered, splice_template(rendered))
+            if len(splices) > RENDERED_SPLICES:
+                splices.popitem(last=False)
+        return entry
+
+    def required_variables(
+        self, playbook_type: Optional[PlaybookType]
+    ) -> FrozenSet[str]:
+        """Variables the template needs from the caller, found once per load"""
+        required = self._required_variables.get(playbook_type)
+        if required is None:
+            template = self.parsed_templates.get(playbook_type)
+            if template is None or not RENDER_AVAILABLE:
+                required = frozenset()
+            else:
+                required = required_variables(template)
+            self._required_variables[playbook_type] = required
+        return required
+
+    def missing_variables(self, context: PlaybookContext) -> List[str]:
+        """Required template variables that the context does not supply"""
+        return sorted(
+            name
+            for name in self.required_variables(context.playbook_type)
+            if name not in context.variables and name not in CONTEXT_VARIABLES
+        )
+
+    def _prepare(self, context: PlaybookContext) -> None:
+        """Steps every generation path runs before building a playbook"""
+        self.reload_templates(force=False)
+        self._check_variables(context)
+
+    def _check_variables(self, context: PlaybookContext) -> List[str]:
+        """missing_variables(context), raising for them in strict mode
+
+        Otherwise they are logged as a warning once per template type and
+        at debug level after that.
+        """
+        missing = self.missing_variables(context)
+        if missing:
+            if self.strict_variables:
+                raise MissingVariablesError(context.playbook_type, missing)
+            playbook_type = context.playbook_type
+            log = logger.debug
+            if playbook_type not in self._warned_missing:
+                self._warned_missing.add(playbook_type)
+                log = logger.warning
+            log(
+                f"Template {playbook_type.value} has unresolved variables: {', '.join(missing)}"
+            )
+        return missing
+
+    def _build_playbook(self, context: PlaybookContext) -> Playbook:
+        """Run the generation pipeline up to, but not including, serialization"""
+        # Use template as base; shared nodes are never mutated
+        playbook_data = self._template_for(context)[0]
+        if playbook_data is None:
             # Generate generic playbook
-            playbook = self._generate_generic(context)
+            playbook_data = self._generate_generic(context)
 
         # Enhance based on requirements
-        playbook = self._enhance_with_requirements(playbook, context)
+        playbook_data = self._enhance_with_requirements(playbook_data, context)
 
         # Add custom tasks based on prompt
-        playbook = self._add_custom_tasks(playbook, context)
+        return self._add_custom_tasks(playbook_data, context)
+
+    def validate(self, context: PlaybookContext) -> ValidationResult:
+        """Validate the playbook generated for ``context`` as built, unserialized"""
+        return self.validator.validate(self._build_playbook(context))
+
+    def generate_many(
+        self,
+        contexts: Iterable[PlaybookContext],
+        workers: Optional[int] = None,
+        chunksize: Optional[int] = None,
+        output_format: OutputFormat = OutputFormat.YAML,
+    ) -> List[BatchResult]:
+        """Generate playbooks for many contexts
+
+        Identical contexts are generated once. With ``workers`` > 1 the
+        remaining work is spread over a process pool. Results are returned
+        in input order; a failing context yields a BatchResult with
+        ``error`` set instead of aborting the batch.
+        """
+        contexts = list(contexts)
+        output_format = OutputFormat(output_format)
+        results: List[Optional[BatchResult]] = [None] * len(contexts)
+
+        keys: List[Optional[str]] = []
+        unique_index: Dict[str, int] = {}
+        unique_contexts: List[PlaybookContext] = []
+        for idx, context in enumerate(contexts):
+            try:
+                key = self._cache_key(context, output_format)
+            except Exception as e:
+                results[idx] = BatchResult(error=f"{type(e).__name__}: {e}")
+                key = None
+            if key is not None and key not in unique_index:
+                unique_index[key] = len(unique_contexts)
+                unique_contexts.append(context)
+            keys.append(key)
+
+        if workers is None or workers <= 1 or len(unique_contexts) < 2:
+            unique_results = [
+                self._generate_one(c, output_format) for c in unique_contexts
+            ]
+        else:
+            unique_results = self._generate_parallel(
+                unique_contexts, workers, chunksize, output_format
+            )
 
-        return playbook
+        for idx, key in enumerate(keys):
+            if key is not None:
+                results[idx] = unique_results[unique_index[key]]
+
+        logger.info(
+            f"Generated {len(contexts)} playbooks "
+            f"({len(unique_contexts)} unique, workers={workers or 1})"
+        )
+        return results
+
+    def _generate_one(
+        self, context: PlaybookContext, output_format: OutputFormat
+    ) -> BatchResult:
+        """Generate a playbook, capturing any error in the result"""
+        try:
+            playbook = self.generate(context, output_format)
+            return BatchResult(
+                playbook=playbook, missing_variables=self.missing_variables(context)
+            )
+        except Exception as e:
+            logger.error(f"Batch generation failed for '{context.prompt[:50]}': {e}")
+            return BatchResult(error=f"{type(e).__name__}: {e}")
+
+    def _generate_parallel(
+        self,
+        contexts: List[PlaybookContext],
+        workers: int,
+        chunksize: Optional[int],
+        output_format: OutputFormat,
+    ) -> List[BatchResult]:
+        """Fan contexts out over a process pool, preserving order"""
+        if "fork" in multiprocessing.get_all_start_methods():
+            mp_context = multiprocessing.get_context("fork")
+            source: Any = self
+        else:
+            mp_context = multiprocessing.get_context()
+            source = {
+                "use_cache": False,
+                "canonical": self.canonical,
+                "precompute": self._precomputed is not None,
+                "max_prompt_length": self.analyzer.max_prompt_length,
+                "template_dir": str(self.template_store.directory),
+                "poll_interval": self.template_store.poll_interval,
+                "prerender": self.renderer is not None,
+                "bytecode_cache_dir": (
+                    self.renderer.bytecode_cache_dir
+                    if self.renderer is not None
+                    else None
+                ),
+                "strict_variables": self.strict_variables,
+                "typo_tolerance": self.analyzer.typo_tolerance,
+            }
+
+        if chunksize is None:
+            chunksize = max(1, len(contexts) // (workers * 4))
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=mp_context,
+            initializer=_init_batch_worker,
+            initargs=(source,),
+        ) as executor:
+            return list(
+                executor.map(
+                    _generate_batch_item,
+                    contexts,
+                    itertools.repeat(output_format),
+                    chunksize=chunksize,
+                )
+            )
+
+    def _requirements_for(self, context: PlaybookContext) -> List[str]:
+        """Requirements in the order their enhancers are applied"""
+        if not self.canonical:
+            return context.requirements
+        rank = {name: idx for idx, name in enumerate(REQUIREMENT_ORDER)}
+        unique = set(context.requirements)
+        return sorted(unique, key=lambda req: (rank.get(req, len(rank)), req))
+
+    def _cache_key(
+        self,
+        context: PlaybookContext,
+        output_format: OutputFormat = OutputFormat.YAML,
+    ) -> str:
+        """Fingerprint every input that influences the generated playbook"""
+        if self.canonical:
+            context = replace(context, requirements=self._requirements_for(context))
+        actions = list(self.analyzer.scan(context.prompt).actions)
+        templated = context.playbook_type in self.parsed_templates
+        # Generic playbooks embed the start of the prompt in their name
+        title = None if templated else context.prompt[:50]
+        return fingerprint(
+            context,
+            actions=actions,
+            title=title,
+            canonical=self.canonical,
+            format=output_format.value,
+        )
 
-    def _generate_generic(self, context: PlaybookContext) -> str:
+    def _generate_generic(self, context: PlaybookContext) -> Playbook:
         """Generate a generic playbook structure"""
+        variables = {"environment": context.environment, **context.variables}
+        if self.canonical:
+            variables = _sort_keys(variables)
+
         playbook = {
             "name": f"Playbook for: {context.prompt[:50]}",
             "hosts": context.target_hosts,
             "become": True,
-            "vars": {"environment": context.environment, **context.variables},
+            "vars": variables,
             "tasks": [
                 {"name": "Gather system facts", "setup": {}, "tags": ["always"]},
                 {
@@ -196,686 +1043,91 @@ class PlaybookGenerator:
             ],
         }
 
-        return yaml.dump([playbook], default_flow_style=False, sort_keys=False)
+        return freeze([playbook])
 
     def _enhance_with_requirements(
-        self, playbook: str, context: PlaybookContext
-    ) -> str:
+        self, playbook_data: Playbook, context: PlaybookContext
+    ) -> Playbook:
         """Enhance playbook based on requirements"""
-        try:
-            playbook_data = yaml.safe_load(playbook)
-        except yaml.YAMLError as e:
-            logger.error(f"Failed to parse playbook during enhancement: {e}")
-            return playbook
+        play = playbook_data[0]
 
-        for req in context.requirements:
+        for req in self._requirements_for(context):
             if req == "high_availability":
-                self._add_ha_tasks(playbook_data[0])
+                play = self._add_ha_tasks(play)
             elif req == "security":
-                self._add_security_tasks(playbook_data[0])
+                play = self._add_security_tasks(play)
             elif req == "monitoring":
-                self._add_monitoring_tasks(playbook_data[0])
+                play = self._add_monitoring_tasks(play)
             elif req == "backup":
-                self._add_backup_tasks(playbook_data[0])
+                play = self._add_backup_tasks(play)
 
-        return yaml.dump(playbook_data, default_flow_style=False, sort_keys=False)
+        if play is playbook_data[0]:
+            return playbook_data
+        return with_item(playbook_data, 0, play)
 
-    def _add_custom_tasks(self, playbook: str, context: PlaybookContext) -> str:
+    def _add_custom_tasks(
+        self, playbook_data: Playbook, context: PlaybookContext
+    ) -> Playbook:
         """Add custom tasks based on the prompt analysis"""
-        try:
-            playbook_data = yaml.safe_load(playbook)
-        except yaml.YAMLError as e:
-            logger.error(f"Failed to parse playbook during custom task addition: {e}")
-            return playbook
+        play = playbook_data[0]
+        actions = self.analyzer.scan(context.prompt).actions
 
         # Analyze prompt for specific actions
-        if "install" in context.prompt.lower():
-            self._add_installation_tasks(playbook_data[0], context)
+        if "install" in actions:
+            play = self._add_installation_tasks(play, context)
 
-        if "configure" in context.prompt.lower():
-            self._add_configuration_tasks(playbook_data[0], context)
+        if "configure" in actions:
+            play = self._add_configuration_tasks(play, context)
 
-        if "deploy" in context.prompt.lower():
-            self._add_deployment_tasks(playbook_data[0], context)
+        if "deploy" in actions:
+            play = self._add_deployment_tasks(play, context)
 
-        return yaml.dump(playbook_data, default_flow_style=False, sort_keys=False)
+        if play is playbook_data[0]:
+            return playbook_data
+        return with_item(playbook_data, 0, play)
 
-    def _add_ha_tasks(self, playbook: Dict):
+    def _add_ha_tasks(self, play: FrozenDict) -> FrozenDict:
         """Add high availability related tasks"""
-        ha_tasks = [
-            {
-                "name": "Configure keepalived for HA",
-                "package": {"name": "keepalived", "state": "present"},
-                "tags": ["ha", "keepalived"],
-            },
-            {
-                "name": "Setup load balancer health checks",
-                "uri": {"url": "http://localhost/health", "status_code": 200},
-                "tags": ["ha", "healthcheck"],
-            },
-        ]
-        playbook["tasks"].extend(ha_tasks)
+        return with_appended(play, "tasks", HA_TASKS)
 
-    def _add_security_tasks(self, playbook: Dict):
+    def _add_security_tasks(self, play: FrozenDict) -> FrozenDict:
         """Add security related tasks"""
-        security_tasks = [
-            {
-                "name": "Configure firewall rules",
-                "firewalld": {
-                    "service": "https",
-                    "permanent": True,
-                    "state": "enabled",
-                },
-                "tags": ["security", "firewall"],
-            },
-            {
-                "name": "Setup fail2ban",
-                "package": {"name": "fail2ban", "state": "present"},
-                "tags": ["security", "fail2ban"],
-            },
-            {
-                "name": "Configure SSH hardening",
-                "lineinfile": {
-                    "path": "/etc/ssh/sshd_config",
-                    "regexp": "^PermitRootLogin",
-                    "line": "PermitRootLogin no",
-                },
-                "notify": "restart sshd",
-                "tags": ["security", "ssh"],
-            },
-        ]
-        playbook["tasks"].extend(security_tasks)
-
-        # Add handlers if not present
-        if "handlers" not in playbook:
-            playbook["handlers"] = []
+        play = with_appended(play, "tasks", SECURITY_TASKS)
 
         # Check for duplicate handler before appending
-        handler = {
-            "name": "restart sshd",
-            "service": {"name": "sshd", "state": "restarted"},
-        }
-        if not any(h.get("name") == "restart sshd" for h in playbook["handlers"]):
-            playbook["handlers"].append(handler)
+        handlers = play.get("handlers", ())
+        if not any(h.get("name") == SSHD_HANDLER["name"] for h in handlers):
+            play = with_appended(play, "handlers", [SSHD_HANDLER])
+        return play
 
-    def _add_monitoring_tasks(self, playbook: Dict):
+    def _add_monitoring_tasks(self, play: FrozenDict) -> FrozenDict:
         """Add monitoring related tasks"""
-        node_exporter_url = (
-            "https://github.com/prometheus/node_exporter/releases/download/"
-            "v1.5.0/node_exporter-1.5.0.linux-amd64.tar.gz"
-        )
-        monitoring_tasks = [
-            {
-                "name": "Install node exporter",
-                "unarchive": {
-                    "src": node_exporter_url,
-                    "dest": "/opt",
-                    "remote_src": True,
-                },
-                "tags": ["monitoring", "prometheus"],
-            },
-            {
-                "name": "Create systemd service for node exporter",
-                "systemd": {
-                    "name": "node_exporter",
-                    "state": "started",
-                    "enabled": True,
-                },
-                "tags": ["monitoring", "prometheus"],
-            },
-        ]
-        playbook["tasks"].extend(monitoring_tasks)
+        return with_appended(play, "tasks", MONITORING_TASKS)
 
-    def _add_backup_tasks(self, playbook: Dict):
+    def _add_backup_tasks(self, play: FrozenDict) -> FrozenDict:
         """Add backup related tasks"""
-        backup_tasks = [
-            {
-                "name": "Create backup directory",
-                "file": {"path": "/backup", "state": "directory", "mode": "0755"},
-                "tags": ["backup"],
-            },
-            {
-                "name": "Setup automated backup cron job",
-                "cron": {
-                    "name": "Daily backup",
-                    "hour": "2",
-                    "minute": "0",
-                    "job": "/usr/local/bin/backup.sh",
-                },
-                "tags": ["backup", "cron"],
-            },
-        ]
-        playbook["tasks"].extend(backup_tasks)
+        return with_appended(play, "tasks", BACKUP_TASKS)
 
-    def _add_installation_tasks(self, playbook: Dict, context: PlaybookContext):
+    def _add_installation_tasks(
+        self, play: FrozenDict, context: PlaybookContext
+    ) -> FrozenDict:
         """Add installation specific tasks"""
         # This would be enhanced based on what needs to be installed
-        pass
+        return play
 
-    def _add_configuration_tasks(self, playbook: Dict, context: PlaybookContext):
+    def _add_configuration_tasks(
+        self, play: FrozenDict, context: PlaybookContext
+    ) -> FrozenDict:
         """Add configuration specific tasks"""
         # This would be enhanced based on what needs to be configured
-        pass
+        return play
 
-    def _add_deployment_tasks(self, playbook: Dict, context: PlaybookContext):
+    def _add_deployment_tasks(
+        self, play: FrozenDict, context: PlaybookContext
+    ) -> FrozenDict:
         """Add deployment specific tasks"""
         # This would be enhanced based on what needs to be deployed
-        pass
-
-    # Template methods
-    def _kubernetes_template(self) -> str:
-        return """
-- name: Kubernetes Deployment Playbook
-  hosts: "{{ target_hosts | default('localhost') }}"
-  gather_facts: yes
-  vars:
-    kube_namespace: "{{ namespace | default('default') }}"
-    app_name: "{{ application_name }}"
-    replicas: "{{ replica_count | default(3) }}"
-    image: "{{ container_image }}"
-
-  tasks:
-    - name: Ensure kubectl is installed
-      package:
-        name: kubectl
-        state: present
-      tags:
-        - setup
-        - kubectl
-
-    - name: Create namespace
-      kubernetes.core.k8s:
-        name: "{{ kube_namespace }}"
-        api_version: v1
-        kind: Namespace
-        state: present
-      tags:
-        - namespace
-
-    - name: Deploy application
-      kubernetes.core.k8s:
-        state: present
-        definition:
-          apiVersion: apps/v1
-          kind: Deployment
-          metadata:
-            name: "{{ app_name }}"
-            namespace: "{{ kube_namespace }}"
-            labels:
-              app: "{{ app_name }}"
-              environment: "{{ environment }}"
-          spec:
-            replicas: "{{ replicas }}"
-            selector:
-              matchLabels:
-                app: "{{ app_name }}"
-            template:
-              metadata:
-                labels:
-                  app: "{{ app_name }}"
-              spec:
-                containers:
-                - name: "{{ app_name }}"
-                  image: "{{ image }}"
-                  ports:
-                  - containerPort: 8080
-                  resources:
-                    requests:
-                      memory: "256Mi"
-                      cpu: "250m"
-                    limits:
-                      memory: "512Mi"
-                      cpu: "500m"
-      tags:
-        - deploy
-        - kubernetes
-
-    - name: Create service
-      kubernetes.core.k8s:
-        state: present
-        definition:
-          apiVersion: v1
-          kind: Service
-          metadata:
-            name: "{{ app_name }}-service"
-            namespace: "{{ kube_namespace }}"
-          spec:
-            selector:
-              app: "{{ app_name }}"
-            ports:
-            - protocol: TCP
-              port: 80
-              targetPort: 8080
-            type: LoadBalancer
-      tags:
-        - service
-        - kubernetes
-"""
-
-    def _docker_template(self) -> str:
-        return """
-- name: Docker Environment Setup
-  hosts: "{{ target_hosts | default('all') }}"
-  become: yes
-  vars:
-    docker_users: []
-    docker_compose_version: "2.20.0"
-    docker_repo_url: >-
-      deb [arch=amd64] https://download.docker.com/linux/{{ ansible_distribution | lower }}
-      {{ ansible_distribution_release }} stable
-
-  tasks:
-    - name: Install required packages
-      package:
-        name:
-          - apt-transport-https
-          - ca-certificates
-          - curl
-          - gnupg
-          - lsb-release
-        state: present
-      tags:
-        - setup
-        - docker
-
-    - name: Add Docker GPG key
-      apt_key:
-        url: https://download.docker.com/linux/{{ ansible_distribution | lower }}/gpg
-        state: present
-      tags:
-        - setup
-        - docker
-
-    - name: Add Docker repository
-      apt_repository:
-        repo: "{{ docker_repo_url }}"
-        state: present
-      tags:
-        - setup
-        - docker
-
-    - name: Install Docker
-      package:
-        name:
-          - docker-ce
-          - docker-ce-cli
-          - containerd.io
-        state: present
-      tags:
-        - setup
-        - docker
-
-    - name: Start and enable Docker
-      systemd:
-        name: docker
-        state: started
-        enabled: yes
-      tags:
-        - setup
-        - docker
-
-    - name: Install Docker Compose Plugin
-      package:
-        name: docker-compose-plugin
-        state: present
-      tags:
-        - setup
-        - docker-compose
-
-    - name: Add users to docker group
-      user:
-        name: "{{ item }}"
-        groups: docker
-        append: yes
-      loop: "{{ docker_users }}"
-      when: docker_users | length > 0
-      tags:
-        - setup
-        - docker
-"""
-
-    def _system_template(self) -> str:
-        return """
-- name: System Configuration Playbook
-  hosts: "{{ target_hosts | default('all') }}"
-  become: yes
-  vars:
-    system_timezone: "UTC"
-    system_packages: []
-
-  tasks:
-    - name: Update package cache
-      package:
-        update_cache: yes
-      tags:
-        - update
-        - system
-
-    - name: Upgrade all packages
-      package:
-        name: '*'
-        state: present
-      tags:
-        - update
-        - system
-
-    - name: Set timezone
-      timezone:
-        name: "{{ system_timezone }}"
-      tags:
-        - config
-        - system
-
-    - name: Install essential packages
-      package:
-        name:
-          - vim
-          - git
-          - curl
-          - wget
-          - htop
-          - net-tools
-        state: present
-      tags:
-        - setup
-        - system
-
-    - name: Configure sysctl parameters
-      sysctl:
-        name: "{{ item.name }}"
-        value: "{{ item.value }}"
-        state: present
-        reload: yes
-      loop:
-        - { name: 'net.ipv4.ip_forward', value: '1' }
-        - { name: 'net.ipv6.conf.all.forwarding', value: '1' }
-      tags:
-        - config
-        - system
-"""
-
-    def _database_template(self) -> str:
-        return """
-- name: Database Setup Playbook
-  hosts: "{{ target_hosts | default('all') }}"
-  become: yes
-  vars:
-    db_type: "{{ database_type | default('postgresql') }}"
-    db_name: "{{ database_name | default('myapp') }}"
-    db_user: "{{ database_user | default('appuser') }}"
-    db_password: "{{ database_password }}"
-
-  tasks:
-    - name: Install PostgreSQL
-      package:
-        name:
-          - postgresql
-          - postgresql-contrib
-          - python3-psycopg2
-        state: present
-      when: db_type == 'postgresql'
-      tags:
-        - setup
-        - database
-
-    - name: Start PostgreSQL service
-      systemd:
-        name: postgresql
-        state: started
-        enabled: yes
-      when: db_type == 'postgresql'
-      tags:
-        - setup
-        - database
-
-    - name: Create database
-      postgresql_db:
-        name: "{{ db_name }}"
-        state: present
-      become_user: postgres
-      when: db_type == 'postgresql'
-      tags:
-        - setup
-        - database
-
-    - name: Create database user
-      postgresql_user:
-        name: "{{ db_user }}"
-        password: "{{ db_password }}"
-        db: "{{ db_name }}"
-        priv: ALL
-        state: present
-      become_user: postgres
-      when: db_type == 'postgresql'
-      tags:
-        - setup
-        - database
-"""
-
-    def _monitoring_template(self) -> str:
-        return """
-- name: Monitoring Stack Setup
-  hosts: "{{ target_hosts | default('all') }}"
-  become: yes
-  vars:
-    prometheus_version: "2.45.0"
-    grafana_version: "10.0.0"
-    prometheus_base: "https://github.com/prometheus/prometheus/releases/download"
-    prometheus_file: "prometheus-{{ prometheus_version }}.linux-amd64.tar.gz"
-    prometheus_url: "{{ prometheus_base }}/v{{ prometheus_version }}/{{ prometheus_file }}"
-
-  tasks:
-    - name: Create monitoring user
-      user:
-        name: prometheus
-        system: yes
-        shell: /bin/false
-      tags:
-        - setup
-        - monitoring
-
-    - name: Download and install Prometheus
-      unarchive:
-        src: "{{ prometheus_url }}"
-        dest: /opt
-        remote_src: yes
-        owner: prometheus
-        group: prometheus
-      tags:
-        - setup
-        - prometheus
-
-    - name: Create Prometheus configuration
-      template:
-        src: prometheus.yml.j2
-        dest: /etc/prometheus/prometheus.yml
-        owner: prometheus
-        group: prometheus
-      tags:
-        - config
-        - prometheus
-
-    - name: Create systemd service for Prometheus
-      systemd:
-        name: prometheus
-        state: started
-        enabled: yes
-        daemon_reload: yes
-      tags:
-        - setup
-        - prometheus
-
-    - name: Install Grafana
-      package:
-        name: grafana
-        state: present
-      tags:
-        - setup
-        - grafana
-
-    - name: Start Grafana service
-      systemd:
-        name: grafana-server
-        state: started
-        enabled: yes
-      tags:
-        - setup
-        - grafana
-"""
-
-    def _security_template(self) -> str:
-        return """
-- name: Security Hardening Playbook
-  hosts: "{{ target_hosts | default('all') }}"
-  become: yes
-
-  tasks:
-    - name: Update all packages
-      package:
-        name: '*'
-        state: present
-      tags:
-        - update
-        - security
-
-    - name: Configure SSH hardening
-      lineinfile:
-        path: /etc/ssh/sshd_config
-        regexp: "{{ item.regexp }}"
-        line: "{{ item.line }}"
-        state: present
-      loop:
-        - { regexp: '^PermitRootLogin', line: 'PermitRootLogin no' }
-        - { regexp: '^PasswordAuthentication', line: 'PasswordAuthentication no' }
-        - { regexp: '^PermitEmptyPasswords', line: 'PermitEmptyPasswords no' }
-        - { regexp: '^X11Forwarding', line: 'X11Forwarding no' }
-        - { regexp: '^MaxAuthTries', line: 'MaxAuthTries 3' }
-      notify: restart sshd
-      tags:
-        - config
-        - ssh
-        - security
-
-    - name: Install and configure fail2ban
-      package:
-        name: fail2ban
-        state: present
-      tags:
-        - setup
-        - security
-
-    - name: Configure firewall with UFW
-      ufw:
-        rule: "{{ item.rule }}"
-        port: "{{ item.port }}"
-        proto: "{{ item.proto | default('tcp') }}"
-      loop:
-        - { rule: 'allow', port: '22' }
-        - { rule: 'allow', port: '80' }
-        - { rule: 'allow', port: '443' }
-      tags:
-        - firewall
-        - security
-
-    - name: Enable UFW
-      ufw:
-        state: enabled
-        policy: deny
-        direction: incoming
-      tags:
-        - firewall
-        - security
-
-    - name: Install and configure auditd
-      package:
-        name: auditd
-        state: present
-      tags:
-        - setup
-        - audit
-        - security
-
-    - name: Start auditd service
-      systemd:
-        name: auditd
-        state: started
-        enabled: yes
-      tags:
-        - setup
-        - audit
-        - security
-
-  handlers:
-    - name: restart sshd
-      systemd:
-        name: sshd
-        state: restarted
-"""
-
-
-class PlaybookValidator:
-    """Validates generated playbooks"""
-
-    @staticmethod
-    def validate_syntax(playbook_content: str) -> Dict[str, Any]:
-        """Validate playbook YAML syntax"""
-        try:
-            data = yaml.safe_load(playbook_content)
-            return {"valid": True, "data": data}
-        except yaml.YAMLError as e:
-            return {"valid": False, "error": str(e)}
-
-    @staticmethod
-    def validate_structure(playbook_data: List[Dict]) -> List[str]:
-        """Validate playbook structure and return warnings"""
-        warnings = []
-
-        for play in playbook_data:
-            # Check required fields
-            if "hosts" not in play:
-                warnings.append("Play missing 'hosts' field")
-
-            if "tasks" not in play and "roles" not in play:
-                warnings.append("Play has neither 'tasks' nor 'roles'")
-
-            # Check tasks
-            if "tasks" in play:
-                for idx, task in enumerate(play["tasks"]):
-                    if "name" not in task:
-                        warnings.append(f"Task {idx + 1} missing 'name' field")
-
-                    # Check for at least one action
-                    action_modules = [
-                        k
-                        for k in task.keys()
-                        if k
-                        not in [
-                            "name",
-                            "tags",
-                            "when",
-                            "register",
-                            "delegate_to",
-                            "become",
-                            "become_user",
-                            "vars",
-                            "notify",
-                            "loop",
-                            "with_items",
-                            "block",
-                            "rescue",
-                            "always",
-                            "environment",
-                            "changed_when",
-                            "failed_when",
-                            "ignore_errors",
-                        ]
-                    ]
-                    if not action_modules:
-                        warnings.append(
-                            f"Task '{task.get('name', idx + 1)}' has no action module"
-                        )
-
-        return warnings
+        return play
 
 
 def main():
@@ -904,17 +1156,15 @@ def main():
 
         playbook = generator.generate(context)
 
-        # Validate
-        validator = PlaybookValidator()
-        validation = validator.validate_syntax(playbook)
+        # Validate the built playbook without parsing the text again
+        validation = generator.validate(context)
 
-        if validation["valid"]:
-            warnings = validator.validate_structure(validation["data"])
+        if validation.valid:
             print("\nValidation: ✓ Valid")
-            if warnings:
-                print(f"Warnings: {warnings}")
+            if validation.warnings:
+                print(f"Warnings: {[str(issue) for issue in validation.warnings]}")
         else:
-            print(f"\nValidation: ✗ Invalid - {validation['error']}")
+            print(f"\nValidation: ✗ Invalid - {validation.errors[0]}")
 
         print("\nGenerated Playbook Preview:")
         print(playbook[:500] + "..." if len(playbook) > 500 else playbook)
@@ -0,0 +1,708 @@
+#!/usr/bin/env python3
+"""
+Native lint engine for playbooks
+
+Implements the ansible-lint rules we hit most often as PlaybookValidator
+rules, reported under ansible-lint's rule ids so existing skip lists and
+``# noqa: <rule>`` comments carry over. Linting runs in the calling
+process: once the module is imported a playbook is linted in about a
+millisecond, where shelling out to ``ansible-lint`` pays interpreter and
+Ansible start-up on every call.
+
+Rules, by ansible-lint id:
+
+- ``name[missing]``, ``name[play]``, ``name[casing]``
+- ``fqcn[action-core]``, ``fqcn[action]``
+- ``no-changed-when``, ``command-instead-of-module``, ``command-instead-of-shell``
+- ``risky-file-permissions``, ``package-latest``, ``ignore-errors``
+- ``no-jinja-when``, ``literal-compare``, ``partial-become``, ``key-order[task]``
+
+Unreadable YAML is reported as ``load-failure`` and documents that are not
+plays and tasks as ``syntax-check``.
+
+    python -m src.playbook_lint site.yml [--format json] [--skip name[casing]]
+    python -m src.playbook_lint --serve   # JSON lines on stdin/stdout
+"""
+
+import argparse
+import json
+import re
+import sys
+from dataclasses import replace
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple, Type
+
+try:
+    from .playbook_validator import (
+        HANDLER,
+        PLAY,
+        TASK,
+        Element,
+        PlaybookValidator,
+        Reporter,
+        Rule,
+        ValidationResult,
+        is_task_keyword,
+        register_rule,
+    )
+except ImportError:  # executed directly as a script
+    from playbook_validator import (
+        HANDLER,
+        PLAY,
+        TASK,
+        Element,
+        PlaybookValidator,
+        Reporter,
+        Rule,
+        ValidationResult,
+        is_task_keyword,
+        register_rule,
+    )
+
+# Rule id -> lint rule class, in registration order
+LINT_RULES: Dict[str, Type[Rule]] = {}
+
+# Validator issue ids reported under ansible-lint's names
+_RENAMED = {"syntax": "load-failure", "structure": "syntax-check"}
+
+_BUILTIN_PREFIXES = ("ansible.builtin.", "ansible.legacy.")
+# Task keys naming the module in their value
+_ACTION_KEYS = ("action", "local_action")
+
+BUILTIN_MODULES = frozenset(
+    (
+        "add_host",
+        "apt",
+        "apt_key",
+        "apt_repository",
+        "assemble",
+        "assert",
+        "async_status",
+        "blockinfile",
+        "command",
+        "copy",
+        "cron",
+        "deb822_repository",
+        "debconf",
+        "debug",
+        "dnf",
+        "dnf5",
+        "dpkg_selections",
+        "expect",
+        "fail",
+        "fetch",
+        "file",
+        "find",
+        "gather_facts",
+        "get_url",
+        "getent",
+        "git",
+        "group",
+        "group_by",
+        "hostname",
+        "import_playbook",
+        "import_role",
+        "import_tasks",
+        "include_role",
+        "include_tasks",
+        "include_vars",
+        "iptables",
+        "known_hosts",
+        "lineinfile",
+        "meta",
+        "mount_facts",
+        "package",
+        "package_facts",
+        "pause",
+        "ping",
+        "pip",
+        "raw",
+        "reboot",
+        "replace",
+        "rpm_key",
+        "script",
+        "service",
+        "service_facts",
+        "set_fact",
+        "set_stats",
+        "setup",
+        "shell",
+        "slurp",
+        "stat",
+        "subversion",
+        "systemd",
+        "systemd_service",
+        "sysvinit",
+        "tempfile",
+        "template",
+        "unarchive",
+        "uri",
+        "user",
+        "validate_argument_spec",
+        "wait_for",
+        "wait_for_connection",
+        "yum",
+        "yum_repository",
+    )
+)
+
+# Short names of collection modules we use, for fqcn[action] suggestions
+COLLECTION_MODULES = {
+    "authorized_key": "ansible.posix.authorized_key",
+    "docker_compose": "community.docker.docker_compose_v2",
+    "docker_container": "community.docker.docker_container",
+    "docker_image": "community.docker.docker_image",
+    "firewalld": "ansible.posix.firewalld",
+    "helm": "kubernetes.core.helm",
+    "k8s": "kubernetes.core.k8s",
+    "modprobe": "community.general.modprobe",
+    "mount": "ansible.posix.mount",
+    "mysql_db": "community.mysql.mysql_db",
+    "mysql_user": "community.mysql.mysql_user",
+    "postgresql_db": "community.postgresql.postgresql_db",
+    "postgresql_user": "community.postgresql.postgresql_user",
+    "selinux": "ansible.posix.selinux",
+    "synchronize": "ansible.posix.synchronize",
+    "sysctl": "ansible.posix.sysctl",
+    "timezone": "community.general.timezone",
+    "ufw": "community.general.ufw",
+}
+
+COMMAND_MODULES = frozenset(("command", "shell", "raw", "script"))
+
+# Executables with a dedicated module, and subcommands that have none
+COMMAND_REPLACEMENTS = {
+    "apt-get": "apt",
+    "chkconfig": "service",
+    "curl": "get_url or uri",
+    "git": "git",
+    "hg": "hg",
+    "mktemp": "tempfile",
+    "mount": "mount",
+    "patch": "patch",
+    "rpm": "yum or rpm_key",
+    "rsync": "synchronize",
+    "sed": "template, replace or lineinfile",
+    "service": "service",
+    "supervisorctl": "supervisorctl",
+    "svn": "subversion",
+    "systemctl": "systemd",
+    "tar": "unarchive",
+    "unzip": "unarchive",
+    "wget": "get_url or uri",
+    "yum": "yum",
+}
+COMMAND_EXCEPTIONS = {
+    "git": frozenset(("branch", "log", "lfs", "rev-parse", "status")),
+    "systemctl": frozenset(
+        (
+            "daemon-reload",
+            "daemon-reexec",
+            "kill",
+            "reset-failed",
+            "set-default",
+            "show-environment",
+            "status",
+        )
+    ),
+    "yum": frozenset(("clean", "history", "info")),
+}
+
+PACKAGE_MODULES = frozenset(
+    (
+        "apk",
+        "apt",
+        "bower",
+        "bundler",
+        "dnf",
+        "dnf5",
+        "easy_install",
+        "gem",
+        "homebrew",
+        "jenkins_plugin",
+        "npm",
+        "openbsd_pkg",
+        "opkg",
+        "package",
+        "pacman",
+        "pear",
+        "pip",
+        "pkg5",
+        "pkgutil",
+        "portage",
+        "slackpkg",
+        "snap",
+        "sorcery",
+        "swdepot",
+        "win_chocolatey",
+        "yarn",
+        "yum",
+        "zypper",
+    )
+)
+
+# Modules that create files; the file module only for these states, and
+# the *infile modules only with create: true
+_CREATES_FILES = frozenset(("archive", "assemble", "copy", "get_url", "template"))
+_FILE_CREATE_STATES = frozenset(("directory", "touch"))
+_CREATE_FLAG_MODULES = frozenset(("blockinfile", "lineinfile"))
+
+# Characters that only mean something to a shell
+_SHELL_CHARS = frozenset("|&;<>*?~`$\n")
+_LITERAL_COMPARE_RE = re.compile(r"(==|!=)\s*(True|False|true|false)\b")
+_NOQA_RE = re.compile(r"#\s*noqa\b:?([^#]*)")
+
+
+def register_lint_rule(rule: Type[Rule]) -> Type[Rule]:
+    """Class decorator adding a rule to the lint rule set"""
+    return register_rule(rule, LINT_RULES)
+
+
+def task_action(task: Mapping) -> Optional[Tuple[str, str, Any]]:
+    """(module key, short module name, arguments) of a task, if it has one
+
+    ``action`` and ``local_action`` resolve to the module they name, either
+    as the first word of a string or as the ``module`` key of a mapping.
+    """
+    for key, value in task.items():
+        if is_task_keyword(key) or not isinstance(key, str):
+            continue
+        if key in _ACTION_KEYS:
+            if isinstance(value, str) and value.strip():
+                key, _, rest = value.strip().partition(" ")
+                value = rest.strip() or None
+            elif isinstance(value, Mapping) and isinstance(value.get("module"), str):
+                key = value["module"]
+                value = {k: v for k, v in value.items() if k != "module"}
+            else:
+                continue
+        short = key
+        for prefix in _BUILTIN_PREFIXES:
+            if key.startswith(prefix):
+                short = key[len(prefix) :]
+        args = value
+        extra = task.get("args")
+        if isinstance(extra, Mapping):
+            args = {
+                **(value if isinstance(value, Mapping) else {"_raw_params": value}),
+                **extra,
+            }
+        return key, short, args
+    return None
+
+
+def _command_line(args: Any) -> str:
+    if isinstance(args, str):
+        return args
+    if isinstance(args, Mapping):
+        if isinstance(args.get("argv"), (list, tuple)):
+            return " ".join(str(arg) for arg in args["argv"])
+        return str(args.get("cmd") or args.get("_raw_params") or "")
+    return ""
+
+
+def _has_creates(args: Any) -> bool:
+    if isinstance(args, str):
+        return "creates=" in args or "removes=" in args
+    return isinstance(args, Mapping) and ("creates" in args or "removes" in args)
+
+
+def _truthy(value: Any) -> bool:
+    return value is True or (
+        isinstance(value, str) and value.lower() in ("yes", "true")
+    )
+
+
+class _ActionRule(Rule):
+    """Base for rules that inspect the module call of tasks and handlers"""
+
+    events = (TASK, HANDLER)
+
+    def check(self, element: Element, reporter: Reporter) -> None:
+        action = task_action(element.data)
+        if action is not None:
+            self.check_action(element, reporter, *action)
+
+    def check_action(
+        self, element: Element, reporter: Reporter, key: str, module: str, args: Any
+    ) -> None:
+        raise NotImplementedError
+
+
+@register_lint_rule
+class NameMissingRule(Rule):
+    """All tasks and handlers should be named"""
+
+    id = "name[missing]"
+    events = (TASK, HANDLER)
+
+    def check(self, element: Element, reporter: Reporter) -> None:
+        if not element.data.get("name"):
+            reporter.report(self, element, "All tasks should be named.")
+
+
+@register_lint_rule
+class NamePlayRule(Rule):
+    """All plays should be named"""
+
+    id = "name[play]"
+    events = (PLAY,)
+
+    def check(self, element: Element, reporter: Reporter) -> None:
+        if not element.data.get("name") and "import_playbook" not in element.data:
+            reporter.report(self, element, "All plays should be named.")
+
+
+@register_lint_rule
+class NameCasingRule(Rule):
+    """Names start with an uppercase letter"""
+
+    id = "name[casing]"
+    events = (PLAY, TASK, HANDLER)
+
+    def check(self, element: Element, reporter: Reporter) -> None:
+        name = element.data.get("name")
+        if isinstance(name, str) and name[:1].islower():
+            reporter.report(
+                self, element, "All names should start with an uppercase letter."
+            )
+
+
+@register_lint_rule
+class FqcnCoreRule(_ActionRule):
+    """Builtin modules are called by their fully qualified name"""
+
+    id = "fqcn[action-core]"
+
+    def check_action(
+        self, element: Element, reporter: Reporter, key: str, module: str, args: Any
+    ) -> None:
+        if key in BUILTIN_MODULES:
+            reporter.report(
+                self, element, f"Use FQCN for builtin module actions ({key})."
+            )
+
+
+@register_lint_rule
+class FqcnActionRule(_ActionRule):
+    """Collection modules are called by their fully qualified name"""
+
+    id = "fqcn[action]"
+
+    def check_action(
+        self, element: Element, reporter: Reporter, key: str, module: str, args: Any
+    ) -> None:
+        if "." in key or key in BUILTIN_MODULES:
+            return
+        if key in COLLECTION_MODULES:
+            reporter.report(
+                self,
+                element,
+                f"Use FQCN for module actions, such `{COLLECTION_MODULES[key]}`.",
+            )
+        else:
+            reporter.report(self, element, f"Use FQCN for module actions ({key}).")
+
+
+@register_lint_rule
+class NoChangedWhenRule(_ActionRule):
+    """Commands declare when they changed something"""
+
+    id = "no-changed-when"
+
+    def check_action(
+        self, element: Element, reporter: Reporter, key: str, module: str, args: Any
+    ) -> None:
+        if module not in COMMAND_MODULES or module == "script":
+            return
+        if "changed_when" in element.data or _has_creates(args):
+            return
+        reporter.report(
+            self, element, "Commands should not change things if nothing needs doing."
+        )
+
+
+@register_lint_rule
+class CommandInsteadOfModuleRule(_ActionRule):
+    """Commands with a dedicated module use the module"""
+
+    id = "command-instead-of-module"
+
+    def check_action(
+        self, element: Element, reporter: Reporter, key: str, module: str, args: Any
+    ) -> None:
+        if module not in ("command", "shell"):
+            return
+        words = _command_line(args).split()
+        if not words:
+            return
+        executable = words[0].rsplit("/", 1)[-1]
+        replacement = COMMAND_REPLACEMENTS.get(executable)
+        if replacement is None:
+            return
+        if len(words) > 1 and words[1] in COMMAND_EXCEPTIONS.get(executable, ()):
+            return
+        reporter.report(
+            self, element, f"{executable} used in place of {replacement} module"
+        )
+
+
+@register_lint_rule
+class CommandInsteadOfShellRule(_ActionRule):
+    """The shell module is only used for shell features"""
+
+    id = "command-instead-of-shell"
+
+    def check_action(
+        self, element: Element, reporter: Reporter, key: str, module: str, args: Any
+    ) -> None:
+        if module != "shell":
+            return
+        if isinstance(args, Mapping) and "executable" in args:
+            return
+        command = _command_line(args)
+        if command and "{{" not in command and _SHELL_CHARS.isdisjoint(command):
+            reporter.report(
+                self, element, "Use shell only when shell functionality is required."
+            )
+
+
+@register_lint_rule
+class RiskyFilePermissionsRule(_ActionRule):
+    """Modules that create files set their mode"""
+
+    id = "risky-file-permissions"
+
+    def check_action(
+        self, element: Element, reporter: Reporter, key: str, module: str, args: Any
+    ) -> None:
+        if not isinstance(args, Mapping) or "mode" in args:
+            return
+        if module == "file":
+            creates = args.get("state") in _FILE_CREATE_STATES
+        elif module in _CREATE_FLAG_MODULES:
+            creates = _truthy(args.get("create"))
+        else:
+            creates = module in _CREATES_FILES
+        if creates:
+            reporter.report(self, element, "File permissions unset or incorrect.")
+
+
+@register_lint_rule
+class PackageLatestRule(_ActionRule):
+    """Package installs pin a version instead of using latest"""
+
+    id = "package-latest"
+
+    def check_action(
+        self, element: Element, reporter: Reporter, key: str, module: str, args: Any
+    ) -> None:
+        if module not in PACKAGE_MODULES or not isinstance(args, Mapping):
+            return
+        if (
+            args.get("state") != "latest"
+            or _truthy(args.get("update_only"))
+            or _truthy(args.get("only_upgrade"))
+        ):
+            return
+        reporter.report(self, element, "Package installs should not use latest.")
+
+
+@register_lint_rule
+class IgnoreErrorsRule(Rule):
+    """Errors are described with failed_when rather than ignored"""
+
+    id = "ignore-errors"
+    events = (TASK, HANDLER)
+
+    def check(self, element: Element, reporter: Reporter) -> None:
+        if _truthy(element.data.get("ignore_errors")):
+            reporter.report(
+                self,
+                element,
+                "Use failed_when and specify error conditions instead of using ignore_errors.",
+            )
+
+
+@register_lint_rule
+class NoJinjaWhenRule(Rule):
+    """Conditions are bare expressions without {{ }}"""
+
+    id = "no-jinja-when"
+    events = (PLAY, TASK, HANDLER)
+
+    def check(self, element: Element, reporter: Reporter) -> None:
+        when = element.data.get("when")
+        conditions = when if isinstance(when, (list, tuple)) else (when,)
+        if any(isinstance(c, str) and "{{" in c for c in conditions):
+            reporter.report(self, element, "No Jinja2 in when.")
+
+
+@register_lint_rule
+class LiteralCompareRule(Rule):
+    """Conditions do not compare to True or False"""
+
+    id = "literal-compare"
+    events = (TASK, HANDLER)
+
+    def check(self, element: Element, reporter: Reporter) -> None:
+        when = element.data.get("when")
+        conditions = when if isinstance(when, (list, tuple)) else (when,)
+        if any(
+            isinstance(c, str) and _LITERAL_COMPARE_RE.search(c) for c in conditions
+        ):
+            reporter.report(self, element, "Don't compare to literal True/False.")
+
+
+@register_lint_rule
+class PartialBecomeRule(Rule):
+    """become_user comes with become on the task or its play"""
+
+    id = "partial-become"
+    events = (PLAY, TASK, HANDLER)
+
+    def check(self, element: Element, reporter: Reporter) -> None:
+        data = element.data
+        if "become_user" not in data or "become" in data or "become" in element.play:
+            return
+        reporter.report(
+            self,
+            element,
+            "become_user should have a corresponding become at the play or task level.",
+        )
+
+
+@register_lint_rule
+class KeyOrderRule(Rule):
+    """Task keys start with name"""
+
+    id = "key-order[task]"
+    events = (TASK, HANDLER)
+
+    def check(self, element: Element, reporter: Reporter) -> None:
+        data = element.data
+        if "name" in data and next(iter(data)) != "name":
+            reporter.report(
+                self, element, "You can improve the task key order to: name first."
+            )
+
+
+class PlaybookLinter:
+    """Lints playbooks with the registered lint rules in one traversal"""
+
+    def __init__(
+        self, skip: Iterable[str] = (), rules: Optional[Iterable[Rule]] = None
+    ):
+        skip = frozenset(skip)
+        if rules is None:
+            rules = [rule() for rule in LINT_RULES.values()]
+        self.validator = PlaybookValidator(
+            [rule for rule in rules if rule.id not in skip]
+        )
+
+    @property
+    def rules(self) -> Tuple[Rule, ...]:
+        return self.validator.rules
+
+    def lint(self, playbook: Any) -> ValidationResult:
+        """Lint playbook text or parsed data; issues carry ansible-lint rule ids"""
+        result = self.validator.validate(playbook)
+        for idx, issue in enumerate(result.issues):
+            if issue.rule in _RENAMED:
+                result.issues[idx] = replace(issue, rule=_RENAMED[issue.rule])
+        if isinstance(playbook, str) and "noqa" in playbook:
+            result.issues = _without_noqa(result.issues, playbook.splitlines())
+        return result
+
+    def lint_file(self, path: str) -> ValidationResult:
+        with open(path, encoding="utf-8") as handle:
+            return self.lint(handle.read())
+
+
+def _without_noqa(issues: List[Any], lines: List[str]) -> List[Any]:
+    """Drop issues on lines with "# noqa" or "# noqa: <their rule>" """
+    kept = []
+    for issue in issues:
+        match = None
+        if issue.line is not None and issue.line <= len(lines):
+            match = _NOQA_RE.search(lines[issue.line - 1])
+        if match is None:
+            kept.append(issue)
+            continue
+        rules = match.group(1).split()
+        if rules and issue.rule not in rules:
+            kept.append(issue)
+    return kept
+
+
+def format_issue(path: str, issue: Any) -> str:
+    """An issue in the parseable "path:line:column: rule: message" form"""
+    line = issue.line if issue.line is not None else 1
+    column = issue.column if issue.column is not None else 1
+    return f"{path}:{line}:{column}: {issue.rule}: {issue.message}"
+
+
+def _lint_request(linter: PlaybookLinter, request: Mapping[str, Any]) -> Dict[str, Any]:
+    try:
+        if "content" in request:
+            result = linter.lint(request["content"])
+        else:
+            result = linter.lint_file(request["path"])
+    except (OSError, UnicodeDecodeError) as e:
+        return {"id": request.get("id"), "error": str(e)}
+    return {
+        "id": request.get("id"),
+        "issues": [issue.to_dict() for issue in result.issues],
+    }
+
+
+def serve(linter: PlaybookLinter, requests: Iterable[str], out: Any) -> None:
+    """Answer JSON requests ({"path": ...} or {"content": ...}), one per line"""
+    for line in requests:
+        if not line.strip():
+            continue
+        try:
+            response = _lint_request(linter, json.loads(line))
+        except (ValueError, KeyError, TypeError) as e:
+            response = {"error": f"Invalid request: {e}"}
+        out.write(json.dumps(response) + "\n")
+        out.flush()
+
+
+def main():
+    """Lint playbook files, exiting with 2 on violations like ansible-lint"""
+    parser = argparse.ArgumentParser(
+        description="Lint playbooks with the native ansible-lint rules"
+    )
+    parser.add_argument("paths", nargs="*", help="playbook files")
+    parser.add_argument("--format", choices=("pep8", "json"), default="pep8")
+    parser.add_argument(
+        "--skip", action="append", default=[], help="rule id to skip, repeatable"
+    )
+    parser.add_argument(
+        "--serve", action="store_true", help="lint JSON requests read from stdin"
+    )
+    args = parser.parse_args()
+
+    linter = PlaybookLinter(skip=args.skip)
+    if args.serve:
+        serve(linter, sys.stdin, sys.stdout)
+        return
+
+    found: List[Tuple[str, Any]] = []
+    for path in args.paths:
+        found.extend((path, issue) for issue in linter.lint_file(path).issues)
+    if args.format == "json":
+        json.dump(
+            [{"path": path, **issue.to_dict()} for path, issue in found],
+            sys.stdout,
+            indent=2,
+        )
+        print()
+    else:
+        for path, issue in found:
+            print(format_issue(path, issue))
+    sys.exit(2 if found else 0)
+
+
+if __name__ == "__main__":
+    main()
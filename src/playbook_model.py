@@ -0,0 +1,84 @@
+"""
+Immutable playbook document model
+
+Parsed templates are frozen once and shared by every request. Enhancements
+never mutate a shared node: they build a new node for each container on the
+path they change and reuse everything else, so the cost of a ``generate()``
+call scales with the size of the change rather than the size of the template.
+"""
+
+from typing import Any, Iterable, Mapping, Sequence, Tuple
+
+
+class FrozenDict(dict):
+    """Read-only mapping used for shared playbook nodes"""
+
+    __slots__ = ()
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError(f"{type(self).__name__} is immutable")
+
+    __setitem__ = _immutable
+    __delitem__ = _immutable
+    __ior__ = _immutable
+    clear = _immutable
+    pop = _immutable
+    popitem = _immutable
+    setdefault = _immutable
+    update = _immutable
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+# A playbook is a sequence of plays; every node below it is frozen
+Playbook = Tuple[FrozenDict, ...]
+
+
+def freeze(data: Any) -> Any:
+    """Recursively convert dicts and lists into shareable immutable nodes"""
+    if isinstance(data, FrozenDict):
+        return data
+    if isinstance(data, dict):
+        return FrozenDict((key, freeze(value)) for key, value in data.items())
+    if isinstance(data, (list, tuple)):
+        return tuple(freeze(item) for item in data)
+    return data
+
+
+def thaw(data: Any) -> Any:
+    """Recursively convert frozen nodes back into plain dicts and lists"""
+    if isinstance(data, dict):
+        return {key: thaw(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [thaw(item) for item in data]
+    return data
+
+
+def with_value(mapping: Mapping, key: str, value: Any) -> FrozenDict:
+    """Return a copy of ``mapping`` with ``key`` set, keeping key order"""
+    items = dict(mapping)
+    items[key] = freeze(value)
+    return FrozenDict(items)
+
+
+def with_appended(mapping: Mapping, key: str, items: Iterable[Any]) -> FrozenDict:
+    """Return a copy of ``mapping`` with ``items`` appended to the list at ``key``
+
+    The existing list elements are shared; a missing key is added at the end.
+    """
+    current = mapping.get(key, ())
+    return with_value(mapping, key, tuple(current) + tuple(freeze(i) for i in items))
+
+
+def with_item(sequence: Sequence, index: int, value: Any) -> Tuple:
+    """Return a copy of ``sequence`` with the element at ``index`` replaced"""
+    items = list(sequence)
+    items[index] = freeze(value)
+    return tuple(items)
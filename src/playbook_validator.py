@@ -0,0 +1,496 @@
+"""
+Playbook validation
+
+``PlaybookValidator.validate`` accepts playbook text or an already parsed
+structure. Text is composed once into a YAML node tree and constructed from
+that same parse; syntax errors and structure checks are then reported as
+ValidationIssue objects in one pass over the plays. Issues found in text
+carry the line and column of the offending node, and every issue carries
+its path in the document, e.g. ``[0].tasks[2]``.
+
+Structure checks are Rule subclasses registered with @register_rule. A
+single traversal visits every play, task, handler and block, including the
+tasks nested in ``block``/``rescue``/``always``, and hands each element to
+the rules subscribed to its kind. Rules subscribed to ``source`` see the
+raw text instead, before it is parsed; the hardcoded-secret rule scans it
+with ``secret_scanner``.
+"""
+
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
+
+from yaml.nodes import MappingNode, Node, SequenceNode
+
+try:
+    from . import yaml_backend
+    from .secret_scanner import default_scanner
+except ImportError:  # executed directly as a script
+    import yaml_backend
+    from secret_scanner import default_scanner
+
+ERROR = "error"
+WARNING = "warning"
+
+# Element kinds rules can subscribe to; a source element is the playbook
+# text, seen once per validate() call given text
+PLAY, TASK, HANDLER, BLOCK, SOURCE = "play", "task", "handler", "block", "source"
+EVENTS = (PLAY, TASK, HANDLER, BLOCK, SOURCE)
+
+# Play keys holding task lists, with the kind of their elements
+PLAY_SECTIONS = (
+    ("pre_tasks", TASK),
+    ("tasks", TASK),
+    ("post_tasks", TASK),
+    ("handlers", HANDLER),
+)
+BLOCK_KEYS = ("block", "rescue", "always")
+BLOCK_SECTIONS = frozenset(BLOCK_KEYS)
+
+# Task keys that are not action modules; every with_<lookup> key is a loop
+# keyword too, see is_task_keyword
+TASK_KEYWORDS = frozenset(
+    (
+        "name",
+        "tags",
+        "when",
+        "register",
+        "delegate_to",
+        "delegate_facts",
+        "become",
+        "become_user",
+        "become_method",
+        "become_flags",
+        "become_exe",
+        "vars",
+        "notify",
+        "listen",
+        "loop",
+        "loop_control",
+        "block",
+        "rescue",
+        "always",
+        "environment",
+        "changed_when",
+        "failed_when",
+        "ignore_errors",
+        "ignore_unreachable",
+        "until",
+        "retries",
+        "delay",
+        "run_once",
+        "no_log",
+        "args",
+        "check_mode",
+        "diff",
+        "any_errors_fatal",
+        "async",
+        "poll",
+        "throttle",
+        "timeout",
+        "collections",
+        "module_defaults",
+        "connection",
+        "remote_user",
+        "port",
+        "debugger",
+    )
+)
+
+
+def is_task_keyword(key: Any) -> bool:
+    """True for task keys that are not action modules"""
+    return key in TASK_KEYWORDS or (isinstance(key, str) and key.startswith("with_"))
+
+
+# Keys and list indexes leading from the document root to a node
+Path = Tuple[Union[str, int], ...]
+
+
+@dataclass(frozen=True)
+class ValidationIssue:
+    """One problem found in a playbook"""
+
+    severity: str
+    message: str
+    path: Path = ()
+    # 1-based position of the node in the source text, if validated as text
+    line: Optional[int] = None
+    column: Optional[int] = None
+    # Id of the rule that reported it: a registered rule, "syntax" or "structure"
+    rule: Optional[str] = None
+
+    @property
+    def location(self) -> str:
+        if self.line is not None:
+            return f"line {self.line}, column {self.column}"
+        return format_path(self.path)
+
+    def __str__(self) -> str:
+        location = self.location
+        return f"{location}: {self.message}" if location else self.message
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "severity": self.severity,
+            "message": self.message,
+            "path": list(self.path),
+            "line": self.line,
+            "column": self.column,
+            "rule": self.rule,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "ValidationIssue":
+        return cls(
+            data["severity"],
+            data["message"],
+            tuple(data.get("path", ())),
+            data.get("line"),
+            data.get("column"),
+            data.get("rule"),
+        )
+
+
+@dataclass
+class ValidationResult:
+    """Parsed playbook data and the issues found in it"""
+
+    data: Any = None
+    issues: List[ValidationIssue] = field(default_factory=list)
+
+    @property
+    def valid(self) -> bool:
+        """True unless an error was found; warnings do not count"""
+        return not self.errors
+
+    @property
+    def errors(self) -> List[ValidationIssue]:
+        return [issue for issue in self.issues if issue.severity == ERROR]
+
+    @property
+    def warnings(self) -> List[ValidationIssue]:
+        return [issue for issue in self.issues if issue.severity == WARNING]
+
+
+def format_path(path: Path) -> str:
+    """``(0, "tasks", 2)`` as ``[0].tasks[2]``"""
+    parts = []
+    for key in path:
+        parts.append(f"[{key}]" if isinstance(key, int) else f".{key}")
+    return "".join(parts).lstrip(".")
+
+
+def _child(node: Optional[Node], key: Union[str, int]) -> Optional[Node]:
+    """Node at a mapping key or sequence index, or None"""
+    if isinstance(node, MappingNode):
+        for key_node, value_node in node.value:
+            if key_node.value == key:
+                return value_node
+    elif (
+        isinstance(node, SequenceNode)
+        and isinstance(key, int)
+        and key < len(node.value)
+    ):
+        return node.value[key]
+    return None
+
+
+class Element:
+    """A play, task, handler, block or source text as seen by the rules"""
+
+    __slots__ = ("kind", "data", "path", "node", "play")
+
+    def __init__(
+        self,
+        kind: str,
+        data: Any,
+        path: Path,
+        node: Optional[Node],
+        play: Optional[Mapping],
+    ):
+        self.kind = kind
+        self.data = data
+        self.path = path
+        # YAML node of the element when validating text, else None
+        self.node = node
+        self.play = play
+
+
+class Reporter:
+    """Collects issues, positioned by the element or node they refer to"""
+
+    def __init__(self):
+        self.issues: List[ValidationIssue] = []
+
+    def add(
+        self,
+        severity: str,
+        message: str,
+        path: Path,
+        node: Optional[Node],
+        rule: Optional[str] = None,
+    ) -> None:
+        line = column = None
+        if node is not None:
+            line, column = node.start_mark.line + 1, node.start_mark.column + 1
+        self.issues.append(ValidationIssue(severity, message, path, line, column, rule))
+
+    def report(self, rule: "Rule", element: Element, message: str) -> None:
+        self.add(rule.severity, message, element.path, element.node, rule.id)
+
+    def report_at(self, rule: "Rule", line: int, column: int, message: str) -> None:
+        """Report an issue at a position in the source text"""
+        self.issues.append(
+            ValidationIssue(rule.severity, message, (), line, column, rule.id)
+        )
+
+
+class Rule:
+    """A validation check run on the elements of the kinds in ``events``
+
+    Subclasses set ``id`` and ``events`` and implement ``check``; register
+    them with @register_rule to include them in the default rule set.
+    """
+
+    id = ""
+    severity = WARNING
+    events: Tuple[str, ...] = ()
+
+    def check(self, element: Element, reporter: Reporter) -> None:
+        raise NotImplementedError
+
+
+# Rule id -> rule class, in registration order
+RULES: Dict[str, Type[Rule]] = {}
+
+
+def register_rule(
+    rule: Type[Rule], registry: Optional[Dict[str, Type[Rule]]] = None
+) -> Type[Rule]:
+    """Class decorator adding a rule to the default rule set, or to ``registry``"""
+    if not rule.id:
+        raise ValueError(f"Rule {rule.__name__} has no id")
+    unknown = set(rule.events) - set(EVENTS)
+    if unknown:
+        raise ValueError(
+            f"Rule {rule.id} subscribes to unknown events: {', '.join(sorted(unknown))}"
+        )
+    (RULES if registry is None else registry)[rule.id] = rule
+    return rule
+
+
+@register_rule
+class PlayHostsRule(Rule):
+    """Plays name their target hosts"""
+
+    id = "play-hosts"
+    events = (PLAY,)
+
+    def check(self, element: Element, reporter: Reporter) -> None:
+        if "hosts" not in element.data:
+            reporter.report(self, element, "Play missing 'hosts' field")
+
+
+@register_rule
+class PlayTasksRule(Rule):
+    """Plays do something: tasks or roles"""
+
+    id = "play-tasks"
+    events = (PLAY,)
+
+    def check(self, element: Element, reporter: Reporter) -> None:
+        if "tasks" not in element.data and "roles" not in element.data:
+            reporter.report(self, element, "Play has neither 'tasks' nor 'roles'")
+
+
+@register_rule
+class TaskNameRule(Rule):
+    """Tasks and handlers are named"""
+
+    id = "task-name"
+    events = (TASK, HANDLER)
+
+    def check(self, element: Element, reporter: Reporter) -> None:
+        if "name" not in element.data:
+            reporter.report(
+                self, element, f"{element.kind.capitalize()} missing 'name' field"
+            )
+
+
+@register_rule
+class TaskActionRule(Rule):
+    """Tasks and handlers call a module"""
+
+    id = "task-action"
+    events = (TASK, HANDLER)
+
+    def check(self, element: Element, reporter: Reporter) -> None:
+        if all(is_task_keyword(key) for key in element.data):
+            name = element.data.get("name", element.path[-1] + 1)
+            reporter.report(
+                self,
+                element,
+                f"{element.kind.capitalize()} '{name}' has no action module",
+            )
+
+
+@register_rule
+class HardcodedSecretRule(Rule):
+    """Playbook text holds no credentials outside Jinja expressions"""
+
+    id = "hardcoded-secret"
+    events = (SOURCE,)
+
+    def check(self, element: Element, reporter: Reporter) -> None:
+        for finding in default_scanner().scan(element.data):
+            reporter.report_at(
+                self,
+                finding.line,
+                finding.column,
+                f"Potential hardcoded secret: {finding.type}",
+            )
+
+
+class PlaybookValidator:
+    """Validates playbooks with a set of rules in a single traversal
+
+    Each element is visited once and handed to the rules subscribed to its
+    kind, so the cost is one pass over the document whatever the rule count.
+    """
+
+    def __init__(self, rules: Optional[Iterable[Rule]] = None):
+        if rules is None:
+            rules = [rule() for rule in RULES.values()]
+        self.rules = tuple(rules)
+        self._dispatch: Dict[str, Tuple[Callable[[Element, Reporter], None], ...]] = {
+            event: tuple(rule.check for rule in self.rules if event in rule.events)
+            for event in EVENTS
+        }
+
+    def validate(self, playbook: Any) -> ValidationResult:
+        """Check playbook text or parsed data for syntax and structure issues
+
+        Text is parsed once; parsed data (e.g. a freshly built playbook) is
+        checked as is, without serializing and parsing it again.
+        """
+        reporter = Reporter()
+        node = None
+        if isinstance(playbook, str):
+            if self._dispatch[SOURCE]:
+                self._emit(Element(SOURCE, playbook, (), None, None), reporter)
+            try:
+                node, playbook = yaml_backend.compose(playbook)
+            except yaml_backend.YAMLError as e:
+                mark = getattr(e, "problem_mark", None)
+                line = column = None
+                if mark is not None:
+                    line, column = mark.line + 1, mark.column + 1
+                reporter.issues.insert(
+                    0, ValidationIssue(ERROR, str(e), (), line, column, "syntax")
+                )
+                return ValidationResult(None, reporter.issues)
+
+        if not isinstance(playbook, (list, tuple)):
+            reporter.add(
+                ERROR, "Playbook must be a list of plays", (), node, "structure"
+            )
+            return ValidationResult(playbook, reporter.issues)
+        for idx, play in enumerate(playbook):
+            self._visit_play(play, (idx,), _child(node, idx), reporter)
+        return ValidationResult(playbook, reporter.issues)
+
+    def _emit(self, element: Element, reporter: Reporter) -> None:
+        for check in self._dispatch[element.kind]:
+            check(element, reporter)
+
+    def _visit_play(
+        self, play: Any, path: Path, node: Optional[Node], reporter: Reporter
+    ) -> None:
+        if not isinstance(play, Mapping):
+            reporter.add(ERROR, "Play must be a mapping", path, node, "structure")
+            return
+        self._emit(Element(PLAY, play, path, node, play), reporter)
+        for section, kind in PLAY_SECTIONS:
+            if play.get(section):
+                self._visit_tasks(
+                    play[section],
+                    kind,
+                    path + (section,),
+                    _child(node, section),
+                    play,
+                    reporter,
+                )
+
+    def _visit_tasks(
+        self,
+        tasks: Any,
+        kind: str,
+        path: Path,
+        node: Optional[Node],
+        play: Mapping,
+        reporter: Reporter,
+    ) -> None:
+        if not isinstance(tasks, (list, tuple)):
+            reporter.add(ERROR, f"'{path[-1]}' must be a list", path, node, "structure")
+            return
+        checks = self._dispatch[kind]
+        task_nodes = node.value if isinstance(node, SequenceNode) else None
+        for idx, task in enumerate(tasks):
+            task_path = path + (idx,)
+            task_node = task_nodes[idx] if task_nodes is not None else None
+            if not isinstance(task, Mapping):
+                reporter.add(
+                    ERROR,
+                    f"{kind.capitalize()} must be a mapping",
+                    task_path,
+                    task_node,
+                    "structure",
+                )
+                continue
+            if BLOCK_SECTIONS.isdisjoint(task):
+                if checks:
+                    element = Element(kind, task, task_path, task_node, play)
+                    for check in checks:
+                        check(element, reporter)
+                continue
+            self._emit(Element(BLOCK, task, task_path, task_node, play), reporter)
+            for section in BLOCK_KEYS:
+                if task.get(section):
+                    self._visit_tasks(
+                        task[section],
+                        kind,
+                        task_path + (section,),
+                        _child(task_node, section),
+                        play,
+                        reporter,
+                    )
+
+    @staticmethod
+    def validate_syntax(playbook_content: str) -> Dict[str, Any]:
+        """Validate playbook YAML syntax"""
+        try:
+            data = yaml_backend.load(playbook_content)
+            return {"valid": True, "data": data}
+        except yaml_backend.YAMLError as e:
+            return {"valid": False, "error": str(e)}
+
+    @staticmethod
+    def validate_structure(playbook_data: List[Dict]) -> List[str]:
+        """Validate playbook structure and return warnings
+
+        Prefer validate(), which also reports where each problem is.
+        """
+        return [
+            str(issue) for issue in PlaybookValidator().validate(playbook_data).warnings
+        ]
@@ -0,0 +1,620 @@
+"""
+Single-pass prompt analysis
+
+The prompt is tokenized once into ``\\w+`` runs. Whole-word keywords (playbook
+types and requirements) are dictionary lookups on the lowercased tokens;
+keywords written as ``first.?second`` also match a token pair separated by a
+single character. Substring keywords (environment, tags and custom actions)
+are found with an Aho-Corasick automaton run over each distinct token. Both
+lookups are memoized per token, so analysis cost is linear in the prompt
+length regardless of the size of the keyword lexicon.
+
+The lexicon reproduces the regular expressions previously used by
+``PlaybookGenerator.analyze_prompt``: ``\\b(...)\\b`` alternations matched
+case-insensitively, and plain substring tests on ``prompt.lower()``.
+
+Prompts come from untrusted clients. The only regular expression run over
+them is the tokenizer, which is in the linear-time subset accepted by
+``linear_regex.check_linear``; tokens too long for any whole-word keyword
+skip the lookups and the token cache, and prompts longer than
+CACHED_PROMPT_LENGTH bypass the scan caches, so the memory those caches
+retain is bounded. Hardened mode (``max_prompt_length``) additionally
+rejects oversized prompts with PromptTooLargeError, bounding the latency of
+one analysis.
+"""
+
+import re
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+try:
+    from .linear_regex import check_linear
+except ImportError:  # executed directly as a script
+    from linear_regex import check_linear
+
+# Whole-word keywords per playbook type, in detection priority order
+TYPE_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "kubernetes": (
+        "k8s",
+        "kubernetes",
+        "kubectl",
+        "pod",
+        "deployment",
+        "service",
+        "ingress",
+    ),
+    "docker": ("docker", "container", "compose", "dockerfile", "registry"),
+    "database": ("mysql", "postgres", "mongodb", "redis", "database", "db"),
+    "monitoring": ("prometheus", "grafana", "monitoring", "metrics", "alerts"),
+    "security": ("security", "firewall", "ssh", "tls", "certificate", "vault"),
+    "network": ("network", "routing", "dns", "load.?balanc", "nginx", "haproxy"),
+}
+
+# Whole-word keywords per requirement, in REQUIREMENT_ORDER
+REQUIREMENT_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "high_availability": ("high.?availability", "ha", "redundant", "failover"),
+    "scalability": ("scalabl", "scalebl", "auto.?scal", "elastic"),
+    "security": ("secur", "encrypt", "tls", "ssl", "firewall"),
+    "monitoring": ("monitor", "metric", "log", "observ"),
+    "backup": ("backup", "restore", "disaster.?recovery"),
+    "performance": ("perform", "optimiz", "cache", "fast"),
+}
+
+# Substring keywords per environment, checked in order
+ENVIRONMENT_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "production": ("production",),
+    "staging": ("staging",),
+    "development": ("development", "dev"),
+}
+
+# Substring keyword -> tags it adds; "setup" is always present
+TAG_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "install": ("install", "setup"),
+    "configure": ("configure", "config"),
+    "deploy": ("deploy", "rollout"),
+    "update": ("update", "upgrade"),
+    "backup": ("backup",),
+    "restore": ("restore",),
+    "monitor": ("monitoring",),
+    "secure": ("security",),
+}
+BASE_TAGS = ("setup",)
+
+# Substring keywords that trigger the custom-task stage
+ACTION_KEYWORDS = ("install", "configure", "deploy")
+
+_TOKEN_RE = re.compile(r"\w+")
+_GAP = ".?"
+
+# Shortest type keyword matched with typos; shorter words have too many
+# everyday neighbours ("vault"/"fault", "redis"/"redid")
+TYPO_MIN_LENGTH = 6
+
+# Shortest words, keyword and token, whose typos may substitute a letter or
+# take a second edit; in shorter words a substituted letter too often spells
+# another word ("postures"/"postgres", "decker"/"docker")
+TYPO_LONG_LENGTH = 10
+
+# Prompt size limit suggested for hardened mode, in characters
+HARDENED_MAX_PROMPT_LENGTH = 64 * 1024
+
+# Longest prompt kept as a cache key, in characters; longer prompts are
+# analyzed uncached, so a cache holds at most maxsize * this many characters
+CACHED_PROMPT_LENGTH = 1024
+
+
+def cache_short_prompts(
+    func: Callable[..., Any], maxsize: int, max_length: int = CACHED_PROMPT_LENGTH
+) -> Callable[..., Any]:
+    """``lru_cache(maxsize)(func)`` for prompts of up to ``max_length`` characters
+
+    ``func`` takes the prompt as its first argument. The wrapper keeps
+    ``cache_info`` and ``cache_clear``.
+    """
+    cached = lru_cache(maxsize=maxsize)(func)
+
+    def call(prompt: str, *args: Any) -> Any:
+        if len(prompt) > max_length:
+            return func(prompt, *args)
+        return cached(prompt, *args)
+
+    call.cache_info = cached.cache_info
+    call.cache_clear = cached.cache_clear
+    return call
+
+
+class PromptTooLargeError(ValueError):
+    """Raised in hardened mode for prompts over the size limit"""
+
+
+@dataclass(frozen=True)
+class PromptAnalysis:
+    """Everything the generator derives from a prompt"""
+
+    # Matched playbook type names in priority order
+    types: Tuple[str, ...]
+    # (type feature index, occurrences) pairs, see PromptAnalyzer.type_features
+    type_hits: Tuple[Tuple[int, int], ...]
+    environment: Optional[str]
+    requirements: Tuple[str, ...]
+    tags: Tuple[str, ...]
+    actions: Tuple[str, ...]
+
+    @property
+    def playbook_type(self) -> Optional[str]:
+        return self.types[0] if self.types else None
+
+
+class AhoCorasick:
+    """Multi-pattern substring matcher over a fixed keyword set"""
+
+    def __init__(self, keywords: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[FrozenSet[str]] = [frozenset()]
+
+        for keyword in keywords:
+            state = 0
+            for char in keyword:
+                nxt = self._goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(frozenset())
+                state = nxt
+            self._out[state] = self._out[state] | {keyword}
+
+        # Breadth-first failure links; outputs include those of the fallback
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] | self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> FrozenSet[str]:
+        """Every keyword occurring in ``text``"""
+        goto, fail, out = self._goto, self._fail, self._out
+        found: Set[str] = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found.update(out[state])
+        return frozenset(found)
+
+
+def osa_distance(left: str, right: str, limit: Optional[int] = None) -> int:
+    """Optimal string alignment distance: edits plus adjacent transpositions
+
+    With ``limit``, only the diagonal band that can stay within it is
+    computed, and any distance above it is reported as ``limit + 1``.
+    """
+    band = max(len(left), len(right)) if limit is None else limit
+    over = band + 1
+    if abs(len(left) - len(right)) > band:
+        return over
+    previous2: List[int] = []
+    previous = [j if j <= band else over for j in range(len(right) + 1)]
+    for i, left_char in enumerate(left, 1):
+        current = [over] * (len(right) + 1)
+        if i <= band:
+            current[0] = i
+        row_min = current[0]
+        for j in range(max(1, i - band), min(len(right), i + band) + 1):
+            right_char = right[j - 1]
+            value = previous[j - 1] + (left_char != right_char)
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if (
+                i > 1
+                and j > 1
+                and left_char == right[j - 2]
+                and left[i - 2] == right_char
+                and previous2[j - 2] + 1 < value
+            ):
+                value = previous2[j - 2] + 1
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > band:
+            return over
+        previous2, previous = previous, current
+    return min(previous[-1], over)
+
+
+# Stands for a substituted character; never part of a \w token
+_BLANK = "\0"
+
+
+class TypoIndex:
+    """Precomputed index for typo-tolerant keyword lookup
+
+    A token is read as a misspelled keyword only when the difference looks
+    like a slip rather than another word: the first letter is right, a
+    short word differs by one insertion, deletion or adjacent swap, and
+    only words of at least ``long_length`` characters may substitute a
+    letter or take two edits. Letters appended to a keyword make another
+    form of the word ("services", "composed") unless they repeat its last
+    letter ("postgress").
+
+    Single edits are found without computing any distance. Every keyword
+    maps its one-character deletions and adjacent swaps, and long keywords
+    themselves with each position blanked out (substitutions), back to the
+    keyword; a lookup probes the token itself, the token with each position
+    blanked out, and the token's one-character deletions (insertions).
+    Long keywords are also indexed by their bigrams. Each edit destroys at
+    most three bigrams, so only keywords sharing enough bigrams with the
+    token are candidates, and a bounded OSA distance confirms them. A
+    lookup costs a number of probes that depends on the token's length,
+    which is capped, and not on the number of keywords; tokens outside
+    every keyword's length range are rejected up front.
+    """
+
+    def __init__(
+        self,
+        keywords: Iterable[str],
+        min_length: int = TYPO_MIN_LENGTH,
+        long_length: int = TYPO_LONG_LENGTH,
+    ):
+        self.min_length = min_length
+        self.long_length = long_length
+        self._keywords = frozenset(kw for kw in keywords if len(kw) >= min_length)
+        # one edit away (deleted or swapped, or blanked) -> keywords
+        self._single: Dict[str, Tuple[str, ...]] = {}
+        # bigram -> keywords tolerating two edits that contain it
+        self._bigrams: Dict[str, Tuple[str, ...]] = {}
+        for keyword in sorted(self._keywords):
+            for key in self._single_edits(keyword):
+                self._single[key] = self._single.get(key, ()) + (keyword,)
+            if self.max_distance(keyword) > 1:
+                for bigram in {keyword[i : i + 2] for i in range(len(keyword) - 1)}:
+                    self._bigrams[bigram] = self._bigrams.get(bigram, ()) + (keyword,)
+        self._lengths = frozenset(
+            length
+            for keyword in self._keywords
+            for length in range(len(keyword) - 1, len(keyword) + 2)
+        )
+        self._double_lengths = frozenset(
+            length
+            for keyword in self._keywords
+            if self.max_distance(keyword) > 1
+            for length in range(len(keyword) - 2, len(keyword) + 3)
+            if length >= long_length
+        )
+
+    def max_distance(self, keyword: str) -> int:
+        """Edits tolerated for a keyword: one, or two for long keywords"""
+        return 1 if len(keyword) < self.long_length else 2
+
+    def _single_edits(self, keyword: str) -> Set[str]:
+        """Deletions, adjacent swaps and, if long, blanked forms of ``keyword``"""
+        edits = set()
+        for i in range(len(keyword)):
+            edits.add(keyword[:i] + keyword[i + 1 :])
+            if len(keyword) >= self.long_length:
+                edits.add(keyword[:i] + _BLANK + keyword[i + 1 :])
+            if i and keyword[i - 1] != keyword[i]:
+                edits.add(
+                    keyword[: i - 1] + keyword[i] + keyword[i - 1] + keyword[i + 1 :]
+                )
+        return edits
+
+    @staticmethod
+    def _slip(token: str, keyword: str) -> bool:
+        """Whether ``token`` may be a slip for ``keyword`` rather than a word"""
+        if token[0] != keyword[0]:
+            return False
+        if len(token) > len(keyword) and token.startswith(keyword):
+            return not token[len(keyword) :].strip(keyword[-1])
+        return True
+
+    def lookup(self, token: str) -> Tuple[str, ...]:
+        """Keywords nearest to ``token`` within their distance, nearest first"""
+        length = len(token)
+        if length in self._lengths:
+            single, keywords = self._single, self._keywords
+            found = set(single.get(token, ()))
+            blanks = length >= self.long_length
+            for i in range(length):
+                if blanks:
+                    found.update(single.get(token[:i] + _BLANK + token[i + 1 :], ()))
+                deleted = token[:i] + token[i + 1 :]
+                if deleted in keywords:
+                    found.add(deleted)
+            found.discard(token)
+            found = {keyword for keyword in found if self._slip(token, keyword)}
+            if found:
+                return tuple(sorted(found))
+        if length not in self._double_lengths:
+            return ()
+        # Two edits destroy at most six bigrams of either word, so a keyword
+        # needs that many fewer than the longer word has in common. Repeated
+        # token bigrams are counted each time, which only admits more
+        # candidates; the keyword length keeps the bound above zero.
+        bigrams = self._bigrams
+        shared: Dict[str, int] = {}
+        for i in range(length - 1):
+            for keyword in bigrams.get(token[i : i + 2], ()):
+                shared[keyword] = shared.get(keyword, 0) + 1
+        return tuple(
+            sorted(
+                keyword
+                for keyword, common in shared.items()
+                if common >= max(length, len(keyword)) - 7
+                and self._slip(token, keyword)
+                and osa_distance(token, keyword, 2) == 2
+            )
+        )
+
+
+# Lexicon value: (type feature indices, requirement bitmask)
+Hits = Tuple[Tuple[int, ...], int]
+_NO_HITS: Hits = ((), 0)
+
+
+def _merge(left: Hits, right: Hits) -> Hits:
+    return left[0] + right[0], left[1] | right[1]
+
+
+class PromptAnalyzer:
+    """Keyword lexicon compiled into token lookups and one automaton
+
+    Internally every prompt is reduced to type keyword counts plus two
+    bitmasks: requirements (bit i is ``requirement_order[i]``) and substring
+    keywords (bit i is ``substring_keywords[i]``). ``scan()`` decodes them
+    into a PromptAnalysis; batch analysis works on the masks directly.
+    """
+
+    def __init__(
+        self,
+        type_keywords: Dict[str, Tuple[str, ...]] = TYPE_KEYWORDS,
+        requirement_keywords: Dict[str, Tuple[str, ...]] = REQUIREMENT_KEYWORDS,
+        environment_keywords: Dict[str, Tuple[str, ...]] = ENVIRONMENT_KEYWORDS,
+        tag_keywords: Dict[str, Tuple[str, ...]] = TAG_KEYWORDS,
+        action_keywords: Tuple[str, ...] = ACTION_KEYWORDS,
+        cache_size: int = 4096,
+        typo_tolerance: bool = False,
+        max_prompt_length: Optional[int] = None,
+    ):
+        if max_prompt_length is not None:
+            if max_prompt_length < 1:
+                raise ValueError("max_prompt_length must be at least 1")
+            check_linear(_TOKEN_RE)
+        self.max_prompt_length = max_prompt_length
+        self.typo_tolerance = typo_tolerance
+        self.type_order = tuple(type_keywords)
+        self.requirement_order = tuple(requirement_keywords)
+        self.environment_order = tuple(environment_keywords)
+        self.action_keywords = tuple(action_keywords)
+        # (type, keyword) pairs; PromptAnalysis.type_hits index into this
+        self.type_keywords: Tuple[Tuple[str, str], ...] = tuple(
+            (label, keyword)
+            for label, keywords in type_keywords.items()
+            for keyword in keywords
+        )
+        # Type features: every keyword matched exactly, then every keyword
+        # matched with a typo; type_hits count occurrences per feature
+        self.type_features: Tuple[Tuple[str, str, bool], ...] = tuple(
+            (label, keyword, fuzzy)
+            for fuzzy in (False, True)
+            for label, keyword in self.type_keywords
+        )
+        self.keyword_types = tuple(
+            self.type_order.index(label) for label, _, _ in self.type_features
+        )
+        # Every tag a prompt can produce; tag bitmasks index into this
+        self.tag_names = tuple(
+            dict.fromkeys(
+                BASE_TAGS + tuple(t for tags in tag_keywords.values() for t in tags)
+            )
+        )
+
+        # Whole tokens, token pairs around a one-character gap, and single
+        # tokens of the form first + <word char> + second, keyed by length
+        self._words: Dict[str, Hits] = {}
+        self._pairs: Dict[Tuple[str, str], Hits] = {}
+        self._infixes: Dict[int, List[Tuple[str, str, Hits]]] = {}
+        for index, (_, keyword) in enumerate(self.type_keywords):
+            self._add_word(keyword.lower(), ((index,), 0))
+        for bit, keywords in enumerate(requirement_keywords.values()):
+            for keyword in keywords:
+                self._add_word(keyword.lower(), ((), 1 << bit))
+
+        substrings = {
+            keyword.lower()
+            for keywords in (
+                *environment_keywords.values(),
+                tag_keywords,
+                action_keywords,
+            )
+            for keyword in keywords
+        }
+        for keyword in substrings:
+            if not _TOKEN_RE.fullmatch(keyword):
+                raise ValueError(f"Substring keyword '{keyword}' must be a single word")
+        self.substring_keywords = tuple(sorted(substrings))
+        self._substring_bits = {
+            kw: 1 << bit for bit, kw in enumerate(self.substring_keywords)
+        }
+        self._automaton = AhoCorasick(self.substring_keywords)
+
+        self._environment_masks = tuple(
+            self._substring_mask(keywords) for keywords in environment_keywords.values()
+        )
+        tag_bits = {name: 1 << bit for bit, name in enumerate(self.tag_names)}
+        self._base_tag_mask = sum(tag_bits[name] for name in BASE_TAGS)
+        self._tag_masks = tuple(
+            (
+                self._substring_mask((keyword,)),
+                tags,
+                sum(tag_bits[t] for t in set(tags)),
+            )
+            for keyword, tags in tag_keywords.items()
+        )
+        self._action_masks = tuple(
+            (action, self._substring_mask((action,))) for action in self.action_keywords
+        )
+
+        # Typo-tolerant lookup for single-word type keywords
+        self._typos: Optional[TypoIndex] = None
+        self._typo_features: Dict[str, Tuple[int, ...]] = {}
+        if typo_tolerance:
+            offset = len(self.type_keywords)
+            for index, (_, keyword) in enumerate(self.type_keywords):
+                if _TOKEN_RE.fullmatch(keyword):
+                    key = keyword.lower()
+                    self._typo_features[key] = self._typo_features.get(key, ()) + (
+                        offset + index,
+                    )
+            self._typos = TypoIndex(self._typo_features)
+        # Longest token any whole-word, gap or typo lookup can match
+        self._max_token_length = max(
+            [len(word) for word in self._words] + list(self._infixes), default=0
+        ) + (2 if self._typos is not None else 0)
+
+        self._match_token = lru_cache(maxsize=65536)(self._match_token_uncached)
+        self.scan_masks = cache_short_prompts(self._scan_masks_uncached, cache_size)
+        self.substring_codes = lru_cache(maxsize=None)(self._substring_codes_uncached)
+        self.scan = cache_short_prompts(self._scan_uncached, cache_size)
+
+    def _substring_mask(self, keywords: Iterable[str]) -> int:
+        return sum(self._substring_bits[keyword.lower()] for keyword in set(keywords))
+
+    def _add_word(self, keyword: str, hits: Hits) -> None:
+        first, gap, second = keyword.partition(_GAP)
+        if not gap:
+            if not _TOKEN_RE.fullmatch(keyword):
+                raise ValueError(
+                    f"Keyword '{keyword}' must be a word or 'first.?second'"
+                )
+            self._words[keyword] = _merge(self._words.get(keyword, _NO_HITS), hits)
+            return
+        if not (_TOKEN_RE.fullmatch(first) and _TOKEN_RE.fullmatch(second)):
+            raise ValueError(f"Keyword '{keyword}' must be a word or 'first.?second'")
+        joined = first + second
+        self._words[joined] = _merge(self._words.get(joined, _NO_HITS), hits)
+        self._pairs[(first, second)] = _merge(
+            self._pairs.get((first, second), _NO_HITS), hits
+        )
+        length = len(first) + len(second) + 1
+        self._infixes.setdefault(length, []).append((first, second, hits))
+
+    def _match_token_uncached(self, token: str) -> Tuple[Tuple[int, ...], int, int]:
+        """Type keyword indices, requirement mask and substring mask of a token"""
+        types, requirements = self._words.get(token, _NO_HITS)
+        for first, second, (infix_types, infix_requirements) in self._infixes.get(
+            len(token), ()
+        ):
+            if token.startswith(first) and token.endswith(second):
+                types += infix_types
+                requirements |= infix_requirements
+        if not types and self._typos is not None:
+            for keyword in self._typos.lookup(token):
+                types += self._typo_features[keyword]
+        return types, requirements, self._token_substrings(token)
+
+    def _token_substrings(self, token: str) -> int:
+        substrings = 0
+        for keyword in self._automaton.find(token):
+            substrings |= self._substring_bits[keyword]
+        return substrings
+
+    def _scan_masks_uncached(
+        self, prompt: str
+    ) -> Tuple[Tuple[Tuple[int, int], ...], int, int]:
+        """Type keyword counts, requirement mask and substring mask of a prompt"""
+        if self.max_prompt_length is not None and len(prompt) > self.max_prompt_length:
+            raise PromptTooLargeError(
+                f"Prompt of {len(prompt)} characters exceeds the limit of {self.max_prompt_length}"
+            )
+        type_hits: Dict[int, int] = {}
+        requirements = 0
+        substrings = 0
+        previous: Optional[str] = None
+        previous_end = -2
+        for match in _TOKEN_RE.finditer(prompt):
+            token = match.group().lower()
+            if len(token) > self._max_token_length:
+                types, token_requirements = _NO_HITS
+                token_substrings = self._token_substrings(token)
+            else:
+                types, token_requirements, token_substrings = self._match_token(token)
+            if (
+                self._pairs
+                and match.start() == previous_end + 1
+                and prompt[previous_end] != "\n"
+            ):
+                pair_types, pair_requirements = self._pairs.get(
+                    (previous, token), _NO_HITS
+                )
+                types += pair_types
+                token_requirements |= pair_requirements
+            for index in types:
+                type_hits[index] = type_hits.get(index, 0) + 1
+            requirements |= token_requirements
+            substrings |= token_substrings
+            previous, previous_end = token, match.end()
+        # Typo matches only count in prompts without any exact type keyword
+        exact = len(self.type_keywords)
+        if type_hits and min(type_hits) < exact <= max(type_hits):
+            type_hits = {
+                index: count for index, count in type_hits.items() if index < exact
+            }
+        return tuple(sorted(type_hits.items())), requirements, substrings
+
+    def _substring_codes_uncached(self, substrings: int) -> Tuple[int, int, int]:
+        """Environment code (-1 for none), tag mask and action mask"""
+        environment = -1
+        for code, mask in enumerate(self._environment_masks):
+            if substrings & mask:
+                environment = code
+                break
+        tags = self._base_tag_mask
+        for mask, _, tag_mask in self._tag_masks:
+            if substrings & mask:
+                tags |= tag_mask
+        actions = 0
+        for bit, (_, mask) in enumerate(self._action_masks):
+            if substrings & mask:
+                actions |= 1 << bit
+        return environment, tags, actions
+
+    def _scan_uncached(self, prompt: str) -> PromptAnalysis:
+        """Analyze a prompt in one pass over its tokens"""
+        type_hits, requirements, substrings = self.scan_masks(prompt)
+        environment, _, _ = self.substring_codes(substrings)
+
+        matched = {self.keyword_types[index] for index, _ in type_hits}
+        tags = list(BASE_TAGS)
+        for mask, keyword_tags, _ in self._tag_masks:
+            if substrings & mask:
+                tags.extend(keyword_tags)
+
+        return PromptAnalysis(
+            types=tuple(t for code, t in enumerate(self.type_order) if code in matched),
+            type_hits=type_hits,
+            environment=(
+                self.environment_order[environment] if environment >= 0 else None
+            ),
+            requirements=tuple(
+                r
+                for bit, r in enumerate(self.requirement_order)
+                if requirements >> bit & 1
+            ),
+            tags=tuple(dict.fromkeys(tags)),
+            actions=tuple(a for a, mask in self._action_masks if substrings & mask),
+        )
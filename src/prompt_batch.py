@@ -0,0 +1,142 @@
+"""
+Batch prompt analysis for log replay and analytics
+
+``analyze_prompts`` streams prompts in chunks and yields one PromptBatch per
+chunk: parallel arrays of enum codes and bitmasks instead of PlaybookContext
+objects. Each prompt is reduced to bitmasks by the analyzer's memoized token
+lookups; the chunk's playbook types are then scored as one matrix product
+and its environments, tags and actions decoded with array gathers.
+Arrays are NumPy arrays when NumPy is installed and ``array.array`` otherwise.
+
+Codes index into the analyzer's orders:
+
+- ``types``: ``analyzer.type_order``, -1 when no type keyword matched
+- ``environments``: ``analyzer.environment_order``, -1 when none was named
+- ``requirements``: bit i is ``analyzer.requirement_order[i]``
+- ``tags``: bit i is ``analyzer.tag_names[i]``
+- ``actions``: bit i is ``analyzer.action_keywords[i]``
+"""
+
+import array
+import itertools
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; fall back to array.array
+    np = None
+
+try:
+    from .prompt_analyzer import PromptAnalyzer
+    from .prompt_scoring import TypeScorer
+except ImportError:  # executed directly as a script
+    from prompt_analyzer import PromptAnalyzer
+    from prompt_scoring import TypeScorer
+
+DEFAULT_CHUNK_SIZE = 65536
+
+# (array.array typecode, NumPy dtype) per column
+_COLUMNS = {
+    "types": ("b", "int8"),
+    "confidence": ("f", "float32"),
+    "environments": ("b", "int8"),
+    "requirements": ("B", "uint8"),
+    "tags": ("L", "uint32"),
+    "actions": ("B", "uint8"),
+}
+
+
+def _column(name: str, values: Any) -> Any:
+    typecode, dtype = _COLUMNS[name]
+    if np is not None:
+        return np.asarray(values, dtype=dtype)
+    return array.array(typecode, values)
+
+
+@dataclass
+class PromptBatch:
+    """Analysis of one chunk of prompts as parallel arrays"""
+
+    types: Any
+    confidence: Any
+    environments: Any
+    requirements: Any
+    tags: Any
+    actions: Any
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+
+def analyze_chunk(
+    prompts: List[str], analyzer: PromptAnalyzer, scorer: TypeScorer
+) -> PromptBatch:
+    """Analyze a list of prompts into a PromptBatch"""
+    scan_masks = analyzer.scan_masks
+    hits: List[Tuple[Tuple[int, int], ...]] = []
+    requirements: List[int] = []
+    substrings: List[int] = []
+    for prompt in prompts:
+        type_hits, requirement_mask, substring_mask = scan_masks(prompt)
+        hits.append(type_hits)
+        requirements.append(requirement_mask)
+        substrings.append(substring_mask)
+
+    types, confidence = scorer.best(hits)
+    environments, tags, actions = _decode_substrings(substrings, analyzer)
+    return PromptBatch(
+        types=_column("types", types),
+        confidence=_column("confidence", confidence),
+        environments=_column("environments", environments),
+        requirements=_column("requirements", requirements),
+        tags=_column("tags", tags),
+        actions=_column("actions", actions),
+    )
+
+
+def _decode_substrings(
+    substrings: List[int], analyzer: PromptAnalyzer
+) -> Tuple[Any, Any, Any]:
+    """Environment codes, tag masks and action masks for substring masks
+
+    Only a handful of distinct masks occur, so each is decoded once and the
+    results are gathered back to every prompt.
+    """
+    if np is None:
+        codes = [analyzer.substring_codes(mask) for mask in substrings]
+        return [c[0] for c in codes], [c[1] for c in codes], [c[2] for c in codes]
+
+    unique, inverse = np.unique(
+        np.asarray(substrings, dtype=np.int64), return_inverse=True
+    )
+    table = np.array(
+        [analyzer.substring_codes(int(mask)) for mask in unique], dtype=np.int64
+    ).reshape(len(unique), 3)
+    decoded = table[inverse.reshape(-1)]
+    return decoded[:, 0], decoded[:, 1], decoded[:, 2]
+
+
+def analyze_prompts(
+    prompts: Iterable[str],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    analyzer: Optional[PromptAnalyzer] = None,
+    scorer: Optional[TypeScorer] = None,
+) -> Iterator[PromptBatch]:
+    """Analyze a stream of prompts, yielding one PromptBatch per chunk
+
+    ``prompts`` is consumed lazily, so memory stays bounded by one chunk.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    if analyzer is None:
+        analyzer = PromptAnalyzer()
+    if scorer is None:
+        scorer = TypeScorer(analyzer)
+
+    iterator = iter(prompts)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield analyze_chunk(chunk, analyzer, scorer)
@@ -0,0 +1,162 @@
+"""
+Scored playbook type classification
+
+Each prompt becomes a vector of type-keyword occurrence counts, with exact
+and typo-tolerant matches counted separately (see
+``PromptAnalysis.type_hits``). Multiplying by a keyword x type weight matrix
+gives one score per playbook type; the types are ranked by score with ties
+broken by detection priority, and each score is reported as a share of the
+prompt's total (its confidence). Typo matches only count in prompts without
+an exact keyword, and most of their weight goes to a doubt column that adds
+to the total but to no type, which keeps their confidence low. Batches are
+scored as a single matrix product with NumPy when it is installed and with
+plain Python otherwise.
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; fall back to plain Python
+    np = None
+
+try:
+    from .prompt_analyzer import PromptAnalysis, PromptAnalyzer
+except ImportError:  # executed directly as a script
+    from prompt_analyzer import PromptAnalysis, PromptAnalyzer
+
+NUMPY_AVAILABLE = np is not None
+
+# Keywords that are weaker evidence for their type than the default 1.0,
+# e.g. generic words that also appear in prompts about other stacks
+KEYWORD_WEIGHTS: Dict[str, float] = {
+    "service": 0.5,
+    "deployment": 0.5,
+    "registry": 0.5,
+}
+
+# Share of a typo match's weight credited to its type; the rest is doubt, so
+# a prompt matched only through typos has at most this confidence
+FUZZY_CONFIDENCE = 0.25
+
+# Ranked (type name, confidence) pairs, best first
+Ranking = Tuple[Tuple[str, float], ...]
+
+
+class TypeScorer:
+    """Ranks playbook types by weighted keyword counts"""
+
+    def __init__(
+        self,
+        analyzer: PromptAnalyzer,
+        weights: Optional[Dict[str, float]] = None,
+        use_numpy: Optional[bool] = None,
+    ):
+        if weights is None:
+            weights = KEYWORD_WEIGHTS
+        self.type_names = analyzer.type_order
+        type_index = {name: idx for idx, name in enumerate(self.type_names)}
+
+        # One row per type feature: (type column, weight, doubt). Internal
+        # score vectors carry the doubt in an extra last column.
+        self._rows: List[Tuple[int, float, float]] = []
+        for label, keyword, fuzzy in analyzer.type_features:
+            weight = float(weights.get(keyword, 1.0))
+            share = FUZZY_CONFIDENCE if fuzzy else 1.0
+            self._rows.append(
+                (type_index[label], weight * share, weight * (1.0 - share))
+            )
+        self.use_numpy = (
+            NUMPY_AVAILABLE if use_numpy is None else use_numpy and NUMPY_AVAILABLE
+        )
+        if self.use_numpy:
+            self.weights = np.zeros((len(self._rows), len(self.type_names) + 1))
+            for row, (column, weight, doubt) in enumerate(self._rows):
+                self.weights[row, column] = weight
+                self.weights[row, -1] = doubt
+
+    def scores(self, analysis: PromptAnalysis) -> List[float]:
+        """Score of every type for one analysis, in type priority order"""
+        return self._scores_for(analysis.type_hits)[:-1]
+
+    def _scores_for(self, type_hits: Tuple[Tuple[int, int], ...]) -> List[float]:
+        scores = [0.0] * (len(self.type_names) + 1)
+        for keyword_index, count in type_hits:
+            column, weight, doubt = self._rows[keyword_index]
+            scores[column] += weight * count
+            scores[-1] += doubt * count
+        return scores
+
+    def score_matrix(self, analyses: Sequence[PromptAnalysis]):
+        """Scores for a batch: an (n prompts x n types) array or nested list"""
+        scores = self._score_hits([analysis.type_hits for analysis in analyses])
+        if self.use_numpy:
+            return scores[:, :-1]
+        return [row[:-1] for row in scores]
+
+    def _score_hits(self, hits: Sequence[Tuple[Tuple[int, int], ...]]):
+        if not self.use_numpy:
+            return [self._scores_for(type_hits) for type_hits in hits]
+
+        rows, columns, values = [], [], []
+        for row, type_hits in enumerate(hits):
+            for keyword_index, count in type_hits:
+                rows.append(row)
+                columns.append(keyword_index)
+                values.append(count)
+        counts = np.zeros((len(hits), len(self._rows)))
+        counts[rows, columns] = values
+        return counts @ self.weights
+
+    def best(self, hits: Sequence[Tuple[Tuple[int, int], ...]]):
+        """Winning type code (-1 for none) and its confidence per prompt
+
+        ``hits`` holds ``PromptAnalysis.type_hits`` values; the winner is the
+        first entry of ``rank()``. Returns NumPy arrays when NumPy is used and
+        lists otherwise.
+        """
+        scores = self._score_hits(hits)
+        if not self.use_numpy:
+            codes, confidences = [], []
+            for row in scores:
+                total = sum(row)
+                if total <= 0:
+                    codes.append(-1)
+                    confidences.append(0.0)
+                    continue
+                code = max(range(len(row) - 1), key=lambda idx: (row[idx], -idx))
+                codes.append(code)
+                confidences.append(row[code] / total)
+            return codes, confidences
+
+        totals = scores.sum(axis=1)
+        # argmax returns the first maximum, i.e. the highest priority type
+        codes = scores[:, :-1].argmax(axis=1)
+        best = scores[np.arange(len(hits)), codes]
+        matched = totals > 0
+        codes = np.where(matched, codes, -1)
+        confidences = np.divide(best, totals, out=np.zeros_like(best), where=matched)
+        return codes, confidences
+
+    def rank(self, analysis: PromptAnalysis) -> Ranking:
+        """Matched types ranked by score, with their confidence"""
+        return self._ranking(self._scores_for(analysis.type_hits))
+
+    def rank_many(self, analyses: Sequence[PromptAnalysis]) -> List[Ranking]:
+        """Rank a batch of analyses with one matrix product"""
+        scores = self._score_hits([analysis.type_hits for analysis in analyses])
+        return [self._ranking(list(row)) for row in scores]
+
+    def _ranking(self, scores: Sequence[float]) -> Ranking:
+        total = float(sum(scores))
+        if total <= 0:
+            return ()
+        # Stable sort keeps priority order among equal scores; the last
+        # column is doubt, not a type
+        order = sorted(
+            (idx for idx, score in enumerate(scores[:-1]) if score > 0),
+            key=lambda idx: -scores[idx],
+        )
+        return tuple(
+            (self.type_names[idx], float(scores[idx]) / total) for idx in order
+        )
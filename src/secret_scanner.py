@@ -0,0 +1,267 @@
+"""
+Find hardcoded secrets in playbook text
+
+The patterns mirror ``secretPatterns`` in src/server.ts. Rather than running
+each pattern over each line, the patterns that start with a keyword
+(``password``, ``AKIA``, ``-----BEGIN`` ...) are combined into one
+alternation of named groups and matched in a single ``finditer`` pass.
+Every branch of the alternation starts with a literal character and the
+keywords are matched case-insensitively through scoped ``(?i:...)`` groups,
+so the regex engine can skip ahead to the next possible first character
+instead of trying each branch at each position. A Jinja ``{{ ... }}``
+expression is a branch of its own, listed first, so an expression is
+consumed whole and nothing inside it is reported, and values never start
+with ``{``: ``password: "{{vault_password}}"`` is not a finding. Keywords
+must be followed by a separator, so ``PasswordAuthentication`` is a word,
+not a password.
+
+The AWS secret key pattern has no keyword: it is a run of exactly 40 base64
+characters mixing digits, lowercase and uppercase letters, which a URL path
+or a word joined by slashes does not. Run patterns are found in the same
+pass by translating each chunk of the content to a two-letter alphabet and
+searching it for the run length, which costs a fraction of a regex scan.
+Runs starting inside a Jinja expression or another finding are not
+reported.
+
+The combined pattern is verified by ``linear_regex.check_linear``, so
+scanning time stays linear in the content. Unbounded repeats in the
+TypeScript patterns are therefore bounded where they are not final, e.g.
+the separator run after ``password``.
+
+Files are scanned through ``mmap`` as bytes, so memory does not grow with
+file size. Each finding carries its type and 1-based line and column, but
+not the matched text:
+
+    python -m src.secret_scanner playbooks/site.yml
+"""
+
+import argparse
+import mmap
+import re
+import sys
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+try:
+    from .linear_regex import check_linear
+except ImportError:  # executed directly as a script
+    from linear_regex import check_linear
+
+# (type, pattern) pairs, matched case-insensitively like the /i patterns in
+# server.ts. Each pattern starts with a literal character. When two patterns
+# match at the same position the first one listed wins.
+SECRET_PATTERNS: Tuple[Tuple[str, str], ...] = (
+    ("Private Key", r"-----BEGIN (?:RSA |EC |DSA |OPENSSH )?PRIVATE KEY-----"),
+    ("AWS Access Key", r"AKIA[0-9A-Z]{16}"),
+    ("GitHub Token", r"gh[ps]_[a-zA-Z0-9]{36}"),
+    ("Slack Token", r"xox[baprs]-[0-9a-zA-Z-]{10,}"),
+    ("JWT", r"eyJ[a-zA-Z0-9_-]{0,1000}\.eyJ[a-zA-Z0-9_-]{0,1000}\.[a-zA-Z0-9_-]*"),
+    ("API Key", r"api[_-]?key['\":=\s]{1,8}['\"]?[a-zA-Z0-9_-]{20,}"),
+    ("Password", r"password['\":=\s]{1,8}['\"]?[^'\"{}\s]{8,}"),
+    ("Generic Secret", r"secret['\":=\s]{1,8}['\"]?[a-zA-Z0-9_-]{16,}"),
+    ("Bearer Token", r"bearer\s{1,8}[a-zA-Z0-9_.-]+"),
+)
+
+# (type, character class, length, required classes): any run of exactly
+# ``length`` characters of the class containing a character of each
+# required class, reported at the start of the run
+SECRET_RUNS: Tuple[Tuple[str, str, int, Tuple[str, ...]], ...] = (
+    ("AWS Secret Key", "0-9a-zA-Z/+", 40, ("0-9", "a-z", "A-Z")),
+)
+
+# A Jinja expression, skipped as a whole; longer ones are scanned as text
+JINJA_PATTERN = r"\{\{[^}]{0,1000}\}\}"
+
+# Bytes of content copied at a time to count newlines or look for runs
+_CHUNK = 1 << 20
+
+# A pattern's first character, if it is a literal
+_LITERAL_HEAD = re.compile(r"\\\W|[^\\\[(.^$|?*+{]")
+
+
+@dataclass(frozen=True)
+class SecretFinding:
+    """A potential secret at a 1-based line and column"""
+
+    type: str
+    line: int
+    column: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"type": self.type, "line": self.line, "column": self.column}
+
+
+class SecretScanner:
+    """Scans text for a set of secret patterns and runs in one pass"""
+
+    def __init__(
+        self,
+        patterns: Sequence[Tuple[str, str]] = SECRET_PATTERNS,
+        runs: Sequence[Tuple[str, str, int, Tuple[str, ...]]] = SECRET_RUNS,
+    ):
+        self.patterns = tuple(patterns)
+        self.runs = tuple(runs)
+        # Group name -> finding type, None for Jinja expressions
+        self._types: Dict[str, Optional[str]] = {}
+        branches = self._branches(None, JINJA_PATTERN)
+        for kind, pattern in self.patterns:
+            branches.extend(self._branches(kind, pattern))
+        source = "|".join(branches)
+        check_linear(source)
+        self._regex = re.compile(source.encode("ascii"))
+        self._run_tables = [
+            (
+                kind,
+                _run_table(chars),
+                length,
+                [re.compile(f"[{required}]".encode("ascii")) for required in requires],
+            )
+            for kind, chars, length, requires in self.runs
+        ]
+
+    def _branches(self, kind: Optional[str], pattern: str) -> List[str]:
+        """One branch per case of the pattern's first character
+
+        Leading every branch with a plain literal lets ``re`` skip straight
+        to the positions where some branch can start.
+        """
+        head = _LITERAL_HEAD.match(pattern)
+        if head is None:
+            raise ValueError(
+                f"Secret pattern {pattern!r} does not start with a literal character"
+            )
+        char, rest = head.group()[-1], pattern[head.end() :]
+        branches = []
+        for case in sorted({char.lower(), char.upper()}):
+            group = f"g{len(self._types)}"
+            self._types[group] = kind
+            branches.append(f"{re.escape(case)}(?P<{group}>(?i:{rest}))")
+        return branches
+
+    def scan(self, content: Union[str, bytes, Any]) -> List[SecretFinding]:
+        """Findings in text, bytes or any bytes-like buffer such as an mmap"""
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        types = self._types
+        # (start, end, type) of every match, Jinja expressions included
+        spans = [
+            (m.start(), m.end(), types[m.lastgroup])
+            for m in self._regex.finditer(content)
+        ]
+        found = [(start, kind) for start, _, kind in spans if kind is not None]
+        if self._run_tables:
+            starts = [start for start, _, _ in spans]
+            size = len(content)
+            for kind, table, length, requires in self._run_tables:
+                for start in _find_runs(content, table, length):
+                    end = start + length
+                    if end < size and table[content[end]] == ord("a"):
+                        continue  # longer than a key
+                    run = content[start:end]
+                    if not all(required.search(run) for required in requires):
+                        continue
+                    idx = bisect_right(starts, start) - 1
+                    if idx < 0 or start >= spans[idx][1]:
+                        found.append((start, kind))
+            found.sort(key=lambda item: item[0])
+        return _locate(content, found)
+
+    def scan_file(self, path: str) -> List[SecretFinding]:
+        """Findings in a file, mapped into memory rather than read"""
+        with open(path, "rb") as handle:
+            try:
+                buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # empty file
+                return []
+            with buffer:
+                return self.scan(buffer)
+
+
+def _run_table(chars: str) -> bytes:
+    """bytes.translate table mapping the class to "a" and the rest to " """
+    member = re.compile(f"[{chars}]".encode("ascii"))
+    return bytes(
+        ord("a") if member.fullmatch(bytes([byte])) else ord(" ") for byte in range(256)
+    )
+
+
+def _find_runs(content: Any, table: bytes, length: int) -> Iterator[int]:
+    """Start offsets of the runs of at least ``length`` bytes in the class"""
+    needle = b"a" * length
+    size = len(content)
+    for offset in range(0, size, _CHUNK):
+        limit = min(offset + _CHUNK, size)
+        # Overlap the next chunk so that runs starting here are seen whole
+        window = content[offset : min(limit + length - 1, size)].translate(table)
+        pos = window.find(needle)
+        while 0 <= pos < limit - offset:
+            # A run at the chunk start may have been reported with the last chunk
+            if pos or not offset or table[content[offset - 1]] != ord("a"):
+                yield offset + pos
+            pos = window.find(b" ", pos + length)
+            if pos < 0:
+                break
+            pos = window.find(needle, pos)
+
+
+def _locate(content: Any, found: List[Tuple[int, str]]) -> List[SecretFinding]:
+    """Findings at byte offsets, with lines and character columns"""
+    findings = []
+    line, line_start, counted = 1, 0, 0
+    for start, kind in found:
+        newlines = _count_newlines(content, counted, start)
+        if newlines:
+            line += newlines
+            line_start = content.rfind(b"\n", counted, start) + 1
+        counted = start
+        column = len(content[line_start:start].decode("utf-8", "replace")) + 1
+        findings.append(SecretFinding(kind, line, column))
+    return findings
+
+
+def _count_newlines(content: Any, start: int, end: int) -> int:
+    """Newlines in content[start:end], copying at most _CHUNK bytes at a time"""
+    count = 0
+    for offset in range(start, end, _CHUNK):
+        count += content[offset : min(offset + _CHUNK, end)].count(b"\n")
+    return count
+
+
+_default_scanner: Optional[SecretScanner] = None
+
+
+def default_scanner() -> SecretScanner:
+    """Shared scanner for SECRET_PATTERNS, compiled on first use"""
+    global _default_scanner
+    if _default_scanner is None:
+        _default_scanner = SecretScanner()
+    return _default_scanner
+
+
+def scan(content: Union[str, bytes]) -> List[SecretFinding]:
+    return default_scanner().scan(content)
+
+
+def scan_file(path: str) -> List[SecretFinding]:
+    return default_scanner().scan_file(path)
+
+
+def main(argv: Optional[Iterable[str]] = None):
+    """Report potential secrets in files"""
+    parser = argparse.ArgumentParser(
+        description="Find hardcoded secrets in playbook files"
+    )
+    parser.add_argument("paths", nargs="+", help="files to scan")
+    args = parser.parse_args(argv)
+
+    found = False
+    for path in args.paths:
+        for finding in scan_file(path):
+            found = True
+            print(f"{path}:{finding.line}:{finding.column}: {finding.type}")
+    sys.exit(1 if found else 0)
+
+
+if __name__ == "__main__":
+    main()
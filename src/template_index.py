@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+TF-IDF retrieval index over playbook templates
+
+Each template is reduced to a bag of terms taken from its name, play and
+task names, module names and tags. Terms are weighted by TF-IDF and kept as
+sparse postings (term -> templates and weights) over L2-normalized template
+vectors, so ranking a prompt is a cosine similarity that only walks the
+postings of the prompt's own terms.
+
+The index is built once from the templates' terms, so the parsed documents
+can be dropped as soon as their terms are taken, and can be persisted as
+JSON. ``fingerprint`` identifies the template sources it was built from, so
+a stale file is detected and rebuilt instead of silently used. Rebuild the
+file whenever templates change:
+
+    python -m src.template_index --output template_index.json
+"""
+
+import argparse
+import heapq
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+try:
+    from .prompt_analyzer import cache_short_prompts
+except ImportError:  # executed directly as a script
+    from prompt_analyzer import cache_short_prompts
+
+INDEX_ENV_VAR = "ANSIBLE_MCP_TEMPLATE_INDEX"
+INDEX_FORMAT = 1
+
+_TERM_RE = re.compile(r"[a-z0-9]+")
+_STOP_WORDS = frozenset(
+    "a an and as at be by for from in into is it of on or the to up with".split()
+)
+
+# Task keys that are not modules
+_TASK_KEYWORDS = frozenset(
+    (
+        "name",
+        "tags",
+        "when",
+        "register",
+        "delegate_to",
+        "become",
+        "become_user",
+        "vars",
+        "notify",
+        "loop",
+        "loop_control",
+        "with_items",
+        "block",
+        "rescue",
+        "always",
+        "environment",
+        "changed_when",
+        "failed_when",
+        "ignore_errors",
+        "until",
+        "retries",
+        "delay",
+        "run_once",
+        "no_log",
+        "args",
+    )
+)
+
+# (template name, similarity)
+Match = Tuple[str, float]
+
+
+def terms(text: str) -> List[str]:
+    """Lowercase word terms of ``text`` without stop words or plural "s" """
+    result = []
+    for term in _TERM_RE.findall(text.lower()):
+        if term in _STOP_WORDS:
+            continue
+        if len(term) > 4 and term.endswith("s") and not term.endswith("ss"):
+            term = term[:-1]
+        result.append(term)
+    return result
+
+
+def template_terms(name: str, playbook: Any) -> List[str]:
+    """Terms describing a parsed template: names, modules and tags"""
+    words = [name]
+
+    def add_tags(node: Mapping) -> None:
+        tags = node.get("tags", ())
+        words.extend([tags] if isinstance(tags, str) else tags)
+
+    def add_tasks(tasks: Iterable[Any]) -> None:
+        for task in tasks:
+            if not isinstance(task, Mapping):
+                continue
+            words.append(str(task.get("name", "")))
+            add_tags(task)
+            for key, value in task.items():
+                if key in ("block", "rescue", "always"):
+                    add_tasks(value or ())
+                elif key not in _TASK_KEYWORDS:
+                    words.append(key)
+
+    for play in playbook or ():
+        if not isinstance(play, Mapping):
+            continue
+        words.append(str(play.get("name", "")))
+        add_tags(play)
+        for section in ("pre_tasks", "tasks", "post_tasks", "handlers"):
+            add_tasks(play.get(section) or ())
+    return [term for word in words for term in terms(str(word))]
+
+
+class TemplateIndex:
+    """Sparse TF-IDF postings over templates, queried by cosine similarity"""
+
+    def __init__(
+        self,
+        names: Iterable[str],
+        idf: Dict[str, float],
+        postings: Dict[str, Tuple[Tuple[int, float], ...]],
+        fingerprint: Optional[str] = None,
+        cache_size: int = 4096,
+    ):
+        self.names = tuple(names)
+        self.idf = idf
+        self.postings = postings
+        self.fingerprint = fingerprint
+        self.query = cache_short_prompts(self._query_uncached, cache_size)
+
+    @classmethod
+    def build(
+        cls, templates: Mapping[str, Any], fingerprint: Optional[str] = None
+    ) -> "TemplateIndex":
+        """Index parsed templates keyed by template name"""
+        return cls.from_terms(
+            {
+                name: template_terms(name, playbook)
+                for name, playbook in templates.items()
+            },
+            fingerprint,
+        )
+
+    @classmethod
+    def from_terms(
+        cls, terms_by_name: Mapping[str, List[str]], fingerprint: Optional[str] = None
+    ) -> "TemplateIndex":
+        """Index templates given the terms of each, keyed by template name"""
+        names = sorted(terms_by_name)
+        counts = [Counter(terms_by_name[name]) for name in names]
+        document_frequency = Counter(term for count in counts for term in count)
+        # Smoothed so a term in every template still carries some weight
+        idf = {
+            term: math.log((1 + len(names)) / (1 + df)) + 1.0
+            for term, df in document_frequency.items()
+        }
+
+        postings: Dict[str, List[Tuple[int, float]]] = {}
+        for doc, count in enumerate(counts):
+            weights = {
+                term: (1 + math.log(tf)) * idf[term] for term, tf in count.items()
+            }
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            for term, weight in weights.items():
+                postings.setdefault(term, []).append((doc, weight / norm))
+        return cls(
+            names,
+            idf,
+            {term: tuple(entries) for term, entries in postings.items()},
+            fingerprint,
+        )
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _query_uncached(self, text: str, k: int = 5) -> Tuple[Match, ...]:
+        """Top ``k`` templates by cosine similarity to ``text``, best first"""
+        idf = self.idf
+        query = Counter(term for term in terms(text) if term in idf)
+        if not query or k < 1:
+            return ()
+        weights = {term: (1 + math.log(tf)) * idf[term] for term, tf in query.items()}
+        norm = math.sqrt(sum(w * w for w in weights.values()))
+
+        scores: Dict[int, float] = {}
+        for term, weight in weights.items():
+            for doc, doc_weight in self.postings[term]:
+                scores[doc] = scores.get(doc, 0.0) + weight * doc_weight
+        best = heapq.nlargest(k, scores.items(), key=lambda item: (item[1], -item[0]))
+        return tuple((self.names[doc], score / norm) for doc, score in best)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "format": INDEX_FORMAT,
+            "fingerprint": self.fingerprint,
+            "templates": list(self.names),
+            "idf": self.idf,
+            "postings": {
+                term: [[doc, weight] for doc, weight in entries]
+                for term, entries in self.postings.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "TemplateIndex":
+        if data.get("format") != INDEX_FORMAT:
+            raise ValueError(
+                f"Unsupported template index format: {data.get('format')!r}"
+            )
+        return cls(
+            data["templates"],
+            data["idf"],
+            {
+                term: tuple((doc, weight) for doc, weight in entries)
+                for term, entries in data["postings"].items()
+            },
+            data.get("fingerprint"),
+        )
+
+    def save(self, path: str) -> None:
+        """Write the index as JSON, replacing ``path`` atomically"""
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as handle:
+            json.dump(self.to_dict(), handle, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "TemplateIndex":
+        with open(path, encoding="utf-8") as handle:
+            return cls.from_dict(json.load(handle))
+
+
+def main():
+    """Rebuild the persisted template index"""
+    try:
+        from .playbook_generator import PlaybookGenerator
+    except ImportError:  # executed directly as a script
+        from playbook_generator import PlaybookGenerator
+
+    parser = argparse.ArgumentParser(description="Rebuild the playbook template index")
+    parser.add_argument(
+        "--output",
+        default=os.environ.get(INDEX_ENV_VAR),
+        required=INDEX_ENV_VAR not in os.environ,
+        help=f"index file to write (default: ${INDEX_ENV_VAR})",
+    )
+    args = parser.parse_args()
+
+    index = PlaybookGenerator(use_cache=False).build_template_index()
+    index.save(args.output)
+    print(
+        f"Indexed {len(index)} templates ({len(index.postings)} terms) into {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+"""
+Pre-rendering of known context values into parsed templates
+
+Templates are full of Jinja expressions such as
+``{{ target_hosts | default('all') }}`` that Ansible resolves at run time.
+TemplateRenderer fills in the ones whose variables are all known from the
+PlaybookContext before the playbook is serialized. Expressions that refer to
+anything else (facts, loop items, registered results, play vars) are left
+untouched for Ansible, and so is any string containing a ``{% %}`` block.
+
+Each ``{{ ... }}`` expression is compiled once through a shared sandboxed
+``jinja2.Environment``: compiled templates are kept in memory and, when a
+bytecode cache directory is given, their bytecode is persisted across
+processes. An expression that makes up a whole string renders to its native
+value, so ``{{ replica_count }}`` stays an integer. Rendered templates are
+cached per template and per value of the variables it references, so a
+repeated render is a dictionary lookup rather than a Jinja parse.
+
+``required_variables`` is the static side of the same parse: the variables
+a template needs from the caller, i.e. those its expressions reference that
+are neither defined by the template itself (play and task vars, registered
+results, set_fact), provided by Ansible, nor guarded by ``default`` or an
+``is defined`` test.
+
+Jinja2 is optional; RENDER_AVAILABLE is False without it.
+"""
+
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Tuple, Union
+
+try:
+    import jinja2
+    from jinja2 import meta, nodes
+    from jinja2.nativetypes import NativeEnvironment
+    from jinja2.sandbox import ImmutableSandboxedEnvironment
+except ImportError:  # Jinja2 is optional; pre-rendering is then unavailable
+    jinja2 = None
+
+try:
+    from .generation_cache import canonical_json
+    from .playbook_model import FrozenDict, freeze
+except ImportError:  # executed directly as a script
+    from generation_cache import canonical_json
+    from playbook_model import FrozenDict, freeze
+
+RENDER_AVAILABLE = jinja2 is not None
+
+# Names Ansible provides at run time; never filled in from the context
+RUNTIME_VARIABLES = frozenset(
+    (
+        "item",
+        "hostvars",
+        "groups",
+        "group_names",
+        "inventory_hostname",
+        "inventory_hostname_short",
+        "inventory_dir",
+        "inventory_file",
+        "play_hosts",
+        "playbook_dir",
+        "role_path",
+        "role_name",
+        "omit",
+        "lookup",
+        "query",
+        "q",
+        "now",
+    )
+)
+RUNTIME_PREFIXES = ("ansible_",)
+
+_OPEN, _CLOSE = "{{", "}}"
+
+# Filters and tests that make a missing variable harmless
+_GUARD_FILTERS = frozenset(("default", "d"))
+_GUARD_TESTS = frozenset(("defined", "undefined", "none"))
+_SET_FACT = ("set_fact", "ansible.builtin.set_fact")
+
+# One piece of a templated string: literal text, or (expression source,
+# its variables) for a {{ }} expression
+Segment = Union[str, Tuple[str, FrozenSet[str]]]
+
+if RENDER_AVAILABLE:
+
+    class _RenderEnvironment(ImmutableSandboxedEnvironment, NativeEnvironment):
+        """Sandboxed environment whose compiled templates yield native values"""
+
+
+def is_runtime_variable(name: str) -> bool:
+    return name in RUNTIME_VARIABLES or name.startswith(RUNTIME_PREFIXES)
+
+
+class TemplateRenderer:
+    """Fills known variables into parsed templates through a shared Environment"""
+
+    def __init__(
+        self, bytecode_cache_dir: Optional[str] = None, cache_size: int = 1024
+    ):
+        if not RENDER_AVAILABLE:
+            raise RuntimeError("Template pre-rendering requires Jinja2")
+        self.environment = _RenderEnvironment(
+            loader=jinja2.FunctionLoader(lambda source: (source, None, lambda: True)),
+            bytecode_cache=(
+                jinja2.FileSystemBytecodeCache(bytecode_cache_dir)
+                if bytecode_cache_dir
+                else None
+            ),
+            undefined=jinja2.StrictUndefined,
+            cache_size=-1,
+            auto_reload=False,
+        )
+        self.bytecode_cache_dir = bytecode_cache_dir
+        self.cache_size = cache_size
+        # string -> its segments, or None if it has nothing to render
+        self._strings: Dict[str, Optional[Tuple[Segment, ...]]] = {}
+        # id(template) -> (template, (referenced, renderable) variables)
+        self._variables: (
+            "OrderedDict[int, Tuple[Any, Tuple[FrozenSet[str], FrozenSet[str]]]]"
+        ) = OrderedDict()
+        # (id(template), values key) -> (template, rendered template)
+        self._rendered: "OrderedDict[Tuple[int, str], Tuple[Any, Any]]" = OrderedDict()
+
+    def clear(self) -> None:
+        """Forget rendered templates, e.g. after the templates were reloaded"""
+        self._variables.clear()
+        self._rendered.clear()
+
+    def _segments(self, text: str) -> Optional[Tuple[Segment, ...]]:
+        """Split a string into text and expressions, once per distinct string"""
+        if text in self._strings:
+            return self._strings[text]
+        segments: Optional[List[Segment]] = []
+        if _OPEN not in text or "{%" in text or "{#" in text:
+            segments = None
+        pos = 0
+        while segments is not None and pos < len(text):
+            start = text.find(_OPEN, pos)
+            end = text.find(_CLOSE, start + len(_OPEN)) if start >= 0 else -1
+            if start < 0 or end < 0:
+                segments.append(text[pos:])
+                break
+            if start > pos:
+                segments.append(text[pos:start])
+            source = text[start : end + len(_CLOSE)]
+            try:
+                variables = frozenset(
+                    meta.find_undeclared_variables(self.environment.parse(source))
+                )
+            except jinja2.TemplateSyntaxError:
+                segments = None
+                break
+            segments.append((source, variables))
+            pos = end + len(_CLOSE)
+        result = tuple(segments) if segments else None
+        self._strings[text] = result
+        return result
+
+    def variables(self, template: Any) -> FrozenSet[str]:
+        """Every variable referenced by the template's expressions"""
+        return self._analyze(template)[0]
+
+    def _analyze(self, template: Any) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+        """(referenced, renderable) variables of a template
+
+        Renderable variables are the referenced ones the template does not
+        define itself and that Ansible does not supply at run time.
+        """
+        entry = self._variables.get(id(template))
+        if entry is not None and entry[0] is template:
+            self._variables.move_to_end(id(template))
+            return entry[1]
+        found: set = set()
+        for text in _strings(template):
+            for segment in self._segments(text) or ():
+                if not isinstance(segment, str):
+                    found |= segment[1]
+        defined = defined_variables(template)
+        result = (
+            frozenset(found),
+            frozenset(
+                name
+                for name in found
+                if name not in defined and not is_runtime_variable(name)
+            ),
+        )
+        self._remember(self._variables, id(template), (template, result))
+        return result
+
+    def render(self, template: Any, values: Mapping[str, Any]) -> Any:
+        """``template`` with expressions over ``values`` filled in
+
+        Returns ``template`` itself when nothing can be rendered; unchanged
+        nodes are shared with the template. Variables the template defines
+        itself keep their own definition over ``values``.
+        """
+        relevant = {
+            name: values[name] for name in self._analyze(template)[1] if name in values
+        }
+        if not relevant:
+            return template
+        key = (id(template), canonical_json(relevant))
+        entry = self._rendered.get(key)
+        if entry is not None and entry[0] is template:
+            self._rendered.move_to_end(key)
+            return entry[1]
+        rendered = self._render_node(template, relevant)
+        self._remember(self._rendered, key, (template, rendered))
+        return rendered
+
+    def _remember(self, cache: OrderedDict, key: Any, value: Any) -> None:
+        cache[key] = value
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+    def _render_node(self, node: Any, values: Mapping[str, Any]) -> Any:
+        if isinstance(node, str):
+            return self._render_string(node, values)
+        if isinstance(node, dict):
+            items = [
+                (key, self._render_node(value, values)) for key, value in node.items()
+            ]
+            if all(new is node[key] for key, new in items):
+                return node
+            return FrozenDict(items)
+        if isinstance(node, tuple):
+            items = [self._render_node(item, values) for item in node]
+            if all(new is old for new, old in zip(items, node)):
+                return node
+            return tuple(items)
+        return node
+
+    def _render_string(self, text: str, values: Mapping[str, Any]) -> Any:
+        segments = self._segments(text)
+        if segments is None:
+            return text
+        parts = []
+        changed = False
+        for segment in segments:
+            if isinstance(segment, str):
+                parts.append(segment)
+                continue
+            source, variables = segment
+            if not variables or not variables <= values.keys():
+                parts.append(source)
+                continue
+            try:
+                template = self.environment.get_template(source)
+                (value,) = template.root_render_func(template.new_context(dict(values)))
+            except Exception:
+                value = jinja2.Undefined()
+            if isinstance(value, jinja2.Undefined):
+                # Leave anything Jinja cannot evaluate here for Ansible
+                parts.append(source)
+                continue
+            if len(segments) == 1:
+                return freeze(value)
+            parts.append(str(value))
+            changed = True
+        return "".join(parts) if changed else text
+
+
+def _strings(node: Any):
+    """Every string value in a document, depth first"""
+    if isinstance(node, str):
+        yield node
+    elif isinstance(node, dict):
+        for value in node.values():
+            yield from _strings(value)
+    elif isinstance(node, (list, tuple)):
+        for item in node:
+            yield from _strings(item)
+
+
+@lru_cache(maxsize=None)
+def _parse_environment() -> "jinja2.Environment":
+    return jinja2.Environment()
+
+
+@lru_cache(maxsize=4096)
+def _unguarded_variables(text: str) -> FrozenSet[str]:
+    """Undeclared variables of a templated string outside default/defined guards"""
+    try:
+        ast = _parse_environment().parse(text)
+    except jinja2.TemplateSyntaxError:
+        return frozenset()
+    # A default filter guards its own operand; an "is defined" test guards
+    # the name throughout the string, as in "x if x is defined else y"
+    guarded_nodes = set()
+    tested = set()
+    for node in ast.find_all((nodes.Filter, nodes.Test)):
+        if not isinstance(node.node, nodes.Name):
+            continue
+        if isinstance(node, nodes.Filter) and node.name in _GUARD_FILTERS:
+            guarded_nodes.add(id(node.node))
+        elif isinstance(node, nodes.Test) and node.name in _GUARD_TESTS:
+            tested.add(node.node.name)
+    used = {
+        name.name
+        for name in ast.find_all(nodes.Name)
+        if id(name) not in guarded_nodes and name.name not in tested
+    }
+    return frozenset(meta.find_undeclared_variables(ast) & used)
+
+
+def defined_variables(template: Any) -> FrozenSet[str]:
+    """Variables a parsed template defines for itself"""
+    names: set = set()
+
+    def add_tasks(tasks: Any) -> None:
+        for task in tasks or ():
+            if not isinstance(task, Mapping):
+                continue
+            names.update(task.get("vars") or ())
+            if isinstance(task.get("register"), str):
+                names.add(task["register"])
+            for key in _SET_FACT:
+                if isinstance(task.get(key), Mapping):
+                    names.update(task[key])
+            loop_control = task.get("loop_control")
+            if isinstance(loop_control, Mapping) and "loop_var" in loop_control:
+                names.add(loop_control["loop_var"])
+            for key in ("block", "rescue", "always"):
+                add_tasks(task.get(key))
+
+    for play in template or ():
+        if not isinstance(play, Mapping):
+            continue
+        names.update(play.get("vars") or ())
+        for section in ("pre_tasks", "tasks", "post_tasks", "handlers"):
+            add_tasks(play.get(section))
+    return frozenset(names)
+
+
+def required_variables(template: Any) -> FrozenSet[str]:
+    """Variables the caller must supply for the template to render"""
+    if not RENDER_AVAILABLE:
+        raise RuntimeError("Template variable analysis requires Jinja2")
+    found: set = set()
+    for text in _strings(template):
+        if _OPEN in text or "{%" in text:
+            found |= _unguarded_variables(text)
+    defined = defined_variables(template)
+    return frozenset(
+        name for name in found if name not in defined and not is_runtime_variable(name)
+    )
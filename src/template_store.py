@@ -0,0 +1,217 @@
+"""
+On-disk playbook template directory with lazy parsing and hot reload
+
+Template files (``<name>.yml`` or ``<name>.yaml``) are indexed by name at
+startup with a single directory scan; nothing is read or parsed until a
+template is first used, so cold start time and memory follow the templates
+actually requested rather than the size of the catalogue.
+
+``poll()`` rescans the directory at most once per ``poll_interval`` seconds
+and compares each file's size and mtime with the indexed ones. Changed files
+are parsed again on their next use and swapped in as a whole: requests
+already holding the previous parsed template keep a consistent copy, and a
+file that no longer parses is logged and the last good version kept.
+Every change bumps ``version`` so dependent caches know to invalidate.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections.abc import Mapping
+from enum import Enum
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, Type
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_SUFFIXES = (".yml", ".yaml")
+DEFAULT_TEMPLATE_DIR = Path(__file__).resolve().parent.parent / "templates"
+DEFAULT_POLL_INTERVAL = 2.0
+
+# (size, mtime in ns) identifying one version of a file
+Stamp = Tuple[int, int]
+
+
+class TemplateStore:
+    """Templates in a directory, parsed on first use and reloaded on change"""
+
+    def __init__(
+        self,
+        directory: Any = DEFAULT_TEMPLATE_DIR,
+        parse: Callable[[str], Any] = lambda text: text,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+    ):
+        self.directory = Path(directory)
+        self.parse = parse
+        self.poll_interval = poll_interval
+        self.version = 0
+        self._lock = threading.Lock()
+        self._files: Dict[str, Tuple[Path, Stamp]] = {}
+        # name -> (stamp, source, parsed) of the last good load
+        self._loaded: Dict[str, Tuple[Stamp, str, Any]] = {}
+        # name -> stamp of a version that failed to parse
+        self._failed: Dict[str, Stamp] = {}
+        self._files = self._scan()
+        self._last_poll = time.monotonic()
+
+    def _scan(self) -> Dict[str, Tuple[Path, Stamp]]:
+        files = {}
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            logger.warning(f"Template directory {self.directory} does not exist")
+            return files
+        for entry in sorted(entries, key=lambda e: e.name):
+            name, suffix = os.path.splitext(entry.name)
+            if suffix not in TEMPLATE_SUFFIXES or name in files or not entry.is_file():
+                continue
+            stat = entry.stat()
+            files[name] = (Path(entry.path), (stat.st_size, stat.st_mtime_ns))
+        return files
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._files
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._files))
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def refresh(self) -> bool:
+        """Rescan the directory now; True if any template changed"""
+        files = self._scan()
+        with self._lock:
+            self._last_poll = time.monotonic()
+            old = {name: stamp for name, (_, stamp) in self._files.items()}
+            new = {name: stamp for name, (_, stamp) in files.items()}
+            if old == new:
+                return False
+            for name in set(self._loaded) - set(files):
+                del self._loaded[name]
+            self._files = files
+            self.version += 1
+        changed = sorted(
+            name for name in set(old) | set(new) if old.get(name) != new.get(name)
+        )
+        logger.info(f"Templates changed on disk: {', '.join(changed)}")
+        return True
+
+    def poll(self) -> bool:
+        """Refresh if ``poll_interval`` has passed since the last scan"""
+        if time.monotonic() - self._last_poll < self.poll_interval:
+            return False
+        return self.refresh()
+
+    def _load(self, name: str) -> Optional[Tuple[Stamp, str, Any]]:
+        """Current (stamp, source, parsed) of a template, parsing if needed"""
+        path, stamp = self._files[name]
+        loaded = self._loaded.get(name)
+        if (loaded is not None and loaded[0] == stamp) or self._failed.get(
+            name
+        ) == stamp:
+            return loaded
+        try:
+            source = path.read_text(encoding="utf-8")
+            parsed = self.parse(source)
+        except Exception as e:
+            logger.error(f"Failed to load template {name} from {path}: {e}")
+            self._failed[name] = stamp
+            return loaded
+        with self._lock:
+            self._loaded[name] = (stamp, source, parsed)
+            self._failed.pop(name, None)
+        return self._loaded[name]
+
+    def get(self, name: str) -> Any:
+        """Parsed template; KeyError if missing or it never parsed"""
+        loaded = self._load(name) if name in self._files else None
+        if loaded is None:
+            raise KeyError(name)
+        return loaded[2]
+
+    def source(self, name: str) -> str:
+        """Source text of the currently loaded version of a template"""
+        loaded = self._load(name) if name in self._files else None
+        if loaded is None:
+            raise KeyError(name)
+        return loaded[1]
+
+    def read(self, name: str) -> str:
+        """Source text of a template, read without parsing or caching it"""
+        path, stamp = self._files[name]
+        loaded = self._loaded.get(name)
+        if loaded is not None and loaded[0] == stamp:
+            return loaded[1]
+        return path.read_text(encoding="utf-8")
+
+    def usable(self, name: str) -> bool:
+        """False if the template is missing or known not to parse, without loading it"""
+        if name not in self._files:
+            return False
+        return self._failed.get(name) != self._files[name][1] or name in self._loaded
+
+    def loaded(self) -> Tuple[str, ...]:
+        """Names of the templates parsed so far"""
+        return tuple(self._loaded)
+
+    def fingerprint(self) -> str:
+        """Hash of every template's name and content
+
+        Unlike the size and mtime used for polling, it does not change when
+        a checkout or ``touch`` rewrites files with the same text.
+        """
+        digest = hashlib.sha256()
+        for name, (path, _) in sorted(self._files.items()):
+            try:
+                content = path.read_bytes()
+            except OSError:  # removed since the last scan
+                content = b""
+            digest.update(name.encode("utf-8") + b"\0")
+            digest.update(hashlib.sha256(content).digest())
+        return digest.hexdigest()
+
+    def view(self, key_type: Type[Enum], sources: bool = False) -> "TemplateView":
+        """Mapping from ``key_type`` members to parsed templates or sources"""
+        return TemplateView(self, key_type, sources)
+
+
+class TemplateView(Mapping):
+    """Read-only mapping over the store, keyed by Enum members named by value
+
+    Lookups load templates lazily and iteration loads nothing; templates
+    that fail to parse are absent once they have been tried.
+    """
+
+    def __init__(
+        self, store: TemplateStore, key_type: Type[Enum], sources: bool = False
+    ):
+        self._store = store
+        self._names = {member: member.value for member in key_type}
+        self._get = store.source if sources else store.get
+
+    def __getitem__(self, key: Any) -> Any:
+        name = self._names.get(key) if isinstance(key, Enum) else None
+        if name is None:
+            raise KeyError(key)
+        return self._get(name)
+
+    def __contains__(self, key: object) -> bool:
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self) -> Iterator[Enum]:
+        members = {name: member for member, name in self._names.items()}
+        return (
+            members[name]
+            for name in self._store
+            if name in members and self._store.usable(name)
+        )
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
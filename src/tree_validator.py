@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+"""
+Validate every playbook in a directory tree
+
+``validate_tree`` walks a directory for ``*.yml``/``*.yaml`` files, skipping
+hidden directories such as ``.git``, and validates them across a process
+pool. Results are persisted in a JSON cache keyed by content hash, next to
+each file's size and mtime:
+
+- a file whose size and mtime match the cache is not read at all;
+- a changed file is read and hashed, and only validated if no result for
+  that content is cached, so reverted and renamed files are free too.
+
+A re-run over an unchanged tree therefore costs about one stat per file.
+The cache is discarded when the validator's rule set or the source of the
+validation modules changes. It lives in the user cache directory, outside
+the validated tree.
+
+YAML files that are not play lists, such as group_vars, inventories and
+role task files, are marked as such and only keep syntax errors and the
+issues found in their raw text, such as hardcoded secrets. The returned
+TreeReport serializes to a machine-readable JSON report:
+
+    python -m src.tree_validator playbooks/ --workers 8 --report report.json
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    from . import secret_scanner, yaml_backend
+    from .playbook_validator import (
+        ERROR,
+        SOURCE,
+        WARNING,
+        PlaybookValidator,
+        ValidationIssue,
+    )
+except ImportError:  # executed directly as a script
+    import secret_scanner
+    import yaml_backend
+    from playbook_validator import (
+        ERROR,
+        SOURCE,
+        WARNING,
+        PlaybookValidator,
+        ValidationIssue,
+    )
+
+logger = logging.getLogger(__name__)
+
+CACHE_ENV_VAR = "ANSIBLE_MCP_VALIDATION_CACHE"
+# Directory under $XDG_CACHE_HOME (default ~/.cache) holding one cache file
+# per validated tree unless configured otherwise
+CACHE_DIR_NAME = "ansible-mcp"
+CACHE_FORMAT = 2
+REPORT_FORMAT = 2
+PLAYBOOK_SUFFIXES = (".yml", ".yaml")
+# Keys of which a play has at least one
+PLAY_KEYS = frozenset(
+    (
+        "hosts",
+        "import_playbook",
+        "ansible.builtin.import_playbook",
+        "roles",
+        "tasks",
+        "pre_tasks",
+        "post_tasks",
+    )
+)
+
+# (size, mtime in ns) identifying one version of a file
+Stamp = Tuple[int, int]
+
+
+@dataclass
+class FileResult:
+    """Validation outcome for one file of the tree"""
+
+    # Relative to the tree root, with "/" separators
+    path: str
+    sha256: str
+    issues: List[ValidationIssue]
+    # True if the result came from the cache rather than a validation run
+    cached: bool = False
+    # False for YAML that is not a play list; see is_playbook
+    playbook: bool = True
+
+    @property
+    def valid(self) -> bool:
+        return not any(issue.severity == ERROR for issue in self.issues)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "sha256": self.sha256,
+            "valid": self.valid,
+            "cached": self.cached,
+            "playbook": self.playbook,
+            "issues": [issue.to_dict() for issue in self.issues],
+        }
+
+
+@dataclass
+class TreeReport:
+    """Results for every playbook file under ``root``, in path order"""
+
+    root: str
+    files: List[FileResult]
+    seconds: float
+
+    @property
+    def valid(self) -> bool:
+        return all(result.valid for result in self.files)
+
+    def count(self, severity: str) -> int:
+        return sum(
+            issue.severity == severity
+            for result in self.files
+            for issue in result.issues
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "format": REPORT_FORMAT,
+            "root": self.root,
+            "valid": self.valid,
+            "files": len(self.files),
+            "playbooks": sum(result.playbook for result in self.files),
+            "validated": sum(not result.cached for result in self.files),
+            "cached": sum(result.cached for result in self.files),
+            "errors": self.count(ERROR),
+            "warnings": self.count(WARNING),
+            "seconds": self.seconds,
+            "results": [result.to_dict() for result in self.files],
+        }
+
+
+def is_playbook(data: Any) -> bool:
+    """True for parsed YAML that is a list holding at least one play"""
+    return isinstance(data, list) and any(
+        isinstance(item, Mapping) and not PLAY_KEYS.isdisjoint(item) for item in data
+    )
+
+
+def default_cache_path(root: str) -> str:
+    """Cache file for ``root`` in the user cache directory"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    key = hashlib.sha256(os.path.abspath(root).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(base, CACHE_DIR_NAME, f"validation-{key}.json")
+
+
+def validator_version(validator: PlaybookValidator) -> str:
+    """Hash of the source of the modules that produce validation results
+
+    Covers the validator, every rule's module, the secret scanner and the
+    YAML backend, so cached results are dropped when any of them changes.
+    """
+    names = {
+        PlaybookValidator.__module__,
+        type(validator).__module__,
+        secret_scanner.__name__,
+        yaml_backend.__name__,
+    }
+    names.update(type(rule).__module__ for rule in validator.rules)
+    digest = hashlib.sha256()
+    for name in sorted(names):
+        digest.update(name.encode("utf-8") + b"\0")
+        path = getattr(sys.modules.get(name), "__file__", None)
+        if path:
+            try:
+                digest.update(hashlib.sha256(Path(path).read_bytes()).digest())
+            except OSError:
+                pass
+    return digest.hexdigest()
+
+
+# Cached outcome for one content hash: {"playbook": bool, "issues": [issue dicts]}
+Entry = Dict[str, Any]
+
+
+class _ResultCache:
+    """Persisted outcomes by content hash and content hash by file stamp"""
+
+    def __init__(self, path: str, rules: List[str], version: str):
+        self.path = path
+        self.rules = rules
+        self.version = version
+        # relative path -> (stamp, sha256)
+        self.files: Dict[str, Tuple[Stamp, str]] = {}
+        # sha256 -> outcome
+        self.results: Dict[str, Entry] = {}
+        self.changed = False
+
+    @classmethod
+    def load(cls, path: str, rules: List[str], version: str) -> "_ResultCache":
+        cache = cls(path, rules, version)
+        try:
+            with open(path, encoding="utf-8") as handle:
+                data = json.load(handle)
+        except FileNotFoundError:
+            return cache
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable validation cache {path}: {e}")
+            return cache
+        if (
+            data.get("format") != CACHE_FORMAT
+            or data.get("rules") != rules
+            or data.get("version") != version
+        ):
+            logger.info(
+                f"Validation cache {path} was built by other rules or code, revalidating"
+            )
+            return cache
+        cache.files = {
+            name: ((size, mtime), digest)
+            for name, (size, mtime, digest) in data["files"].items()
+        }
+        cache.results = data["results"]
+        return cache
+
+    def digest(self, name: str, stamp: Stamp) -> Optional[str]:
+        """Content hash of an unchanged file with a cached result"""
+        entry = self.files.get(name)
+        if entry is None or entry[0] != stamp or entry[1] not in self.results:
+            return None
+        return entry[1]
+
+    def prune(self, names: Sequence[str]) -> None:
+        """Forget files no longer in the tree and results no file refers to"""
+        live = set(names)
+        for name in [name for name in self.files if name not in live]:
+            del self.files[name]
+            self.changed = True
+        referenced = {digest for _, digest in self.files.values()}
+        for digest in [digest for digest in self.results if digest not in referenced]:
+            del self.results[digest]
+            self.changed = True
+
+    def save(self) -> None:
+        """Write the cache as JSON, replacing it atomically"""
+        data = {
+            "format": CACHE_FORMAT,
+            "rules": self.rules,
+            "version": self.version,
+            "files": {
+                name: [*stamp, digest] for name, (stamp, digest) in self.files.items()
+            },
+            "results": self.results,
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as handle:
+            json.dump(data, handle, separators=(",", ":"))
+        os.replace(tmp, self.path)
+
+
+class _FileChecker:
+    """Hashes a file and validates it unless its hash is already known"""
+
+    def __init__(self, validator: PlaybookValidator, known: frozenset):
+        self.validator = validator
+        self.known = known
+        # Issues that also apply to YAML that is not a playbook
+        self.text_rules = frozenset(
+            ["syntax"] + [rule.id for rule in validator.rules if SOURCE in rule.events]
+        )
+
+    def __call__(self, path: str) -> Tuple[str, Optional[Entry]]:
+        """(sha256, outcome), with the outcome None if the hash is known"""
+        try:
+            with open(path, "rb") as handle:
+                content = handle.read()
+        except OSError as e:
+            return "", _entry(
+                True, [ValidationIssue(ERROR, f"Cannot read file: {e}", rule="io")]
+            )
+        digest = hashlib.sha256(content).hexdigest()
+        if digest in self.known:
+            return digest, None
+        try:
+            text = content.decode("utf-8")
+        except UnicodeDecodeError as e:
+            return digest, _entry(
+                True,
+                [ValidationIssue(ERROR, f"File is not UTF-8 text: {e}", rule="io")],
+            )
+        result = self.validator.validate(text)
+        # Text that does not parse cannot be told apart and is reported as is
+        if is_playbook(result.data) or any(
+            issue.rule == "syntax" for issue in result.issues
+        ):
+            return digest, _entry(True, result.issues)
+        return digest, _entry(
+            False, [issue for issue in result.issues if issue.rule in self.text_rules]
+        )
+
+
+def _entry(playbook: bool, issues: List[ValidationIssue]) -> Entry:
+    return {"playbook": playbook, "issues": [issue.to_dict() for issue in issues]}
+
+
+def _result(name: str, digest: str, entry: Entry, cached: bool) -> FileResult:
+    issues = [ValidationIssue.from_dict(issue) for issue in entry["issues"]]
+    return FileResult(name, digest, issues, cached, entry["playbook"])
+
+
+# Checker used by worker processes, set by _init_worker
+_worker_checker: Optional[_FileChecker] = None
+
+
+def _init_worker(checker: _FileChecker) -> None:
+    global _worker_checker
+    _worker_checker = checker
+
+
+def _check_in_worker(path: str) -> Tuple[str, Optional[Entry]]:
+    return _worker_checker(path)
+
+
+def _walk(root: str) -> Iterator[Tuple[str, str, Stamp]]:
+    """(relative name, path, stamp) of every playbook file"""
+    for directory, dirs, files in os.walk(root):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for filename in files:
+            if not filename.endswith(PLAYBOOK_SUFFIXES):
+                continue
+            path = os.path.join(directory, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            name = Path(os.path.relpath(path, root)).as_posix()
+            yield name, path, (stat.st_size, stat.st_mtime_ns)
+
+
+def _check_files(
+    checker: _FileChecker,
+    paths: List[str],
+    workers: Optional[int],
+    chunksize: Optional[int],
+) -> List[Tuple[str, Optional[Entry]]]:
+    if workers is None or workers <= 1 or len(paths) < 2:
+        return [checker(path) for path in paths]
+    if "fork" in multiprocessing.get_all_start_methods():
+        mp_context = multiprocessing.get_context("fork")
+    else:
+        mp_context = multiprocessing.get_context()
+    if chunksize is None:
+        chunksize = max(1, len(paths) // (workers * 4))
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=mp_context,
+        initializer=_init_worker,
+        initargs=(checker,),
+    ) as executor:
+        return list(executor.map(_check_in_worker, paths, chunksize=chunksize))
+
+
+def validate_tree(
+    root: str,
+    workers: Optional[int] = None,
+    cache_path: Optional[str] = None,
+    validator: Optional[PlaybookValidator] = None,
+    chunksize: Optional[int] = None,
+) -> TreeReport:
+    """Validate every playbook under ``root``, reusing cached results
+
+    ``cache_path`` defaults to $ANSIBLE_MCP_VALIDATION_CACHE, else a file
+    named after ``root`` in the user cache directory (default_cache_path).
+    """
+    start = time.perf_counter()
+    if validator is None:
+        validator = PlaybookValidator()
+    if cache_path is None:
+        cache_path = os.environ.get(CACHE_ENV_VAR) or default_cache_path(root)
+    cache = _ResultCache.load(
+        cache_path, [rule.id for rule in validator.rules], validator_version(validator)
+    )
+
+    files = sorted(_walk(root))
+    results: Dict[str, FileResult] = {}
+    pending = []
+    for name, path, stamp in files:
+        digest = cache.digest(name, stamp)
+        if digest is None:
+            pending.append((name, path, stamp))
+        else:
+            results[name] = _result(name, digest, cache.results[digest], cached=True)
+
+    checker = _FileChecker(validator, frozenset(cache.results))
+    outcomes = _check_files(
+        checker, [path for _, path, _ in pending], workers, chunksize
+    )
+    for (name, _, stamp), (digest, entry) in zip(pending, outcomes):
+        cached = entry is None
+        if cached:
+            entry = cache.results[digest]
+        elif digest:
+            cache.results[digest] = entry
+        if digest:
+            cache.files[name] = (stamp, digest)
+            cache.changed = True
+        results[name] = _result(name, digest, entry, cached)
+
+    cache.prune([name for name, _, _ in files])
+    if cache.changed:
+        try:
+            cache.save()
+        except OSError as e:
+            logger.warning(f"Could not write validation cache {cache_path}: {e}")
+
+    report = TreeReport(
+        root, [results[name] for name, _, _ in files], time.perf_counter() - start
+    )
+    logger.info(
+        f"Validated {len(files)} files under {root} in {report.seconds * 1000:.1f} ms "
+        f"({len(files) - len(pending)} unchanged, {sum(not r.cached for r in report.files)} validated)"
+    )
+    return report
+
+
+def main():
+    """Validate a directory of playbooks"""
+    parser = argparse.ArgumentParser(
+        description="Validate every playbook in a directory tree"
+    )
+    parser.add_argument("root", help="directory to walk")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count(), help="worker processes"
+    )
+    parser.add_argument(
+        "--cache",
+        help=f"result cache file (default: ${CACHE_ENV_VAR} or one per root in ~/.cache/{CACHE_DIR_NAME})",
+    )
+    parser.add_argument("--report", help="write the JSON report here, '-' for stdout")
+    args = parser.parse_args()
+
+    report = validate_tree(args.root, workers=args.workers, cache_path=args.cache)
+    if args.report == "-":
+        json.dump(report.to_dict(), sys.stdout, indent=2)
+        print()
+    else:
+        if args.report:
+            with open(args.report, "w", encoding="utf-8") as handle:
+                json.dump(report.to_dict(), handle, indent=2)
+        for result in report.files:
+            for issue in result.issues:
+                location = (
+                    f"{issue.line}:{issue.column}" if issue.line is not None else "-"
+                )
+                print(
+                    f"{result.path}:{location}: {issue.severity} [{issue.rule}] {issue.message}"
+                )
+        playbooks = sum(result.playbook for result in report.files)
+        print(
+            f"{len(report.files)} files ({playbooks} playbooks), {report.count(ERROR)} errors, "
+            f"{report.count(WARNING)} warnings in {report.seconds:.2f}s"
+        )
+    sys.exit(0 if report.valid else 1)
+
+
+if __name__ == "__main__":
+    main()
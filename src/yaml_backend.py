@@ -0,0 +1,250 @@
+"""
+YAML backend layer
+
+Uses PyYAML's libyaml bindings (CSafeLoader/CSafeDumper) when PyYAML was built
+with them and falls back to the pure-Python implementation otherwise. Both
+backends are configured to produce byte-identical output, so switching between
+them never changes generated playbooks, cache keys or diffs.
+
+The backend can be forced with the ANSIBLE_MCP_YAML_BACKEND environment
+variable (``auto``, ``libyaml`` or ``python``).
+"""
+
+import logging
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import yaml
+from yaml.events import (
+    DocumentEndEvent,
+    DocumentStartEvent,
+    MappingEndEvent,
+    MappingStartEvent,
+    ScalarEvent,
+    SequenceEndEvent,
+    SequenceStartEvent,
+    StreamEndEvent,
+    StreamStartEvent,
+)
+from yaml.nodes import MappingNode, Node, ScalarNode, SequenceNode
+
+try:
+    from .playbook_model import FrozenDict
+except ImportError:  # executed directly as a script
+    from playbook_model import FrozenDict
+
+logger = logging.getLogger(__name__)
+
+BACKEND_ENV_VAR = "ANSIBLE_MCP_YAML_BACKEND"
+LIBYAML_AVAILABLE = bool(getattr(yaml, "__with_libyaml__", False))
+
+YAMLError = yaml.YAMLError
+
+
+class PurePlaybookDumper(yaml.SafeDumper):
+    """Pure-Python SafeDumper for frozen playbook documents"""
+
+    def ignore_aliases(self, data):
+        # Shared nodes may appear more than once; never emit &id/*id aliases
+        return True
+
+
+PurePlaybookDumper.add_representer(FrozenDict, yaml.SafeDumper.represent_dict)
+PurePlaybookDumper.add_representer(tuple, yaml.SafeDumper.represent_list)
+
+if LIBYAML_AVAILABLE:
+
+    class CPlaybookDumper(yaml.CSafeDumper):
+        """libyaml-backed SafeDumper for frozen playbook documents"""
+
+        def ignore_aliases(self, data):
+            return True
+
+    CPlaybookDumper.add_representer(FrozenDict, yaml.SafeDumper.represent_dict)
+    CPlaybookDumper.add_representer(tuple, yaml.SafeDumper.represent_list)
+
+
+class _ChunkWriter:
+    """File-like sink collecting emitter output between drains"""
+
+    def __init__(self):
+        self._parts: List[str] = []
+
+    def write(self, data: str) -> None:
+        self._parts.append(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> str:
+        chunk = "".join(self._parts)
+        self._parts.clear()
+        return chunk
+
+
+def _node_events(dumper: Any, node: Any) -> Iterator[Any]:
+    """Serialize a representation node into emitter events
+
+    Mirrors yaml.serializer.Serializer for documents without anchors, which
+    also works with the libyaml dumper that has no serialize_node().
+    """
+    if isinstance(node, ScalarNode):
+        detected_tag = dumper.resolve(ScalarNode, node.value, (True, False))
+        default_tag = dumper.resolve(ScalarNode, node.value, (False, True))
+        implicit = (node.tag == detected_tag, node.tag == default_tag)
+        yield ScalarEvent(None, node.tag, implicit, node.value, style=node.style)
+    elif isinstance(node, SequenceNode):
+        implicit = node.tag == dumper.resolve(SequenceNode, node.value, True)
+        yield SequenceStartEvent(None, node.tag, implicit, flow_style=node.flow_style)
+        for item in node.value:
+            yield from _node_events(dumper, item)
+        yield SequenceEndEvent()
+    elif isinstance(node, MappingNode):
+        implicit = node.tag == dumper.resolve(MappingNode, node.value, True)
+        yield MappingStartEvent(None, node.tag, implicit, flow_style=node.flow_style)
+        for key, value in node.value:
+            yield from _node_events(dumper, key)
+            yield from _node_events(dumper, value)
+        yield MappingEndEvent()
+
+
+class YAMLBackend:
+    """A loader/dumper pair with the options used for playbooks"""
+
+    def __init__(self, name: str, loader: type, dumper: type):
+        self.name = name
+        self.loader = loader
+        self.dumper = dumper
+
+    def load(self, stream: Any) -> Any:
+        """Parse a single YAML document"""
+        return yaml.load(stream, Loader=self.loader)
+
+    def compose(self, stream: Any) -> Tuple[Optional[Node], Any]:
+        """Parse a single document into its node tree and its data
+
+        The nodes carry start marks for diagnostics; the data equals
+        ``load(stream)`` and is constructed from the same parse.
+        """
+        loader = self.loader(stream)
+        try:
+            node = loader.get_single_node()
+            data = loader.construct_document(node) if node is not None else None
+        finally:
+            loader.dispose()
+        return node, data
+
+    def dump(self, data: Any) -> str:
+        """Serialize data in block style, preserving key order"""
+        return yaml.dump(
+            data, Dumper=self.dumper, default_flow_style=False, sort_keys=False
+        )
+
+    def dump_stream(self, plays: Iterable[Any]) -> Iterator[str]:
+        """Serialize a sequence of plays incrementally
+
+        Yields text as each play header and each list item (task, handler)
+        is emitted, so ``plays`` may be a lazy iterable and peak memory is
+        bounded by the largest single item (the libyaml emitter buffers up to
+        about 16 KiB before it flushes). The concatenated chunks equal
+        ``dump(list(plays))``.
+        """
+        writer = _ChunkWriter()
+        dumper = self.dumper(writer, default_flow_style=False, sort_keys=False)
+        emit = dumper.emit
+
+        emit(StreamStartEvent())
+        emit(DocumentStartEvent(explicit=False))
+        emit(SequenceStartEvent(None, None, True, flow_style=False))
+
+        for play in plays:
+            emit(MappingStartEvent(None, None, True, flow_style=False))
+            for key, value in play.items():
+                for event in _node_events(dumper, dumper.represent_data(key)):
+                    emit(event)
+                if isinstance(value, (list, tuple)) and value:
+                    # Stream long lists such as tasks one item at a time
+                    emit(SequenceStartEvent(None, None, True, flow_style=False))
+                    for item in value:
+                        for event in _node_events(dumper, dumper.represent_data(item)):
+                            emit(event)
+                        chunk = writer.drain()
+                        if chunk:
+                            yield chunk
+                    emit(SequenceEndEvent())
+                else:
+                    for event in _node_events(dumper, dumper.represent_data(value)):
+                        emit(event)
+            emit(MappingEndEvent())
+            chunk = writer.drain()
+            if chunk:
+                yield chunk
+
+        emit(SequenceEndEvent())
+        emit(DocumentEndEvent(explicit=False))
+        emit(StreamEndEvent())
+        dumper.dispose()
+        chunk = writer.drain()
+        if chunk:
+            yield chunk
+
+    def __repr__(self) -> str:
+        return f"YAMLBackend({self.name!r})"
+
+
+BACKENDS: Dict[str, YAMLBackend] = {
+    "python": YAMLBackend("python", yaml.SafeLoader, PurePlaybookDumper),
+}
+if LIBYAML_AVAILABLE:
+    BACKENDS["libyaml"] = YAMLBackend("libyaml", yaml.CSafeLoader, CPlaybookDumper)
+
+
+def resolve_backend(name: Optional[str] = None) -> YAMLBackend:
+    """Return the backend for ``name``, falling back to pure Python"""
+    name = (name or os.environ.get(BACKEND_ENV_VAR) or "auto").lower()
+
+    if name == "auto":
+        return BACKENDS["libyaml"] if LIBYAML_AVAILABLE else BACKENDS["python"]
+    if name not in ("libyaml", "python"):
+        raise ValueError(
+            f"Unknown YAML backend '{name}', expected auto, libyaml or python"
+        )
+    if name not in BACKENDS:
+        logger.warning("PyYAML was built without libyaml, using the Python backend")
+        return BACKENDS["python"]
+    return BACKENDS[name]
+
+
+_active = resolve_backend()
+
+
+def active_backend() -> str:
+    """Name of the backend used by load() and dump()"""
+    return _active.name
+
+
+def use_backend(name: Optional[str] = None) -> str:
+    """Switch the module-wide backend and return the name actually selected"""
+    global _active
+    _active = resolve_backend(name)
+    return _active.name
+
+
+def load(stream: Any) -> Any:
+    """Parse YAML with the active backend"""
+    return _active.load(stream)
+
+
+def compose(stream: Any) -> Tuple[Optional[Node], Any]:
+    """Parse YAML into nodes and data with the active backend"""
+    return _active.compose(stream)
+
+
+def dump(data: Any) -> str:
+    """Serialize YAML with the active backend"""
+    return _active.dump(data)
+
+
+def dump_stream(plays: Iterable[Any]) -> Iterator[str]:
+    """Serialize plays incrementally with the active backend"""
+    return _active.dump_stream(plays)
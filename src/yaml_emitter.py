@@ -0,0 +1,236 @@
+"""
+Minimal block-style YAML emitter for the playbook subset
+
+Generated playbooks only contain mappings, sequences, strings, integers,
+floats, booleans and nulls. This emitter writes exactly that subset, in the
+same layout as ``yaml.dump(..., default_flow_style=False, sort_keys=False)``,
+without PyYAML's representer/serializer/emitter stack. It guarantees that
+``yaml.safe_load(emit(data)) == data``; unlike the PyYAML backends it does
+not wrap long lines, so the bytes are not identical to ``yaml.dump``.
+"""
+
+import math
+import re
+from typing import Any, Iterable, Iterator, List
+
+import yaml
+
+# Plain scalars: no leading indicator or whitespace and nothing the YAML
+# scanner would read as structure. Everything else is quoted.
+_PLAIN_RE = re.compile(r"[A-Za-z0-9_./$^~(=+\\][\x20-\x7e]*")
+_PLAIN_BREAKERS = (": ", " #", "\t")
+
+# Characters that are printable in YAML and not treated as line breaks
+_PRINTABLE_RE = re.compile(
+    "[\x20-\x7e\xa0-\u2027\u202a-\ud7ff\ue000-\ufefe\uff00-\ufffd\U00010000-\U0010ffff]*"
+)
+
+_IMPLICIT_RESOLVERS = yaml.SafeLoader.yaml_implicit_resolvers
+
+_ESCAPES = {
+    "\0": "\\0",
+    "\a": "\\a",
+    "\b": "\\b",
+    "\t": "\\t",
+    "\n": "\\n",
+    "\v": "\\v",
+    "\f": "\\f",
+    "\r": "\\r",
+    "\x1b": "\\e",
+    '"': '\\"',
+    "\\": "\\\\",
+    "\x85": "\\N",
+    "\xa0": "\\_",
+    "\u2028": "\\L",
+    "\u2029": "\\P",
+}
+
+# Quoted forms of recently seen strings; template strings repeat heavily
+_scalar_cache: dict = {}
+_SCALAR_CACHE_LIMIT = 16384
+
+
+def _resolves_to_str(value: str) -> bool:
+    """True if a plain scalar would load back as a string"""
+    resolvers = _IMPLICIT_RESOLVERS.get(value[0] if value else "", [])
+    for _, regexp in resolvers:
+        if regexp.match(value):
+            return False
+    for _, regexp in _IMPLICIT_RESOLVERS.get(None, []):
+        if regexp.match(value):
+            return False
+    return True
+
+
+def _double_quoted(value: str) -> str:
+    """Double-quoted scalar with YAML escapes"""
+    chars = []
+    for char in value:
+        escape = _ESCAPES.get(char)
+        if escape is not None:
+            chars.append(escape)
+        elif _PRINTABLE_RE.fullmatch(char):
+            chars.append(char)
+        elif ord(char) <= 0xFF:
+            chars.append(f"\\x{ord(char):02X}")
+        elif ord(char) <= 0xFFFF:
+            chars.append(f"\\u{ord(char):04X}")
+        else:
+            chars.append(f"\\U{ord(char):08X}")
+    return '"' + "".join(chars) + '"'
+
+
+def _quote(value: str) -> str:
+    """Shortest safe single-line representation of a string"""
+    if (
+        _PLAIN_RE.fullmatch(value)
+        and not value.endswith((":", " "))
+        and not value.startswith("...")
+        and not any(breaker in value for breaker in _PLAIN_BREAKERS)
+        and _resolves_to_str(value)
+    ):
+        return value
+    if _PRINTABLE_RE.fullmatch(value):
+        return "'" + value.replace("'", "''") + "'"
+    return _double_quoted(value)
+
+
+def _literal_block(value: str, indent: int) -> str:
+    """Literal block scalar (``|``) for a multi-line string, or '' if unsafe"""
+    if value[0] in " \t\n" or not _PRINTABLE_RE.fullmatch(value.replace("\n", "")):
+        return ""
+    body = value.rstrip("\n")
+    trailing = len(value) - len(body)
+    lines = body.split("\n")
+    if any(line.endswith((" ", "\t")) for line in lines):
+        return ""
+
+    chomping = {0: "-", 1: ""}.get(trailing, "+")
+    padding = " " * (indent + 2)
+    text = "\n".join(padding + line if line else "" for line in lines)
+    return f"|{chomping}\n{text}\n" + "\n" * (trailing - 1 if trailing > 1 else 0)
+
+
+def _scalar(value: Any) -> str:
+    """Inline representation of a non-container value"""
+    if value is None:
+        return "null"
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, float):
+        if math.isnan(value):
+            return ".nan"
+        if math.isinf(value):
+            return ".inf" if value > 0 else "-.inf"
+        text = repr(value)
+        if "e" in text and "." not in text:
+            # YAML 1.1 floats need a fraction before the exponent
+            mantissa, exponent = text.split("e")
+            text = f"{mantissa}.0e{exponent}"
+        return text
+    if isinstance(value, str):
+        quoted = _scalar_cache.get(value)
+        if quoted is None:
+            if len(_scalar_cache) >= _SCALAR_CACHE_LIMIT:
+                _scalar_cache.clear()
+            quoted = _scalar_cache[value] = _quote(value)
+        return quoted
+    raise TypeError(f"Cannot emit {type(value).__name__} as playbook YAML")
+
+
+def _value(value: Any, indent: int) -> str:
+    """Text following ``key:`` or ``-`` for a scalar or empty container"""
+    if isinstance(value, str) and "\n" in value:
+        block = _literal_block(value, indent)
+        if block:
+            return " " + block
+    if isinstance(value, dict):
+        return " {}\n"
+    if isinstance(value, (list, tuple)):
+        return " []\n"
+    return " " + _scalar(value) + "\n"
+
+
+def _emit_mapping(mapping: dict, indent: int, out: List[str], first: str) -> None:
+    """Block mapping whose first line starts with ``first``"""
+    prefix = first
+    for key, value in mapping.items():
+        out.append(prefix)
+        out.append(_scalar(key))
+        out.append(":")
+        if isinstance(value, dict) and value:
+            out.append("\n")
+            pad = " " * (indent + 2)
+            _emit_mapping(value, indent + 2, out, pad)
+        elif isinstance(value, (list, tuple)) and value:
+            out.append("\n")
+            _emit_sequence(value, indent, out, " " * indent)
+        else:
+            out.append(_value(value, indent))
+        prefix = " " * indent
+
+
+def _emit_sequence(sequence: Iterable, indent: int, out: List[str], first: str) -> None:
+    """Block sequence whose first line starts with ``first``"""
+    prefix = first
+    for item in sequence:
+        if isinstance(item, dict) and item:
+            _emit_mapping(item, indent + 2, out, prefix + "- ")
+        elif isinstance(item, (list, tuple)) and item:
+            _emit_sequence(item, indent + 2, out, prefix + "- ")
+        else:
+            out.append(prefix + "-")
+            out.append(_value(item, indent))
+        prefix = " " * indent
+
+
+def emit(data: Any) -> str:
+    """Serialize playbook data as block-style YAML"""
+    out: List[str] = []
+    if isinstance(data, dict) and data:
+        _emit_mapping(data, 0, out, "")
+    elif isinstance(data, (list, tuple)) and data:
+        _emit_sequence(data, 0, out, "")
+    else:
+        out.append(_value(data, 0)[1:])
+    return "".join(out)
+
+
+def emit_stream(plays: Iterable[Any]) -> Iterator[str]:
+    """Serialize plays one play header and list item at a time
+
+    The concatenated chunks equal ``emit(list(plays))``.
+    """
+    empty = True
+    for play in plays:
+        empty = False
+        if not isinstance(play, dict) or not play:
+            yield emit([play])
+            continue
+
+        out: List[str] = []
+        prefix = "- "
+        for key, value in play.items():
+            out.append(prefix + _scalar(key) + ":")
+            if isinstance(value, (list, tuple)) and value:
+                out.append("\n")
+                yield "".join(out)
+                for item in value:
+                    out = []
+                    _emit_sequence((item,), 2, out, "  ")
+                    yield "".join(out)
+                out = []
+            elif isinstance(value, dict) and value:
+                out.append("\n")
+                _emit_mapping(value, 4, out, "    ")
+            else:
+                out.append(_value(value, 2))
+            prefix = "  "
+        if out:
+            yield "".join(out)
+    if empty:
+        yield emit([])
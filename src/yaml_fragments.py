@@ -0,0 +1,110 @@
+"""
+Pre-serialized YAML fragments
+
+A block-style dump of a play is the concatenation of the dumps of its keys,
+and a list value is its header line followed by the dumps of its items. The
+requirement enhancers only append constant items to list keys, so their
+output can be produced by splicing text serialized once instead of dumping
+the enhanced document on every request. The result is byte-identical to
+``yaml_backend.dump()`` of the enhanced document.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional
+
+try:
+    from . import yaml_backend
+except ImportError:  # executed directly as a script
+    import yaml_backend
+
+
+def _item_names(items: Iterable[Any]) -> FrozenSet[str]:
+    """Names of the mapping items in a list, e.g. task or handler names"""
+    return frozenset(
+        item["name"] for item in items if isinstance(item, Mapping) and "name" in item
+    )
+
+
+@dataclass(frozen=True)
+class Fragment:
+    """Constant items appended to the list at ``key`` of a play
+
+    ``text`` is the items serialized at play-key indentation. A ``unique``
+    fragment is skipped when every item name in ``names`` is already present
+    in the list, which is how handlers are deduplicated.
+    """
+
+    key: str
+    text: str
+    names: FrozenSet[str]
+    unique: bool = False
+
+    @classmethod
+    def build(cls, key: str, items: Iterable[Any], unique: bool = False) -> "Fragment":
+        items = tuple(items)
+        text = yaml_backend.dump([{key: items}])
+        return cls(key, text[text.index("\n") + 1 :], _item_names(items), unique)
+
+
+class SplicedPlay:
+    """A play serialized key by key so fragments can be spliced in"""
+
+    def __init__(self, play: Mapping[str, Any]):
+        self.keys: List[str] = list(play)
+        # Serialized "key: value" text per key, indented as a non-first key
+        self.segments: Dict[str, str] = {}
+        # "key:" header lines and serialized items for list-valued keys
+        self.headers: Dict[str, str] = {}
+        self.items: Dict[str, str] = {}
+        self.names: Dict[str, FrozenSet[str]] = {}
+
+        for key, value in play.items():
+            text = "  " + yaml_backend.dump([{key: value}])[2:]
+            self.segments[key] = text
+            if isinstance(value, (list, tuple)):
+                self.names[key] = _item_names(value)
+                if value:
+                    split = text.index("\n") + 1
+                    self.headers[key], self.items[key] = text[:split], text[split:]
+
+    def header(self, key: str) -> str:
+        """Header line used when items are appended to ``key``"""
+        header = self.headers.get(key)
+        if header is None:
+            # Empty or missing list; the header does not depend on the items
+            text = yaml_backend.dump([{key: [None]}])
+            header = self.headers[key] = "  " + text[2 : text.index("\n") + 1]
+        return header
+
+    def render(self, fragments: Iterable[Fragment]) -> str:
+        """Serialize the play with ``fragments`` appended in order"""
+        appended: Dict[str, List[str]] = {}
+        present: Dict[str, FrozenSet[str]] = {}
+        for fragment in fragments:
+            key = fragment.key
+            names = present.get(key, self.names.get(key, frozenset()))
+            if fragment.unique and fragment.names <= names:
+                continue
+            present[key] = names | fragment.names
+            appended.setdefault(key, []).append(fragment.text)
+
+        # Like with_appended, missing keys are added at the end
+        new_keys = [key for key in appended if key not in self.segments]
+        parts = []
+        for key in self.keys + new_keys:
+            extra = appended.get(key)
+            if extra is None:
+                parts.append(self.segments[key])
+            else:
+                parts.append(self.header(key))
+                parts.append(self.items.get(key, ""))
+                parts.extend(extra)
+        parts[0] = "- " + parts[0][2:]
+        return "".join(parts)
+
+
+def splice_template(playbook: Any) -> Optional[SplicedPlay]:
+    """SplicedPlay for a single-play playbook, or None if it has more plays"""
+    if len(playbook) != 1 or not playbook[0]:
+        return None
+    return SplicedPlay(playbook[0])
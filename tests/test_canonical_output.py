@@ -0,0 +1,123 @@
+"""
+Snapshot tests for deterministic, canonical playbook output
+
+The generator is run in fresh interpreters under different PYTHONHASHSEED
+values; every process must produce byte-identical results.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from src.playbook_generator import PlaybookContext, PlaybookGenerator, PlaybookType
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+HASH_SEEDS = ["0", "1", "42", "4096", "2147483647"]
+
+SNAPSHOT_SCRIPT = r"""
+import json
+import logging
+
+logging.disable(logging.CRITICAL)
+
+from src.playbook_generator import PlaybookContext, PlaybookGenerator
+
+PROMPTS = [
+    "Deploy a kubernetes application with 5 replicas and monitoring",
+    "Setup Docker with compose and secure the system, install and update it",
+    "Configure PostgreSQL database with replication and backup and restore",
+    "Install and configure Prometheus and Grafana for monitoring",
+    "Harden system security with firewall and SSH configuration",
+    "deploy something generic to dev with ha failover and encrypt",
+]
+
+generator = PlaybookGenerator(canonical=True)
+snapshot = []
+for prompt in PROMPTS:
+    context = generator.analyze_prompt(prompt)
+    context.variables = {"zeta": {"b": 1, "a": 2}, "alpha": [3, 2, 1]}
+    snapshot.append(
+        {
+            "type": str(context.playbook_type),
+            "environment": context.environment,
+            "requirements": context.requirements,
+            "tags": context.tags,
+            "playbook": generator.generate(context),
+        }
+    )
+print(json.dumps(snapshot))
+"""
+
+
+def run_snapshot(seed: str) -> bytes:
+    """Run the snapshot script in a fresh interpreter"""
+    env = dict(os.environ, PYTHONHASHSEED=seed)
+    result = subprocess.run(
+        [sys.executable, "-c", SNAPSHOT_SCRIPT],
+        cwd=REPO_ROOT,
+        env=env,
+        capture_output=True,
+        check=True,
+    )
+    return result.stdout
+
+
+class TestCrossProcessDeterminism:
+    """Tests that output does not depend on the hash seed"""
+
+    def test_identical_bytes_across_hash_seeds(self):
+        """Should produce identical bytes under every PYTHONHASHSEED"""
+        outputs = {seed: run_snapshot(seed) for seed in HASH_SEEDS}
+        reference = outputs[HASH_SEEDS[0]]
+
+        assert reference
+        for seed, output in outputs.items():
+            assert output == reference, f"Output differs for PYTHONHASHSEED={seed}"
+
+
+class TestCanonicalMode:
+    """Tests for canonical ordering within one process"""
+
+    @pytest.fixture
+    def generator(self):
+        return PlaybookGenerator(canonical=True, use_cache=False)
+
+    def test_tags_keep_first_seen_order(self, generator):
+        """Should return tags in a stable order without duplicates"""
+        tags = generator._generate_tags("install, deploy and update")
+        assert tags == ["setup", "install", "deploy", "rollout", "update", "upgrade"]
+
+    def test_requirement_order_does_not_matter(self, generator):
+        """Should apply enhancers in canonical order"""
+        a = PlaybookContext(
+            prompt="x",
+            playbook_type=PlaybookType.SYSTEM,
+            requirements=["backup", "security", "high_availability"],
+        )
+        b = PlaybookContext(
+            prompt="x",
+            playbook_type=PlaybookType.SYSTEM,
+            requirements=["high_availability", "backup", "security", "backup"],
+        )
+        assert generator.generate(a) == generator.generate(b)
+
+    def test_variable_order_does_not_matter(self, generator):
+        """Should emit variables with sorted keys"""
+        a = PlaybookContext(prompt="x", variables={"b": {"y": 1, "x": 2}, "a": 1})
+        b = PlaybookContext(prompt="x", variables={"a": 1, "b": {"x": 2, "y": 1}})
+        assert generator.generate(a) == generator.generate(b)
+
+    def test_default_mode_keeps_requirement_order(self):
+        """Should keep the caller's requirement order outside canonical mode"""
+        generator = PlaybookGenerator(use_cache=False)
+        a = PlaybookContext(
+            prompt="x", playbook_type=PlaybookType.SYSTEM, requirements=["backup", "security"]
+        )
+        b = PlaybookContext(
+            prompt="x", playbook_type=PlaybookType.SYSTEM, requirements=["security", "backup"]
+        )
+        assert generator.generate(a) != generator.generate(b)
@@ -0,0 +1,169 @@
+"""
+Unit tests for the generated-playbook cache
+"""
+
+import pytest
+
+from src.generation_cache import GenerationCache, fingerprint
+from src.playbook_generator import PlaybookContext, PlaybookGenerator, PlaybookType
+
+
+class FakeClock:
+    """Manually advanced monotonic clock"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestFingerprint:
+    """Tests for canonical context hashing"""
+
+    def test_variable_order_is_irrelevant(self):
+        """Should hash variables canonically"""
+        a = PlaybookContext(prompt="x", variables={"a": 1, "b": 2})
+        b = PlaybookContext(prompt="y", variables={"b": 2, "a": 1})
+        assert fingerprint(a) == fingerprint(b)
+
+    def test_tag_order_is_irrelevant(self):
+        """Should hash tags as a sorted set"""
+        a = PlaybookContext(prompt="x", tags=["setup", "deploy"])
+        b = PlaybookContext(prompt="x", tags=["deploy", "setup", "deploy"])
+        assert fingerprint(a) == fingerprint(b)
+
+    def test_relevant_fields_change_hash(self):
+        """Should distinguish type, hosts, environment and requirements"""
+        base = PlaybookContext(prompt="x", playbook_type=PlaybookType.DOCKER)
+        variants = [
+            PlaybookContext(prompt="x", playbook_type=PlaybookType.SYSTEM),
+            PlaybookContext(prompt="x", playbook_type=PlaybookType.DOCKER, target_hosts="web"),
+            PlaybookContext(prompt="x", playbook_type=PlaybookType.DOCKER, environment="staging"),
+            PlaybookContext(prompt="x", playbook_type=PlaybookType.DOCKER, requirements=["backup"]),
+        ]
+        keys = {fingerprint(base)} | {fingerprint(v) for v in variants}
+        assert len(keys) == 5
+
+    def test_key_types_kept_apart(self):
+        """Should hash int and str keys differently and accept mixed key types"""
+        ints = PlaybookContext(prompt="x", variables={"ports": {80: "http"}})
+        strs = PlaybookContext(prompt="x", variables={"ports": {"80": "http"}})
+        assert fingerprint(ints) != fingerprint(strs)
+        mixed = PlaybookContext(prompt="x", variables={"a": {1: "x", "b": 2}})
+        same = PlaybookContext(prompt="x", variables={"a": {"b": 2, 1: "x"}})
+        assert fingerprint(mixed) == fingerprint(same)
+
+    def test_extra_inputs_change_hash(self):
+        """Should include generator-specific inputs"""
+        context = PlaybookContext(prompt="x")
+        assert fingerprint(context, title="a") != fingerprint(context, title="b")
+
+
+class TestGenerationCache:
+    """Tests for LRU, size and TTL behaviour"""
+
+    def test_hit_and_miss_counters(self):
+        """Should count hits and misses"""
+        cache = GenerationCache()
+        assert cache.get("a") is None
+        cache.put("a", "value")
+        assert cache.get("a") == "value"
+
+        stats = cache.stats
+        assert (stats.hits, stats.misses, stats.entries) == (1, 1, 1)
+        assert stats.hit_rate == 0.5
+
+    def test_entry_bound_evicts_lru(self):
+        """Should evict the least recently used entry"""
+        cache = GenerationCache(max_entries=2)
+        cache.put("a", "1")
+        cache.put("b", "2")
+        cache.get("a")
+        cache.put("c", "3")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "1"
+        assert cache.stats.evictions == 1
+
+    def test_byte_bound(self):
+        """Should keep total size under max_bytes"""
+        cache = GenerationCache(max_bytes=10)
+        cache.put("a", "x" * 6)
+        cache.put("b", "y" * 6)
+
+        assert len(cache) == 1
+        assert cache.stats.bytes == 6
+        cache.put("huge", "z" * 11)
+        assert cache.get("huge") is None
+
+    def test_ttl_expiry(self):
+        """Should expire entries older than the TTL"""
+        clock = FakeClock()
+        cache = GenerationCache(ttl=10, clock=clock)
+        cache.put("a", "1")
+        clock.now = 5
+        assert cache.get("a") == "1"
+        clock.now = 16
+        assert cache.get("a") is None
+        assert cache.stats.expirations == 1
+
+    def test_invalidate(self):
+        """Should drop all entries"""
+        cache = GenerationCache()
+        cache.put("a", "1")
+        cache.put("b", "2")
+        assert cache.invalidate() == 2
+        assert len(cache) == 0
+        assert cache.stats.bytes == 0
+
+    def test_disabled_with_zero_entries(self):
+        """Should store nothing when max_entries is 0"""
+        cache = GenerationCache(max_entries=0)
+        cache.put("a", "1")
+        assert cache.get("a") is None
+
+
+class TestGeneratorCaching:
+    """Tests for PlaybookGenerator cache integration"""
+
+    @pytest.fixture
+    def generator(self):
+        return PlaybookGenerator()
+
+    def test_repeated_prompt_hits_cache(self, generator):
+        """Should serve identical contexts from the cache"""
+        prompt = "Deploy a kubernetes application with monitoring"
+        first = generator.generate(generator.analyze_prompt(prompt))
+        second = generator.generate(generator.analyze_prompt(prompt))
+
+        assert first == second
+        assert generator.cache.stats.hits == 1
+
+    def test_generic_prompts_not_conflated(self, generator):
+        """Should keep generic playbooks with different titles apart"""
+        a = generator.generate(PlaybookContext(prompt="first thing"))
+        b = generator.generate(PlaybookContext(prompt="second thing"))
+        assert a != b
+
+    def test_key_types_served_correctly(self, generator):
+        """Should not serve a playbook generated for other key types"""
+        ints = generator.generate(PlaybookContext(prompt="x", variables={"ports": {80: "http"}}))
+        strs = generator.generate(PlaybookContext(prompt="x", variables={"ports": {"80": "http"}}))
+        assert strs == PlaybookGenerator(use_cache=False).generate(
+            PlaybookContext(prompt="x", variables={"ports": {"80": "http"}})
+        )
+        assert ints != strs
+        assert generator.generate(PlaybookContext(prompt="x", variables={"a": {1: "x", "b": 2}}))
+
+    def test_cache_can_be_disabled(self):
+        """Should generate without a cache when requested"""
+        generator = PlaybookGenerator(use_cache=False)
+        assert generator.cache is None
+        assert generator.invalidate_cache() == 0
+        assert generator.generate(PlaybookContext(prompt="x"))
+
+    def test_invalidate_cache(self, generator):
+        """Should clear the generator cache"""
+        generator.generate(PlaybookContext(prompt="x"))
+        assert generator.invalidate_cache() == 1
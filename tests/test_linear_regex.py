@@ -0,0 +1,51 @@
+"""
+Unit tests for the linear-time regex check
+"""
+
+import pytest
+
+from src import prompt_analyzer, template_index
+from src.linear_regex import NonLinearPatternError, check_linear, is_linear
+
+
+class TestCheckLinear:
+    """Tests for the conservative linear-time subset"""
+
+    @pytest.mark.parametrize("pattern", [
+        r"\w+",
+        r"AKIA[0-9A-Z]{16}",
+        r"-----BEGIN (?:RSA |EC |DSA |OPENSSH )?PRIVATE KEY-----",
+        r"\b(k8s|kubernetes|kubectl)\b",
+        r"password['\":\s]{0,8}['\"]?([^'\"}\s]{8,})",
+        r"(foo\w+|bar)",
+        r"gh[ps]_[a-zA-Z0-9]{36}",
+        r"(?:ab){1,500}c",
+    ])
+    def test_accepts_bounded_patterns(self, pattern):
+        """Should accept bounded elements with at most a single-character tail"""
+        check_linear(pattern)
+
+    @pytest.mark.parametrize("pattern", [
+        r"(a+)+$",
+        r"\w+x",
+        r".*secret",
+        r"password['\":\s]*['\"]?([^'\"}\s]{8,})",
+        r"(a|ab)*",
+        r"(ab)+",
+        r"(\w)\1",
+        r"(?=a+)",
+        r"a{2000}",
+        r"(?:a|a){1,24}b",
+        r"(?:a|ab){1,500}c",
+        r"(?:a?b){1,8}c",
+    ])
+    def test_rejects_backtracking_patterns(self, pattern):
+        """Should reject unbounded repeats that are not a single-character tail"""
+        with pytest.raises(NonLinearPatternError):
+            check_linear(pattern)
+        assert not is_linear(pattern)
+
+    def test_prompt_scanning_patterns_are_linear(self):
+        """Should accept every pattern run over untrusted prompts"""
+        check_linear(prompt_analyzer._TOKEN_RE)
+        check_linear(template_index._TERM_RE)
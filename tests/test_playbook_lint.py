@@ -0,0 +1,180 @@
+"""
+Unit tests for the native lint engine
+"""
+
+import io
+import json
+
+import pytest
+
+from src.playbook_lint import LINT_RULES, PlaybookLinter, format_issue, serve
+
+
+def rules_for(task_yaml, play_extra=""):
+    """Lint one task and return the rule ids reported for it"""
+    text = f"- name: Play\n  hosts: all\n{play_extra}  tasks:\n" + "".join(
+        f"    {line}\n" for line in task_yaml.strip("\n").splitlines()
+    )
+    return [issue.rule for issue in PlaybookLinter().lint(text).issues]
+
+
+class TestLintRules:
+    """Each rule against a violating and a clean task"""
+
+    @pytest.mark.parametrize("bad,good,rule", [
+        ("- ansible.builtin.ping:", "- name: Ping\n  ansible.builtin.ping:", "name[missing]"),
+        ("- name: ping it\n  ansible.builtin.ping:", "- name: Ping it\n  ansible.builtin.ping:", "name[casing]"),
+        ("- name: Ping\n  ping:", "- name: Ping\n  ansible.builtin.ping:", "fqcn[action-core]"),
+        (
+            "- name: Allow\n  ufw: {rule: allow}",
+            "- name: Allow\n  community.general.ufw: {rule: allow}",
+            "fqcn[action]",
+        ),
+        (
+            "- name: Run\n  ansible.builtin.command: /bin/run",
+            "- name: Run\n  ansible.builtin.command: /bin/run\n  changed_when: false",
+            "no-changed-when",
+        ),
+        (
+            "- name: Restart\n  ansible.builtin.command: systemctl restart nginx\n  changed_when: true",
+            "- name: Reload\n  ansible.builtin.command: systemctl daemon-reload\n  changed_when: true",
+            "command-instead-of-module",
+        ),
+        (
+            "- name: List\n  ansible.builtin.shell: ls /tmp\n  changed_when: false",
+            "- name: List\n  ansible.builtin.shell: ls /tmp | wc -l\n  changed_when: false",
+            "command-instead-of-shell",
+        ),
+        (
+            "- name: Conf\n  ansible.builtin.template: {src: a, dest: /etc/a}",
+            "- name: Conf\n  ansible.builtin.template: {src: a, dest: /etc/a, mode: '0644'}",
+            "risky-file-permissions",
+        ),
+        (
+            "- name: Dir\n  ansible.builtin.file: {path: /opt/x, state: directory}",
+            "- name: Dir\n  ansible.builtin.file: {path: /opt/x, state: absent}",
+            "risky-file-permissions",
+        ),
+        (
+            "- name: Nginx\n  ansible.builtin.package: {name: nginx, state: latest}",
+            "- name: Nginx\n  ansible.builtin.package: {name: nginx, state: present}",
+            "package-latest",
+        ),
+        (
+            "- name: Ping\n  ansible.builtin.ping:\n  ignore_errors: true",
+            "- name: Ping\n  ansible.builtin.ping:\n  failed_when: false",
+            "ignore-errors",
+        ),
+        (
+            "- name: Ping\n  ansible.builtin.ping:\n  when: '{{ enabled }}'",
+            "- name: Ping\n  ansible.builtin.ping:\n  when: enabled",
+            "no-jinja-when",
+        ),
+        (
+            "- name: Ping\n  ansible.builtin.ping:\n  when: enabled == True",
+            "- name: Ping\n  ansible.builtin.ping:\n  when: enabled",
+            "literal-compare",
+        ),
+        (
+            "- name: Ping\n  ansible.builtin.ping:\n  become_user: app",
+            "- name: Ping\n  ansible.builtin.ping:\n  become: true\n  become_user: app",
+            "partial-become",
+        ),
+        (
+            "- ansible.builtin.ping:\n  name: Ping",
+            "- name: Ping\n  ansible.builtin.ping:",
+            "key-order[task]",
+        ),
+    ])
+    def test_rule(self, bad, good, rule):
+        """Should report the rule for the bad task only"""
+        assert rule in rules_for(bad)
+        assert rule not in rules_for(good)
+
+    def test_rule_ids(self):
+        """Should register every rule under its ansible-lint id"""
+        assert {
+            "name[missing]", "name[play]", "name[casing]", "fqcn[action-core]", "fqcn[action]",
+            "no-changed-when", "command-instead-of-module", "command-instead-of-shell",
+            "risky-file-permissions", "package-latest", "ignore-errors", "no-jinja-when",
+            "literal-compare", "partial-become", "key-order[task]",
+        } == set(LINT_RULES)
+
+    def test_play_level_become(self):
+        """Should accept become_user when the play sets become"""
+        task = "- name: Ping\n  ansible.builtin.ping:\n  become_user: app"
+        assert "partial-become" not in rules_for(task, "  become: true\n")
+
+    def test_loop_keywords_are_not_modules(self):
+        """Should skip every with_<lookup> key when looking for the module"""
+        task = "- name: Install\n  with_nested: [[a], [b]]\n  ansible.builtin.package: {name: x, state: latest}"
+        assert rules_for(task) == ["package-latest"]
+
+    @pytest.mark.parametrize("task,rules", [
+        (
+            "- name: Restart\n  local_action: command systemctl restart nginx\n  changed_when: true",
+            ["fqcn[action-core]", "command-instead-of-module"],
+        ),
+        (
+            "- name: Latest\n  action: {module: ansible.builtin.apt, name: x, state: latest}",
+            ["package-latest"],
+        ),
+    ])
+    def test_action_resolves_module(self, task, rules):
+        """Should lint the module named by action and local_action"""
+        assert rules_for(task) == rules
+
+    def test_nested_blocks_linted(self):
+        """Should lint tasks inside block and rescue"""
+        task = "- name: Guard\n  block:\n    - name: Latest\n      apt: {name: x, state: latest}"
+        assert rules_for(task) == ["fqcn[action-core]", "package-latest"]
+
+
+class TestPlaybookLinter:
+    """Tests for PlaybookLinter"""
+
+    def test_ansible_lint_ids_for_load_errors(self):
+        """Should report parse and shape errors under ansible-lint ids"""
+        linter = PlaybookLinter()
+        assert [i.rule for i in linter.lint("- hosts: [all\n").issues] == ["load-failure"]
+        assert [i.rule for i in linter.lint("hosts: all\n").issues] == ["syntax-check"]
+
+    def test_skip(self):
+        """Should not run skipped rules"""
+        linter = PlaybookLinter(skip=["fqcn[action-core]"])
+        assert "fqcn[action-core]" not in {rule.id for rule in linter.rules}
+        assert rules_for("- name: Ping\n  ping:") == ["fqcn[action-core]"]
+        text = "- name: Play\n  hosts: all\n  tasks:\n    - name: Ping\n      ping:\n"
+        assert linter.lint(text).issues == []
+
+    def test_noqa(self):
+        """Should drop issues on lines marked noqa for their rule or for all rules"""
+        text = (
+            "- name: Play\n  hosts: all\n  tasks:\n"
+            "    - name: first  # noqa: name[casing]\n      ping:\n"
+            "    - name: second  # noqa\n      ping:\n"
+            "    - name: third  # noqa: ignore-errors\n      ansible.builtin.ping:\n"
+        )
+        issues = PlaybookLinter().lint(text).issues
+        assert [(i.line, i.rule) for i in issues] == [(4, "fqcn[action-core]"), (8, "name[casing]")]
+        assert format_issue("site.yml", issues[1]) == (
+            "site.yml:8:7: name[casing]: All names should start with an uppercase letter."
+        )
+
+    def test_serve(self, temp_dir):
+        """Should answer JSON line requests by path or content"""
+        path = temp_dir / "site.yml"
+        path.write_text("- name: Play\n  hosts: all\n  tasks:\n    - ping:\n")
+        requests = io.StringIO(
+            json.dumps({"id": 1, "path": str(path)}) + "\n"
+            + json.dumps({"id": 2, "content": "- name: Play\n  hosts: all\n  tasks: []\n"}) + "\n"
+            + json.dumps({"id": 3, "path": str(temp_dir / "missing.yml")}) + "\n"
+            + "not json\n"
+        )
+        out = io.StringIO()
+        serve(PlaybookLinter(), requests, out)
+        responses = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert [r.get("id") for r in responses] == [1, 2, 3, None]
+        assert {i["rule"] for i in responses[0]["issues"]} == {"name[missing]", "fqcn[action-core]"}
+        assert responses[1]["issues"] == []
+        assert "error" in responses[2] and "error" in responses[3]
@@ -0,0 +1,95 @@
+"""
+Unit tests for the immutable playbook document model
+"""
+
+import copy
+import pickle
+
+import pytest
+
+from src.playbook_model import (
+    FrozenDict,
+    freeze,
+    thaw,
+    with_appended,
+    with_item,
+    with_value,
+)
+
+
+@pytest.fixture
+def play():
+    return freeze(
+        {
+            "name": "Test",
+            "hosts": "all",
+            "tasks": [{"name": "Task 1", "debug": {"msg": "one"}}],
+        }
+    )
+
+
+class TestFreeze:
+    """Tests for freezing and thawing documents"""
+
+    def test_freeze_converts_containers(self, play):
+        """Should turn dicts into FrozenDict and lists into tuples"""
+        assert isinstance(play, FrozenDict)
+        assert isinstance(play["tasks"], tuple)
+        assert isinstance(play["tasks"][0]["debug"], FrozenDict)
+
+    def test_frozen_dict_rejects_mutation(self, play):
+        """Should raise on every mutating dict method"""
+        with pytest.raises(TypeError):
+            play["hosts"] = "web"
+        with pytest.raises(TypeError):
+            del play["hosts"]
+        with pytest.raises(TypeError):
+            play.update(hosts="web")
+        with pytest.raises(TypeError):
+            play.setdefault("become", True)
+
+    def test_thaw_round_trip(self, play):
+        """Should restore plain dicts and lists"""
+        data = thaw(play)
+        assert type(data) is dict
+        assert type(data["tasks"]) is list
+        assert freeze(data) == play
+
+    def test_copy_and_pickle(self, play):
+        """Should be shareable across copies and picklable for workers"""
+        assert copy.deepcopy(play) is play
+        restored = pickle.loads(pickle.dumps(play))
+        assert restored == play
+        assert isinstance(restored, FrozenDict)
+
+
+class TestStructuralSharing:
+    """Tests for copy-on-write updates"""
+
+    def test_with_appended_shares_existing_items(self, play):
+        """Should reuse untouched tasks and leave the original intact"""
+        updated = with_appended(play, "tasks", [{"name": "Task 2", "ping": {}}])
+
+        assert len(play["tasks"]) == 1
+        assert len(updated["tasks"]) == 2
+        assert updated["tasks"][0] is play["tasks"][0]
+        assert updated["hosts"] is play["hosts"]
+
+    def test_with_appended_adds_missing_key_last(self, play):
+        """Should append a new key after the existing ones"""
+        updated = with_appended(play, "handlers", [{"name": "restart"}])
+        assert list(updated) == ["name", "hosts", "tasks", "handlers"]
+
+    def test_with_value_keeps_key_order(self, play):
+        """Should replace values in place"""
+        updated = with_value(play, "hosts", "web")
+        assert list(updated) == list(play)
+        assert updated["hosts"] == "web"
+        assert play["hosts"] == "all"
+
+    def test_with_item_replaces_one_element(self, play):
+        """Should share the other elements of the sequence"""
+        plays = (play, play)
+        updated = with_item(plays, 1, with_value(play, "hosts", "web"))
+        assert updated[0] is play
+        assert updated[1]["hosts"] == "web"
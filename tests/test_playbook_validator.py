@@ -0,0 +1,224 @@
+"""
+Unit tests for playbook validation
+"""
+
+import pytest
+
+from src import yaml_backend
+from src.playbook_generator import PlaybookContext, PlaybookGenerator, PlaybookType
+from src.playbook_model import freeze
+from src.playbook_validator import (
+    BLOCK,
+    ERROR,
+    EVENTS,
+    RULES,
+    TASK,
+    WARNING,
+    PlaybookValidator,
+    Rule,
+    ValidationIssue,
+    register_rule,
+)
+
+PLAYBOOK = """\
+- name: Web
+  hosts: web
+  tasks:
+    - name: Install nginx
+      package:
+        name: nginx
+    - package:
+        name: curl
+    - name: Nothing to do
+      tags: [noop]
+- name: Empty
+  become: true
+"""
+
+
+@pytest.fixture
+def validator():
+    return PlaybookValidator()
+
+
+class TestValidate:
+    """Tests for PlaybookValidator.validate"""
+
+    def test_issues_carry_positions(self, validator):
+        """Should report line, column and path for each issue"""
+        result = validator.validate(PLAYBOOK)
+        assert result.valid
+        assert result.data == yaml_backend.load(PLAYBOOK)
+        assert [(i.message, i.line, i.column, i.path) for i in result.warnings] == [
+            ("Task missing 'name' field", 7, 7, (0, "tasks", 1)),
+            ("Task 'Nothing to do' has no action module", 9, 7, (0, "tasks", 2)),
+            ("Play missing 'hosts' field", 11, 3, (1,)),
+            ("Play has neither 'tasks' nor 'roles'", 11, 3, (1,)),
+        ]
+        assert str(result.warnings[0]) == "line 7, column 7: Task missing 'name' field"
+
+    @pytest.mark.parametrize("backend", sorted(yaml_backend.BACKENDS))
+    def test_backends_agree(self, validator, backend):
+        """Should find the same positions with either YAML backend"""
+        previous = yaml_backend.active_backend()
+        yaml_backend.use_backend(backend)
+        try:
+            issues = validator.validate(PLAYBOOK).issues
+        finally:
+            yaml_backend.use_backend(previous)
+        assert [(i.line, i.column) for i in issues] == [(7, 7), (9, 7), (11, 3), (11, 3)]
+
+    def test_parsed_data_uses_paths(self, validator):
+        """Should check parsed data as is and locate issues by path"""
+        data = freeze(yaml_backend.load(PLAYBOOK))
+        result = validator.validate(data)
+        assert result.data is data
+        assert [str(issue) for issue in result.warnings] == [
+            "[0].tasks[1]: Task missing 'name' field",
+            "[0].tasks[2]: Task 'Nothing to do' has no action module",
+            "[1]: Play missing 'hosts' field",
+            "[1]: Play has neither 'tasks' nor 'roles'",
+        ]
+        assert validator.validate_structure(data) == [str(i) for i in result.warnings]
+
+    def test_syntax_error(self, validator):
+        """Should report a syntax error with its position and no data"""
+        result = validator.validate("- name: x\n  hosts: [web\n")
+        assert not result.valid
+        assert result.data is None
+        (issue,) = result.errors
+        assert issue.severity == ERROR
+        assert issue.line == 3
+
+    @pytest.mark.parametrize("text,message", [
+        ("", "Playbook must be a list of plays"),
+        ("hosts: all\n", "Playbook must be a list of plays"),
+        ("- just a string\n", "Play must be a mapping"),
+        ("- hosts: all\n  tasks: [oops]\n", "Task must be a mapping"),
+    ])
+    def test_shape_errors(self, validator, text, message):
+        """Should report documents that are not plays and tasks as errors"""
+        result = validator.validate(text)
+        assert not result.valid
+        assert result.errors[0].message == message
+
+    def test_issue_without_location(self):
+        """Should print just the message for document-level issues"""
+        assert str(ValidationIssue(WARNING, "Empty playbook")) == "Empty playbook"
+
+
+class TestGeneratorValidate:
+    """Tests for validating generated playbooks without re-parsing"""
+
+    @pytest.mark.parametrize("playbook_type", [PlaybookType.DOCKER, None])
+    def test_generated_playbooks_valid(self, playbook_type):
+        """Should validate the built playbook with the same outcome as its text"""
+        generator = PlaybookGenerator(use_cache=False)
+        context = PlaybookContext(
+            prompt="install things", playbook_type=playbook_type, requirements=["security"]
+        )
+        result = generator.validate(context)
+        assert result.valid
+        text_result = generator.validator.validate(generator.generate(context))
+        assert [i.message for i in result.issues] == [i.message for i in text_result.issues]
+
+
+class CountingRule(Rule):
+    """Records every element it is shown"""
+
+    id = "counting"
+    events = EVENTS
+
+    def __init__(self):
+        self.seen = []
+
+    def check(self, element, reporter):
+        self.seen.append((element.kind, element.path))
+
+
+NESTED = """\
+- hosts: all
+  tasks:
+    - name: Guarded
+      block:
+        - name: Try
+          command: /bin/true
+        - command: /bin/false
+      rescue:
+        - name: Recover
+      always:
+        - name: Clean up
+          file: {path: /tmp/x, state: absent}
+  handlers:
+    - name: restart
+      service: {name: x, state: restarted}
+    - listen: reload
+"""
+
+
+class TestRules:
+    """Tests for the rule registry and the traversal"""
+
+    def test_default_rules_registered(self):
+        """Should build the default rule set from the registry"""
+        assert {rule.id for rule in PlaybookValidator().rules} == set(RULES)
+        assert {"play-hosts", "play-tasks", "task-name", "task-action"} <= set(RULES)
+
+    def test_visits_nested_blocks(self):
+        """Should recurse into block, rescue and always with positions"""
+        result = PlaybookValidator().validate(NESTED)
+        assert [(i.rule, i.line, i.path) for i in result.issues] == [
+            ("task-name", 7, (0, "tasks", 0, "block", 1)),
+            ("task-action", 9, (0, "tasks", 0, "rescue", 0)),
+            ("task-name", 16, (0, "handlers", 1)),
+            ("task-action", 16, (0, "handlers", 1)),
+        ]
+        assert str(result.issues[2]) == "line 16, column 7: Handler missing 'name' field"
+
+    def test_task_keywords_are_not_actions(self):
+        """Should report tasks made only of keywords, loops included"""
+        text = (
+            "- name: Play\n  hosts: all\n  tasks:\n"
+            "    - name: Loop\n      with_sequence: start=1 end=3\n      connection: local\n"
+            "    - name: Local\n      local_action: command true\n"
+        )
+        issues = PlaybookValidator().validate(text).issues
+        assert [(i.rule, i.line) for i in issues] == [("task-action", 4)]
+
+    def test_each_element_visited_once(self):
+        """Should show every element to a rule exactly once per validation"""
+        rule = CountingRule()
+        PlaybookValidator([rule]).validate(NESTED)
+        assert rule.seen == [
+            ("source", ()),
+            ("play", (0,)),
+            ("block", (0, "tasks", 0)),
+            ("task", (0, "tasks", 0, "block", 0)),
+            ("task", (0, "tasks", 0, "block", 1)),
+            ("task", (0, "tasks", 0, "rescue", 0)),
+            ("task", (0, "tasks", 0, "always", 0)),
+            ("handler", (0, "handlers", 0)),
+            ("handler", (0, "handlers", 1)),
+        ]
+
+    def test_rules_only_see_their_events(self):
+        """Should dispatch elements only to the rules subscribed to their kind"""
+
+        class BlockRule(Rule):
+            id = "block-named"
+            events = (BLOCK,)
+
+            def check(self, element, reporter):
+                if "name" not in element.data:
+                    reporter.report(self, element, "Block missing 'name' field")
+
+        result = PlaybookValidator([BlockRule()]).validate("- hosts: all\n  tasks:\n    - block: [{command: x}]\n")
+        assert [(i.rule, i.path) for i in result.issues] == [("block-named", (0, "tasks", 0))]
+
+    def test_register_rule_validates(self):
+        """Should reject rules without an id or with unknown events"""
+        with pytest.raises(ValueError):
+            register_rule(type("NoId", (Rule,), {"events": (TASK,)}))
+        with pytest.raises(ValueError):
+            register_rule(type("Bad", (Rule,), {"id": "bad", "events": ("role",)}))
+        assert "bad" not in RULES
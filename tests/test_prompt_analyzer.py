@@ -0,0 +1,364 @@
+"""
+Unit tests for the single-pass prompt analyzer
+"""
+
+import random
+import re
+import time
+
+import pytest
+
+from src.playbook_generator import TYPO_TOLERANCE_ENV_VAR, PlaybookGenerator, PlaybookType
+from src.prompt_analyzer import (
+    CACHED_PROMPT_LENGTH,
+    HARDENED_MAX_PROMPT_LENGTH,
+    REQUIREMENT_KEYWORDS,
+    TAG_KEYWORDS,
+    TYPE_KEYWORDS,
+    AhoCorasick,
+    PromptAnalyzer,
+    PromptTooLargeError,
+    TypoIndex,
+    osa_distance,
+)
+from src.prompt_scoring import FUZZY_CONFIDENCE
+
+# =============================================================================
+# Reference implementation: the regex scans the analyzer replaced
+# =============================================================================
+
+TYPE_PATTERNS = {
+    "kubernetes": re.compile(r"\b(k8s|kubernetes|kubectl|pod|deployment|service|ingress)\b", re.I),
+    "docker": re.compile(r"\b(docker|container|compose|dockerfile|registry)\b", re.I),
+    "database": re.compile(r"\b(mysql|postgres|mongodb|redis|database|db)\b", re.I),
+    "monitoring": re.compile(r"\b(prometheus|grafana|monitoring|metrics|alerts)\b", re.I),
+    "security": re.compile(r"\b(security|firewall|ssh|tls|certificate|vault)\b", re.I),
+    "network": re.compile(r"\b(network|routing|dns|load.?balanc|nginx|haproxy)\b", re.I),
+}
+
+REQUIREMENT_PATTERNS = {
+    "high_availability": r"\b(high.?availability|ha|redundant|failover)\b",
+    "scalability": r"\b(scal[ae]bl|auto.?scal|elastic)\b",
+    "security": r"\b(secur|encrypt|tls|ssl|firewall)\b",
+    "monitoring": r"\b(monitor|metric|log|observ)\b",
+    "backup": r"\b(backup|restore|disaster.?recovery)\b",
+    "performance": r"\b(perform|optimiz|cache|fast)\b",
+}
+
+
+def reference_analysis(prompt):
+    """What analyze_prompt computed before the single-pass analyzer"""
+    playbook_type = None
+    for name, pattern in TYPE_PATTERNS.items():
+        if pattern.search(prompt):
+            playbook_type = name
+            break
+
+    environment = None
+    if "production" in prompt.lower():
+        environment = "production"
+    elif "staging" in prompt.lower():
+        environment = "staging"
+    elif "development" in prompt.lower() or "dev" in prompt.lower():
+        environment = "development"
+
+    requirements = [
+        name for name, pattern in REQUIREMENT_PATTERNS.items() if re.search(pattern, prompt, re.I)
+    ]
+
+    tags = ["setup"]
+    for keyword, tag_list in TAG_KEYWORDS.items():
+        if keyword in prompt.lower():
+            tags.extend(tag_list)
+
+    actions = [a for a in ("install", "configure", "deploy") if a in prompt.lower()]
+    return playbook_type, environment, requirements, list(dict.fromkeys(tags)), actions
+
+
+def random_prompt(rng):
+    words = [
+        keyword.replace(".?", rng.choice(["", " ", "-", "_", "x", "\n", "  "]))
+        for table in (TYPE_KEYWORDS, REQUIREMENT_KEYWORDS)
+        for keywords in table.values()
+        for keyword in keywords
+    ]
+    words += list(TAG_KEYWORDS) + ["production", "staging", "dev", "Development", "web", "app", "with"]
+    parts = []
+    for _ in range(rng.randint(0, 12)):
+        word = rng.choice(words)
+        if rng.random() < 0.2:
+            word = word.upper()
+        if rng.random() < 0.2:
+            word = rng.choice(["re", "un", "x", "_"]) + word
+        if rng.random() < 0.2:
+            word += rng.choice(["s", "ing", "er", "ed", "_x"])
+        parts.append(word)
+        parts.append(rng.choice([" ", " ", ", ", "-", ".", "\n", "/", ""]))
+    return "".join(parts)
+
+
+class TestEquivalence:
+    """The analyzer must reproduce the previous regex-based analysis"""
+
+    @pytest.mark.parametrize("seed", range(4))
+    def test_random_prompts(self, seed):
+        """Should agree with the regex scans on generated prompts"""
+        rng = random.Random(seed)
+        analyzer = PromptAnalyzer(typo_tolerance=False)
+        for _ in range(2000):
+            prompt = random_prompt(rng)
+            analysis = analyzer.scan(prompt)
+            got = (
+                analysis.playbook_type,
+                analysis.environment,
+                list(analysis.requirements),
+                list(analysis.tags),
+                list(analysis.actions),
+            )
+            assert got == reference_analysis(prompt), prompt
+
+    @pytest.mark.parametrize("prompt", [
+        "Set up a load balancer with haproxy",
+        "loadbalanc the web tier",
+        "load\nbalanc",
+        "High-Availability postgres cluster",
+        "high_availability redis",
+        "highXavailability",
+        "auto-scal workers",
+        "disaster recovery for mysql",
+        "Deploy a kubernetes application with postgres in development",
+        "devices in the lab",
+        "",
+        "Müller's naïve k8s setup",
+    ])
+    def test_edge_cases(self, prompt):
+        """Should agree on gap keywords, separators, case and substrings"""
+        analysis = PromptAnalyzer(typo_tolerance=False).scan(prompt)
+        assert (
+            analysis.playbook_type,
+            analysis.environment,
+            list(analysis.requirements),
+            list(analysis.tags),
+            list(analysis.actions),
+        ) == reference_analysis(prompt)
+
+
+class TestAhoCorasick:
+    """Tests for the substring automaton"""
+
+    def test_overlapping_keywords(self):
+        """Should report keywords that overlap or contain each other"""
+        automaton = AhoCorasick(["he", "she", "his", "hers"])
+        assert automaton.find("ushers") == {"he", "she", "hers"}
+
+    def test_no_match(self):
+        """Should return an empty set when nothing matches"""
+        assert AhoCorasick(["dev"]).find("prod") == frozenset()
+
+
+class TestTypoTolerance:
+    """Tests for typo-tolerant type keyword matching"""
+
+    @pytest.mark.parametrize("left,right,distance", [
+        ("kubernets", "kubernetes", 1),
+        ("postgress", "postgres", 1),
+        ("promethues", "prometheus", 1),
+        ("dokcerfiel", "dockerfile", 2),
+        ("ca", "abc", 3),
+        ("", "abc", 3),
+    ])
+    def test_osa_distance(self, left, right, distance):
+        """Should count insertions, deletions, substitutions and swaps"""
+        assert osa_distance(left, right) == distance
+
+    @pytest.mark.parametrize("prompt,playbook_type", [
+        ("Roll out kubernets to the cluster", PlaybookType.KUBERNETES),
+        ("Tune postgress replication", PlaybookType.DATABASE),
+        ("Scrape the hosts with promethues", PlaybookType.MONITORING),
+        ("Ship dockerfiel builds", PlaybookType.DOCKER),
+    ])
+    def test_typos_select_template(self, prompt, playbook_type):
+        """Should pick the intended type instead of falling back to generic"""
+        generator = PlaybookGenerator(use_cache=False, typo_tolerance=True)
+        context = generator.analyze_prompt(prompt)
+        assert context.playbook_type == playbook_type
+        assert context.type_candidates[0][1] <= FUZZY_CONFIDENCE
+
+    def test_exact_match_suppresses_typo(self):
+        """Should ignore typo matches in a prompt with an exact keyword"""
+        generator = PlaybookGenerator(use_cache=False, typo_tolerance=True)
+        context = generator.analyze_prompt("kubernets with postgres")
+        assert context.type_candidates == [(PlaybookType.DATABASE, 1.0)]
+
+    @pytest.mark.parametrize("prompt", [
+        "Ensure the motd contains the company banner",
+        "Set up a cron routine",
+        "Provision the employment records app",
+        "Install composer for php",
+        "Compare the postures of the fleet",
+        "List the serviced services",
+        "Stop pouting about motoring",
+        "Book a double decker bus",
+    ])
+    def test_everyday_words_stay_generic(self, prompt):
+        """Should not read common English words as misspelled keywords"""
+        generator = PlaybookGenerator(use_cache=False, typo_tolerance=True)
+        assert generator.analyze_prompt(prompt).type_candidates == []
+
+    def test_short_keywords_stay_exact(self):
+        """Should not fuzz keywords below the minimum length"""
+        analyzer = PromptAnalyzer(typo_tolerance=True)
+        assert analyzer.scan("fault tolerant redid").types == ()
+        assert analyzer.scan("dockre").types == ("docker",)
+
+    def test_off_by_default(self, monkeypatch):
+        """Should only match exactly unless typo tolerance is enabled"""
+        assert PromptAnalyzer().scan("kubernets").types == ()
+        context = PlaybookGenerator(use_cache=False).analyze_prompt("kubernets")
+        assert context.playbook_type is None
+        monkeypatch.setenv(TYPO_TOLERANCE_ENV_VAR, "1")
+        context = PlaybookGenerator(use_cache=False).analyze_prompt("kubernets")
+        assert context.playbook_type == PlaybookType.KUBERNETES
+
+    def test_lookup_bounded(self):
+        """Should reject tokens out of reach of every keyword without work"""
+        index = TypoIndex(["kubernetes", "docker"])
+        assert index.lookup("k" * 10_000) == ()
+        assert index.lookup("dockr") == ("docker",)
+        assert index.lookup("kuberntes") == ("kubernetes",)
+        assert index.lookup("contains") == ()
+
+    @pytest.mark.parametrize("token,found", [
+        ("postgress", ("postgres",)),
+        ("dockre", ("docker",)),
+        ("kubernetse", ("kubernetes",)),
+        ("kubernetas", ("kubernetes",)),
+        ("postgrus", ()),
+        ("lockerfile", ()),
+        ("services", ()),
+        ("contained", ()),
+        ("motoring", ()),
+    ])
+    def test_only_slips_are_corrected(self, token, found):
+        """Should allow substitutions and two edits only in long words"""
+        index = TypoIndex(["postgres", "docker", "dockerfile", "kubernetes", "service", "container"])
+        assert index.lookup(token) == found
+
+
+class TestAnalyzer:
+    """Tests for lexicon compilation and generator integration"""
+
+    def test_invalid_keyword_rejected(self):
+        """Should reject keywords that are not words or gap pairs"""
+        with pytest.raises(ValueError):
+            PromptAnalyzer(type_keywords={"network": ("load balancer",)})
+
+    def test_runners_up_in_priority_order(self):
+        """Should list every matched type, highest priority first"""
+        analysis = PromptAnalyzer().scan("docker registry behind nginx with postgres")
+        assert analysis.types == ("docker", "database", "network")
+
+    def test_scan_is_memoized(self):
+        """Should return the cached analysis for a repeated prompt"""
+        analyzer = PromptAnalyzer()
+        assert analyzer.scan("install docker") is analyzer.scan("install docker")
+
+    def test_generator_uses_analyzer(self):
+        """Should fill the context from a single analysis"""
+        context = PlaybookGenerator(use_cache=False).analyze_prompt(
+            "Install a highly available docker registry in staging with backup"
+        )
+        assert context.playbook_type == PlaybookType.DOCKER
+        assert context.environment == "staging"
+        assert context.requirements == ["backup"]
+        assert context.tags == ["setup", "install", "backup"]
+
+
+def _repeat(unit, size):
+    return (unit * (size // len(unit) + 1))[:size]
+
+
+def _unique_typos(size):
+    rng = random.Random(0)
+    keywords = [k for keywords in TYPE_KEYWORDS.values() for k in keywords if len(k) >= 6]
+    words = []
+    while sum(len(w) + 1 for w in words) < size:
+        keyword = rng.choice(keywords)
+        pos = rng.randrange(len(keyword))
+        words.append(keyword[:pos] + rng.choice("abcdefghijklmnopqrstuvwxyz") + keyword[pos:])
+    return " ".join(words)[:size]
+
+
+ADVERSARIAL = {
+    "giant token": lambda n: _repeat("a", n),
+    "gap near-matches": lambda n: _repeat("load-balan high_availabilit auto-sca ", n),
+    "gap pairs": lambda n: _repeat("load load high high ", n),
+    "unicode": lambda n: _repeat("\u0130\xe9\xdf ", n),
+    "unique typos": _unique_typos,
+}
+
+# Generous worst-case budget for one uncached analysis at the hardened limit
+LATENCY_BUDGET = 2.0
+
+
+def _analysis_seconds(prompt):
+    analyzer = PromptAnalyzer(max_prompt_length=len(prompt))
+    start = time.perf_counter()
+    analyzer.scan(prompt)
+    return time.perf_counter() - start
+
+
+class TestHardening:
+    """Tests for hardened analysis of untrusted prompts"""
+
+    def test_rejects_oversized_prompt(self):
+        """Should raise for prompts over the limit and accept the limit itself"""
+        analyzer = PromptAnalyzer(max_prompt_length=10)
+        assert analyzer.scan("x" * 10).types == ()
+        with pytest.raises(PromptTooLargeError):
+            analyzer.scan("x" * 11)
+        with pytest.raises(ValueError):
+            PromptAnalyzer(max_prompt_length=0)
+
+    def test_generator_limit_from_environment(self, monkeypatch):
+        """Should enable hardened mode from ANSIBLE_MCP_MAX_PROMPT_LENGTH"""
+        monkeypatch.setenv("ANSIBLE_MCP_MAX_PROMPT_LENGTH", "32")
+        generator = PlaybookGenerator(use_cache=False)
+        assert generator.analyze_prompt("install docker").playbook_type == PlaybookType.DOCKER
+        with pytest.raises(PromptTooLargeError):
+            generator.analyze_prompt("install docker " * 10)
+
+    def test_long_tokens_skip_token_cache(self):
+        """Should still find substrings in giant tokens without caching them"""
+        analyzer = PromptAnalyzer()
+        analysis = analyzer.scan("x" * 100_000 + "staging" + "x" * 100_000 + " docker")
+        assert analysis.environment == "staging"
+        assert analysis.types == ("docker",)
+        assert analyzer._match_token.cache_info().currsize == 1
+
+    def test_long_prompts_skip_scan_cache(self):
+        """Should not keep prompts over CACHED_PROMPT_LENGTH as cache keys"""
+        analyzer = PromptAnalyzer()
+        long_prompt = "install docker " * CACHED_PROMPT_LENGTH
+        assert analyzer.scan(long_prompt).types == ("docker",)
+        assert analyzer.scan.cache_info().currsize == 0
+        assert analyzer.scan_masks.cache_info().currsize == 0
+        analyzer.scan("install docker")
+        analyzer.scan("install docker")
+        assert analyzer.scan.cache_info().hits == 1
+
+    @pytest.mark.parametrize("name", ADVERSARIAL)
+    def test_latency_budget(self, name):
+        """Should analyze adversarial prompts at the limit within the budget"""
+        prompt = ADVERSARIAL[name](HARDENED_MAX_PROMPT_LENGTH)
+        assert len(prompt) == HARDENED_MAX_PROMPT_LENGTH
+        assert _analysis_seconds(prompt) < LATENCY_BUDGET
+
+    @pytest.mark.parametrize("name", ["giant token", "gap pairs"])
+    def test_linear_growth(self, name):
+        """Should take about four times as long for a four times larger prompt"""
+        small, large = (
+            min(_analysis_seconds(ADVERSARIAL[name](size)) for _ in range(3))
+            for size in (1 << 16, 1 << 18)
+        )
+        assert large / small < 8
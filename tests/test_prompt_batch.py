@@ -0,0 +1,96 @@
+"""
+Unit tests for batch prompt analysis
+"""
+
+import array
+import random
+
+import pytest
+
+from src import prompt_batch
+from src.playbook_generator import PlaybookGenerator
+from src.prompt_scoring import TypeScorer
+
+from tests.test_prompt_analyzer import random_prompt
+
+PROMPTS = [
+    "Deploy a kubernetes application with postgres in staging",
+    "Migrate postgres and mysql databases onto kubernetes",
+    "Install docker with monitoring and nightly backup",
+    "Harden ssh on dev boxes",
+    "",
+]
+
+
+@pytest.fixture
+def generator():
+    return PlaybookGenerator(use_cache=False)
+
+
+def decode(batch, idx, analyzer):
+    """Turn row ``idx`` of a batch back into context-like values"""
+    type_code = int(batch.types[idx])
+    environment = int(batch.environments[idx])
+    return (
+        analyzer.type_order[type_code] if type_code >= 0 else None,
+        analyzer.environment_order[environment] if environment >= 0 else None,
+        [r for bit, r in enumerate(analyzer.requirement_order) if int(batch.requirements[idx]) >> bit & 1],
+        {t for bit, t in enumerate(analyzer.tag_names) if int(batch.tags[idx]) >> bit & 1},
+        [a for bit, a in enumerate(analyzer.action_keywords) if int(batch.actions[idx]) >> bit & 1],
+    )
+
+
+def expected(generator, prompt):
+    context = generator.analyze_prompt(prompt)
+    analysis = generator.analyzer.scan(prompt)
+    return (
+        context.playbook_type.value if context.playbook_type else None,
+        analysis.environment,
+        context.requirements,
+        set(context.tags),
+        list(analysis.actions),
+    )
+
+
+class TestAnalyzePrompts:
+    """Batch results must agree with analyze_prompt"""
+
+    def test_matches_single_prompt_analysis(self, generator):
+        """Should encode exactly what analyze_prompt detects"""
+        rng = random.Random(7)
+        prompts = PROMPTS + [random_prompt(rng) for _ in range(500)]
+        batches = list(generator.analyze_prompts(prompts, chunk_size=128))
+        assert [len(b) for b in batches] == [128, 128, 128, 121]
+
+        idx = 0
+        for batch in batches:
+            for row in range(len(batch)):
+                assert decode(batch, row, generator.analyzer) == expected(generator, prompts[idx])
+                idx += 1
+
+    def test_confidence(self, generator):
+        """Should report the winning type's share of the score"""
+        (batch,) = generator.analyze_prompts(PROMPTS)
+        assert batch.confidence[0] == pytest.approx(0.5)
+        assert batch.confidence[1] == pytest.approx(2 / 3)
+        assert batch.types[4] == -1 and batch.confidence[4] == 0
+
+    def test_lazy_and_empty_input(self, generator):
+        """Should consume generators lazily and yield nothing for no prompts"""
+        assert list(generator.analyze_prompts(iter([]))) == []
+        batches = generator.analyze_prompts(p for p in PROMPTS)
+        assert len(next(batches)) == len(PROMPTS)
+
+    def test_invalid_chunk_size(self, generator):
+        """Should reject chunk sizes below one"""
+        with pytest.raises(ValueError):
+            list(generator.analyze_prompts(PROMPTS, chunk_size=0))
+
+    def test_without_numpy(self, generator, monkeypatch):
+        """Should fall back to array.array columns without NumPy"""
+        monkeypatch.setattr(prompt_batch, "np", None)
+        scorer = TypeScorer(generator.analyzer, use_numpy=False)
+        (batch,) = prompt_batch.analyze_prompts(PROMPTS, analyzer=generator.analyzer, scorer=scorer)
+        assert isinstance(batch.types, array.array)
+        for row, prompt in enumerate(PROMPTS):
+            assert decode(batch, row, generator.analyzer) == expected(generator, prompt)
@@ -0,0 +1,110 @@
+"""
+Unit tests for scored playbook type classification
+"""
+
+import pytest
+
+from src import prompt_scoring
+from src.playbook_generator import PlaybookGenerator, PlaybookType
+from src.prompt_analyzer import PromptAnalyzer
+from src.prompt_scoring import TypeScorer
+
+requires_numpy = pytest.mark.skipif(
+    not prompt_scoring.NUMPY_AVAILABLE, reason="NumPy not installed"
+)
+
+PROMPTS = [
+    "Deploy a kubernetes application with postgres",
+    "Migrate postgres and mysql databases onto kubernetes",
+    "Harden ssh and the firewall, then configure nginx as a load balancer",
+    "Expose the service through an ingress with tls",
+    "Install docker",
+    "Something unrelated",
+    "",
+]
+
+
+@pytest.fixture
+def analyzer():
+    return PromptAnalyzer()
+
+
+class TestRanking:
+    """Tests for ranking types by keyword evidence"""
+
+    def test_tie_broken_by_priority(self, analyzer):
+        """Should keep the old priority order when the evidence is equal"""
+        scorer = TypeScorer(analyzer)
+        ranking = scorer.rank(analyzer.scan(PROMPTS[0]))
+        assert [name for name, _ in ranking] == ["kubernetes", "database"]
+        assert ranking[0][1] == pytest.approx(0.5)
+
+    def test_more_evidence_wins(self, analyzer):
+        """Should pick the type with the most keyword hits, not the first"""
+        ranking = TypeScorer(analyzer).rank(analyzer.scan(PROMPTS[1]))
+        assert ranking[0][0] == "database"
+        # postgres + mysql against kubernetes
+        assert ranking[0][1] == pytest.approx(2 / 3)
+
+    def test_weights_apply(self, analyzer):
+        """Should count generic keywords as weaker evidence"""
+        scorer = TypeScorer(analyzer)
+        assert scorer.scores(analyzer.scan("service"))[0] == pytest.approx(0.5)
+        unweighted = TypeScorer(analyzer, weights={})
+        assert unweighted.scores(analyzer.scan("service"))[0] == pytest.approx(1.0)
+
+    def test_confidences_sum_to_one(self, analyzer):
+        """Should report each candidate's share of the total score"""
+        scorer = TypeScorer(analyzer)
+        for prompt in PROMPTS[:5]:
+            ranking = scorer.rank(analyzer.scan(prompt))
+            assert sum(confidence for _, confidence in ranking) == pytest.approx(1.0)
+
+    def test_no_evidence(self, analyzer):
+        """Should return no candidates when no type keyword matches"""
+        assert TypeScorer(analyzer).rank(analyzer.scan(PROMPTS[5])) == ()
+
+
+class TestBatchScoring:
+    """Tests for scoring many prompts at once"""
+
+    def test_rank_many_matches_rank(self, analyzer):
+        """Should rank a batch exactly like one prompt at a time"""
+        scorer = TypeScorer(analyzer)
+        analyses = [analyzer.scan(p) for p in PROMPTS]
+        assert scorer.rank_many(analyses) == [scorer.rank(a) for a in analyses]
+
+    @requires_numpy
+    def test_numpy_matches_python(self, analyzer):
+        """Should produce the same scores with and without NumPy"""
+        analyses = [analyzer.scan(p) for p in PROMPTS]
+        vectorized = TypeScorer(analyzer, use_numpy=True).score_matrix(analyses)
+        plain = TypeScorer(analyzer, use_numpy=False).score_matrix(analyses)
+        assert vectorized.shape == (len(PROMPTS), len(analyzer.type_order))
+        assert vectorized.tolist() == plain
+
+    def test_python_fallback(self, analyzer, monkeypatch):
+        """Should score without NumPy"""
+        monkeypatch.setattr(prompt_scoring, "NUMPY_AVAILABLE", False)
+        scorer = TypeScorer(analyzer)
+        assert not scorer.use_numpy
+        assert scorer.rank_many([analyzer.scan(PROMPTS[1])])[0][0][0] == "database"
+
+
+class TestContextCandidates:
+    """Tests for the candidates carried by PlaybookContext"""
+
+    def test_context_carries_runners_up(self):
+        """Should expose the winner and the ranked runners-up"""
+        context = PlaybookGenerator(use_cache=False).analyze_prompt(PROMPTS[2])
+        assert context.playbook_type == PlaybookType.SECURITY
+        assert [t for t, _ in context.type_candidates] == [
+            PlaybookType.SECURITY,
+            PlaybookType.NETWORK,
+        ]
+
+    def test_no_candidates(self):
+        """Should leave the type unset without evidence"""
+        context = PlaybookGenerator(use_cache=False).analyze_prompt(PROMPTS[5])
+        assert context.playbook_type is None
+        assert context.type_candidates == []
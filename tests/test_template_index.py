@@ -0,0 +1,169 @@
+"""
+Unit tests for the TF-IDF template index
+"""
+
+import json
+import os
+import shutil
+import sys
+
+import pytest
+
+from src import template_index
+from src.playbook_generator import PlaybookGenerator
+from src.template_index import TemplateIndex, template_terms, terms
+from src.template_store import DEFAULT_TEMPLATE_DIR
+
+TEMPLATES = {
+    "web": [
+        {
+            "name": "Web server",
+            "tasks": [
+                {"name": "Install nginx", "package": {"name": "nginx"}, "tags": ["nginx"]},
+                {"name": "Open https port", "firewalld": {"service": "https"}},
+            ],
+        }
+    ],
+    "db": [
+        {
+            "name": "Database server",
+            "tags": "postgres",
+            "tasks": [
+                {"name": "Install postgres", "package": {"name": "postgresql"}},
+                {"block": [{"name": "Create databases", "postgresql_db": {"name": "app"}}]},
+            ],
+            "handlers": [{"name": "restart postgres", "service": {"name": "postgresql"}}],
+        }
+    ],
+}
+
+
+@pytest.fixture
+def index():
+    return TemplateIndex.build(TEMPLATES, fingerprint="abc")
+
+
+class TestTerms:
+    """Tests for turning text and templates into terms"""
+
+    def test_terms(self):
+        """Should lowercase, drop stop words and a plural "s" """
+        assert terms("Install the Databases for nginx, ssh and k8s") == [
+            "install", "database", "nginx", "ssh", "k8s",
+        ]
+
+    def test_template_terms(self):
+        """Should collect names, modules and tags, including nested blocks"""
+        collected = set(template_terms("db", TEMPLATES["db"]))
+        assert set(terms("db database server postgres postgresql_db create restart")) <= collected
+        assert "name" not in collected and "block" not in collected
+
+
+class TestQuery:
+    """Tests for ranking templates against a prompt"""
+
+    def test_ranks_by_similarity(self, index):
+        """Should rank the template sharing the rarest terms first"""
+        matches = index.query("Set up postgres databases", 2)
+        assert matches[0][0] == "db"
+        assert 0 < matches[0][1] <= 1
+
+    def test_top_k(self, index):
+        """Should return at most k matches, best first"""
+        matches = index.query("install nginx and postgres", 5)
+        assert len(matches) == 2
+        assert matches[0][1] >= matches[1][1]
+        assert len(index.query("install nginx and postgres", 1)) == 1
+
+    def test_no_overlap(self, index):
+        """Should return no matches when no term is indexed"""
+        assert index.query("something unrelated") == ()
+        assert index.query("") == ()
+
+    def test_long_queries_not_cached(self, index):
+        """Should rank long prompts without keeping them as cache keys"""
+        long_text = "postgres databases " * 1000
+        assert index.query(long_text, 1)[0][0] == "db"
+        assert index.query.cache_info().currsize == 0
+
+
+class TestPersistence:
+    """Tests for saving and loading the index"""
+
+    def test_round_trip(self, index, tmp_path):
+        """Should answer queries identically after a save and load"""
+        path = str(tmp_path / "index.json")
+        index.save(path)
+        loaded = TemplateIndex.load(path)
+        assert loaded.fingerprint == "abc"
+        assert loaded.names == index.names
+        assert loaded.query("install nginx and postgres") == index.query("install nginx and postgres")
+
+    def test_unknown_format(self, index, tmp_path):
+        """Should refuse files written by another index format"""
+        path = tmp_path / "index.json"
+        data = index.to_dict()
+        data["format"] = 99
+        path.write_text(json.dumps(data))
+        with pytest.raises(ValueError):
+            TemplateIndex.load(str(path))
+
+
+class TestGeneratorIntegration:
+    """Tests for template retrieval in PlaybookGenerator"""
+
+    def test_context_carries_matches(self):
+        """Should retrieve the most similar templates for a prompt"""
+        context = PlaybookGenerator(use_cache=False).analyze_prompt(
+            "Configure PostgreSQL database with replication and backup"
+        )
+        assert context.template_matches[0][0] == "database"
+        assert len(context.template_matches) <= 3
+
+    def test_loads_persisted_index(self, tmp_path, monkeypatch):
+        """Should use a fresh index file from the environment"""
+        path = str(tmp_path / "index.json")
+        PlaybookGenerator(use_cache=False).build_template_index().save(path)
+        monkeypatch.setenv(template_index.INDEX_ENV_VAR, path)
+        monkeypatch.setattr(TemplateIndex, "from_terms", None)
+        generator = PlaybookGenerator(use_cache=False)
+        assert generator.template_index.fingerprint == generator._template_fingerprint()
+
+    def test_index_survives_touch(self, temp_dir, monkeypatch):
+        """Should keep using a persisted index when only mtimes change"""
+        for path in DEFAULT_TEMPLATE_DIR.glob("*.yml"):
+            shutil.copy(path, temp_dir / path.name)
+        index_path = str(temp_dir / "index.json")
+        PlaybookGenerator(use_cache=False, template_dir=str(temp_dir)).build_template_index().save(
+            index_path
+        )
+        for path in temp_dir.glob("*.yml"):
+            stat = path.stat()
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        monkeypatch.setattr(TemplateIndex, "from_terms", None)
+        generator = PlaybookGenerator(
+            use_cache=False, template_dir=str(temp_dir), template_index_path=index_path
+        )
+        assert len(generator.template_index) == 6
+
+    def test_indexing_loads_nothing(self):
+        """Should build the index without parsing templates into the store"""
+        generator = PlaybookGenerator(use_cache=False)
+        generator.analyze_prompt("Configure PostgreSQL database with replication")
+        assert generator.template_store.loaded() == ()
+
+    def test_stale_index_rebuilt(self, tmp_path, caplog):
+        """Should rebuild in memory when the file was built from other templates"""
+        path = str(tmp_path / "index.json")
+        TemplateIndex.build(TEMPLATES, fingerprint="stale").save(path)
+        generator = PlaybookGenerator(use_cache=False, template_index_path=path)
+        assert "kubernetes" in generator.template_index.names
+        assert "stale" in caplog.text
+
+    def test_rebuild_command(self, tmp_path, monkeypatch, capsys):
+        """Should write the index for the current templates"""
+        path = tmp_path / "index.json"
+        monkeypatch.setattr(sys, "argv", ["template_index", "--output", str(path)])
+        template_index.main()
+        assert "Indexed 6 templates" in capsys.readouterr().out
+        assert TemplateIndex.load(str(path)).fingerprint == PlaybookGenerator(use_cache=False)._template_fingerprint()
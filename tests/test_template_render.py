@@ -0,0 +1,265 @@
+"""
+Unit tests for pre-rendering known context values into templates
+"""
+
+import logging
+
+import pytest
+import yaml
+
+from src.playbook_generator import (
+    MissingVariablesError,
+    OutputFormat,
+    PlaybookContext,
+    PlaybookGenerator,
+    PlaybookType,
+)
+from src.playbook_model import freeze
+from src.template_render import (
+    TemplateRenderer,
+    defined_variables,
+    is_runtime_variable,
+    required_variables,
+)
+
+TEMPLATE = freeze(
+    [
+        {
+            "name": "Demo",
+            "hosts": "{{ target_hosts | default('all') }}",
+            "vars": {
+                "replicas": "{{ replica_count | default(3) }}",
+                "ports": "{{ ports }}",
+                "url": "https://example.com/v{{ version }}/{{ file }}",
+            },
+            "tasks": [
+                {"name": "Facts", "debug": {"msg": "{{ ansible_distribution | lower }}"}},
+                {"name": "Loop", "debug": {"msg": "{{ item }}"}, "loop": "{{ ports }}"},
+                {"name": "Block", "shell": "{% if version %}echo {{ version }}{% endif %}"},
+            ],
+        }
+    ]
+)
+
+
+@pytest.fixture
+def renderer():
+    return TemplateRenderer()
+
+
+class TestTemplateRenderer:
+    """Tests for TemplateRenderer"""
+
+    def test_variables(self, renderer):
+        """Should collect the variables of every plain expression"""
+        assert renderer.variables(TEMPLATE) == {
+            "target_hosts", "replica_count", "ports", "version", "file",
+            "ansible_distribution", "item",
+        }
+        assert is_runtime_variable("ansible_distribution")
+        assert is_runtime_variable("item")
+        assert not is_runtime_variable("target_hosts")
+
+    def test_known_values_rendered(self, renderer):
+        """Should render native values and leave runtime expressions alone"""
+        play = renderer.render(
+            TEMPLATE, {"target_hosts": "web", "replica_count": 5, "ports": [80, 443]}
+        )[0]
+        assert play["hosts"] == "web"
+        assert play["vars"]["replicas"] == 5
+        assert play["vars"]["ports"] == "{{ ports }}"
+        assert play["tasks"][0]["debug"]["msg"] == "{{ ansible_distribution | lower }}"
+        assert play["tasks"][1]["debug"]["msg"] == "{{ item }}"
+        assert play["tasks"][1]["loop"] == "{{ ports }}"
+
+    def test_template_definitions_win(self, renderer):
+        """Should not let context values override variables the template defines"""
+        template = freeze(
+            [
+                {
+                    "vars": {"replicas": "{{ replica_count | default(3) }}"},
+                    "tasks": [{"set_fact": {"size": "{{ replicas }}"}}],
+                }
+            ]
+        )
+        play = renderer.render(template, {"replicas": 7, "replica_count": 5})[0]
+        assert play["vars"]["replicas"] == 5
+        assert play["tasks"][0]["set_fact"]["size"] == "{{ replicas }}"
+
+    def test_value_key_types(self, renderer):
+        """Should render mixed and int/str keyed values separately"""
+        template = ({"vars": {"port_map": "{{ ports }}"}},)
+        ints = renderer.render(template, {"ports": {80: "http"}})
+        strs = renderer.render(template, {"ports": {"80": "http"}})
+        assert list(ints[0]["vars"]["port_map"]) == [80]
+        assert list(strs[0]["vars"]["port_map"]) == ["80"]
+        assert renderer.render(template, {"ports": {1: "x", "b": 2}})[0]["vars"]["port_map"]["b"] == 2
+
+    def test_defaults_and_partial_strings(self, renderer):
+        """Should apply filters and render only the known parts of a string"""
+        play = renderer.render(TEMPLATE, {"target_hosts": "web", "version": "2.1"})[0]
+        assert play["vars"]["replicas"] == "{{ replica_count | default(3) }}"
+        assert play["vars"]["url"] == "https://example.com/v2.1/{{ file }}"
+        assert play["tasks"][2]["shell"] == TEMPLATE[0]["tasks"][2]["shell"]
+
+    def test_unchanged_nodes_shared(self, renderer):
+        """Should return the template itself, or share untouched subtrees"""
+        assert renderer.render(TEMPLATE, {"unrelated": 1}) is TEMPLATE
+        assert renderer.render(TEMPLATE, {"ansible_distribution": "x"}) is TEMPLATE
+        play = renderer.render(TEMPLATE, {"target_hosts": "web"})[0]
+        assert play["tasks"] is TEMPLATE[0]["tasks"]
+
+    def test_render_is_cached(self, renderer):
+        """Should return the cached render for the same relevant values"""
+        first = renderer.render(TEMPLATE, {"target_hosts": "web", "unrelated": 1})
+        assert renderer.render(TEMPLATE, {"target_hosts": "web"}) is first
+        assert renderer.render(TEMPLATE, {"target_hosts": "db"}) is not first
+
+    def test_errors_leave_expression(self, renderer):
+        """Should leave expressions Jinja cannot evaluate untouched"""
+        template = freeze({"a": "{{ count + 1 }}", "b": "{{ missing.attr }}"})
+        assert renderer.render(template, {"count": "x", "missing": {}}) is template
+
+    def test_bytecode_cache(self, temp_dir):
+        """Should persist compiled expressions to the bytecode cache directory"""
+        TemplateRenderer(str(temp_dir)).render(TEMPLATE, {"target_hosts": "web"})
+        assert list(temp_dir.iterdir())
+
+
+class TestGeneratorPrerender:
+    """Tests for pre-rendering in PlaybookGenerator"""
+
+    def context(self, **variables):
+        return PlaybookContext(
+            prompt="deploy",
+            playbook_type=PlaybookType.KUBERNETES,
+            target_hosts="web",
+            environment="staging",
+            requirements=["monitoring"],
+            variables=variables,
+        )
+
+    def test_disabled_by_default(self):
+        """Should leave templates untouched unless enabled"""
+        generator = PlaybookGenerator(use_cache=False)
+        assert generator.renderer is None
+        data = yaml.safe_load(generator.generate(self.context()))
+        assert data[0]["hosts"] == "{{ target_hosts | default('localhost') }}"
+
+    def test_context_values_rendered(self):
+        """Should fill in target hosts, environment and context variables"""
+        generator = PlaybookGenerator(use_cache=False, prerender=True)
+        context = self.context(application_name="shop", replicas=9)
+        playbook = generator.generate(context)
+        data = yaml.safe_load(playbook)
+        assert data[0]["hosts"] == "web"
+        assert data[0]["vars"]["app_name"] == "shop"
+        assert "{{ container_image }}" in playbook
+        assert "{{ replicas }}" in playbook
+        assert playbook == generator._serialize(
+            generator._build_playbook(context), OutputFormat.YAML
+        )
+
+    def test_environment_variable(self, monkeypatch):
+        """Should enable pre-rendering from ANSIBLE_MCP_PRERENDER"""
+        monkeypatch.setenv("ANSIBLE_MCP_PRERENDER", "1")
+        assert PlaybookGenerator(use_cache=False).renderer is not None
+
+
+class TestRequiredVariables:
+    """Tests for static required-variable analysis"""
+
+    def test_guards_and_runtime_names_ignored(self):
+        """Should skip defaulted, tested, runtime and locally bound names"""
+        template = freeze(
+            [
+                {
+                    "hosts": "{{ target_hosts | default('all') }}",
+                    "tasks": [
+                        {"debug": {"msg": "{{ token if token is defined else fallback }}"}},
+                        {"debug": {"msg": "{{ item.name }} {{ ansible_hostname }}"}},
+                        {"shell": "{% for port in ports %}{{ port }}{% endfor %}"},
+                        {"debug": {"msg": "{{ port | default(other) }}"}},
+                    ],
+                }
+            ]
+        )
+        assert required_variables(template) == {"fallback", "ports", "other"}
+
+    def test_template_definitions_excluded(self):
+        """Should treat play vars, registered results and set_fact as defined"""
+        template = freeze(
+            [
+                {
+                    "vars": {"app": "{{ application_name }}"},
+                    "tasks": [
+                        {"command": "id", "register": "result"},
+                        {"set_fact": {"fact": "{{ result.stdout }}"}},
+                        {
+                            "block": [{"debug": {"msg": "{{ fact }} {{ app }} {{ user }}"}}],
+                            "loop": "{{ users }}",
+                            "loop_control": {"loop_var": "user"},
+                        },
+                    ],
+                }
+            ]
+        )
+        assert defined_variables(template) == {"app", "result", "fact", "user"}
+        assert required_variables(template) == {"application_name", "users"}
+
+    @pytest.mark.parametrize("playbook_type,required", [
+        (PlaybookType.KUBERNETES, {"application_name", "container_image", "environment"}),
+        (PlaybookType.DATABASE, {"database_password"}),
+        (PlaybookType.DOCKER, set()),
+    ])
+    def test_shipped_templates(self, playbook_type, required):
+        """Should find what each shipped template needs from the caller"""
+        generator = PlaybookGenerator(use_cache=False)
+        assert generator.required_variables(playbook_type) == required
+        assert generator.required_variables(playbook_type) is generator.required_variables(
+            playbook_type
+        )
+
+    def test_generate_reports_missing(self, caplog):
+        """Should warn once per template type without touching the context"""
+        generator = PlaybookGenerator(use_cache=False)
+        context = PlaybookContext(
+            prompt="deploy",
+            playbook_type=PlaybookType.KUBERNETES,
+            variables={"application_name": "shop"},
+        )
+        with caplog.at_level(logging.DEBUG, logger="src.playbook_generator"):
+            generator.generate(context)
+            generator.generate(context)
+        records = [r for r in caplog.records if "container_image" in r.getMessage()]
+        assert [r.levelno for r in records] == [logging.WARNING, logging.DEBUG]
+        assert generator.missing_variables(context) == ["container_image"]
+        assert not hasattr(context, "missing_variables")
+
+        context.variables["container_image"] = "shop:1.0"
+        assert generator.missing_variables(context) == []
+
+    def test_batch_reports_missing(self):
+        """Should report unresolved variables the same way for any worker count"""
+        generator = PlaybookGenerator(use_cache=False)
+        contexts = [
+            PlaybookContext(prompt="db", playbook_type=PlaybookType.DATABASE),
+            PlaybookContext(prompt="docker", playbook_type=PlaybookType.DOCKER),
+        ]
+        for workers in (1, 2):
+            results = generator.generate_many(contexts, workers=workers)
+            assert [r.missing_variables for r in results] == [["database_password"], []]
+
+    def test_strict_mode_raises(self):
+        """Should raise before building anything in strict mode"""
+        generator = PlaybookGenerator(use_cache=False, strict_variables=True)
+        context = PlaybookContext(prompt="db", playbook_type=PlaybookType.DATABASE)
+        with pytest.raises(MissingVariablesError) as excinfo:
+            generator.generate(context)
+        assert excinfo.value.missing == ["database_password"]
+        result = generator.generate_many([context])[0]
+        assert not result.ok and "database_password" in result.error
+        with pytest.raises(MissingVariablesError):
+            generator.generate_stream(context)
+        with pytest.raises(MissingVariablesError):
+            "".join(generator.generate_site_stream([context]))
@@ -0,0 +1,218 @@
+"""
+Unit tests for the on-disk template store
+"""
+
+import os
+import shutil
+
+import pytest
+import yaml
+
+from src.playbook_generator import PlaybookContext, PlaybookGenerator, PlaybookType
+from src.template_store import DEFAULT_TEMPLATE_DIR, TemplateStore
+
+
+def write(path, text):
+    """Write ``text`` and move the mtime forward so the change is visible"""
+    existed = path.exists()
+    path.write_text(text)
+    if existed:
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.fixture
+def parses():
+    return []
+
+
+@pytest.fixture
+def store(temp_dir, parses):
+    write(temp_dir / "docker.yml", "- name: one\n")
+    write(temp_dir / "system.yaml", "- name: two\n")
+    write(temp_dir / "notes.txt", "ignored")
+
+    def parse(text):
+        parses.append(text)
+        return yaml.safe_load(text)
+
+    return TemplateStore(temp_dir, parse, poll_interval=3600)
+
+
+class TestLazyLoading:
+    """Tests for indexing at startup and parsing on first use"""
+
+    def test_indexes_without_parsing(self, store, parses):
+        """Should list template files without reading them"""
+        assert sorted(store) == ["docker", "system"]
+        assert parses == [] and store.loaded() == ()
+
+    def test_parses_once(self, store, parses):
+        """Should parse a template on first use and cache it"""
+        assert store.get("docker") == [{"name": "one"}]
+        assert store.get("docker") is store.get("docker")
+        assert parses == ["- name: one\n"]
+        assert store.loaded() == ("docker",)
+
+    def test_missing_template(self, store):
+        """Should raise KeyError for unknown names"""
+        with pytest.raises(KeyError):
+            store.get("database")
+
+    def test_missing_directory(self, temp_dir):
+        """Should start empty when the directory does not exist"""
+        assert len(TemplateStore(temp_dir / "absent")) == 0
+
+
+class TestReload:
+    """Tests for picking up changed files"""
+
+    def test_reload_changed_file(self, store, temp_dir):
+        """Should parse the new version after a refresh"""
+        store.get("docker")
+        write(temp_dir / "docker.yml", "- name: changed\n")
+        assert store.get("docker") == [{"name": "one"}]
+        assert store.refresh() and store.version == 1
+        assert store.get("docker") == [{"name": "changed"}]
+        assert not store.refresh()
+
+    def test_broken_file_keeps_last_good_version(self, store, temp_dir, caplog):
+        """Should log a parse failure and keep serving the previous version"""
+        store.get("docker")
+        write(temp_dir / "docker.yml", "- name: [unclosed\n")
+        store.refresh()
+        assert store.get("docker") == [{"name": "one"}]
+        assert "Failed to load template docker" in caplog.text
+        write(temp_dir / "docker.yml", "- name: fixed\n")
+        store.refresh()
+        assert store.get("docker") == [{"name": "fixed"}]
+
+    def test_added_and_removed_files(self, store, temp_dir):
+        """Should index new files and forget deleted ones"""
+        store.get("system")
+        write(temp_dir / "database.yml", "- name: three\n")
+        (temp_dir / "system.yaml").unlink()
+        assert store.refresh()
+        assert sorted(store) == ["database", "docker"]
+        with pytest.raises(KeyError):
+            store.get("system")
+
+    def test_poll_interval(self, store, temp_dir):
+        """Should only rescan once the poll interval has passed"""
+        write(temp_dir / "docker.yml", "- name: changed\n")
+        assert not store.poll()
+        store.poll_interval = 0
+        assert store.poll()
+
+    def test_fingerprint_follows_content(self, store, temp_dir):
+        """Should change the fingerprint on edits but not on touch"""
+        before = store.fingerprint()
+        stat = (temp_dir / "docker.yml").stat()
+        os.utime(temp_dir / "docker.yml", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        store.refresh()
+        assert store.fingerprint() == before
+        write(temp_dir / "docker.yml", "- name: changed\n")
+        store.refresh()
+        assert store.fingerprint() != before
+
+    def test_read_does_not_parse(self, store, parses):
+        """Should return a source without parsing or caching it"""
+        assert store.read("system") == "- name: two\n"
+        assert parses == [] and store.loaded() == ()
+
+
+class TestView:
+    """Tests for the PlaybookType-keyed mapping"""
+
+    def test_keyed_by_enum(self, store):
+        """Should map enum members to parsed templates and sources"""
+        parsed = store.view(PlaybookType)
+        assert set(parsed) == {PlaybookType.DOCKER, PlaybookType.SYSTEM}
+        assert parsed[PlaybookType.DOCKER] == [{"name": "one"}]
+        assert store.view(PlaybookType, sources=True)[PlaybookType.SYSTEM] == "- name: two\n"
+        assert "docker" not in parsed and PlaybookType.NETWORK not in parsed
+
+    def test_iteration_does_not_parse(self, store, parses):
+        """Should list keys without loading templates"""
+        assert len(store.view(PlaybookType)) == 2
+        assert parses == []
+
+    def test_broken_template_absent(self, temp_dir):
+        """Should drop templates that never parsed"""
+        write(temp_dir / "docker.yml", "- [unclosed\n")
+        view = TemplateStore(temp_dir, yaml.safe_load).view(PlaybookType)
+        assert PlaybookType.DOCKER not in view
+        assert list(view) == []
+
+
+class TestGeneratorTemplates:
+    """Tests for the generator's use of the template directory"""
+
+    @pytest.fixture
+    def template_dir(self, temp_dir):
+        for path in DEFAULT_TEMPLATE_DIR.glob("*.yml"):
+            shutil.copy(path, temp_dir / path.name)
+        return temp_dir
+
+    def test_cold_start_loads_nothing(self, template_dir):
+        """Should only parse the templates that are used"""
+        generator = PlaybookGenerator(template_dir=str(template_dir))
+        assert generator.template_store.loaded() == ()
+        generator.generate(PlaybookContext(prompt="x", playbook_type=PlaybookType.DOCKER))
+        assert generator.template_store.loaded() == ("docker",)
+
+    @pytest.mark.parametrize("text", ["foo: bar\n", "", "- just a string\n"])
+    def test_misshaped_template_is_failed(self, template_dir, text):
+        """Should mark a template that is not a list of plays as failed"""
+        write(template_dir / "docker.yml", text)
+        generator = PlaybookGenerator(template_dir=str(template_dir), use_cache=False)
+        assert PlaybookType.DOCKER not in generator.parsed_templates
+        playbook = generator.generate(
+            PlaybookContext(prompt="x", playbook_type=PlaybookType.DOCKER)
+        )
+        assert yaml.safe_load(playbook)[0]["hosts"]
+        assert "docker" not in generator.build_template_index().names
+
+    def test_directory_from_environment(self, template_dir, monkeypatch):
+        """Should honour ANSIBLE_MCP_TEMPLATE_DIR"""
+        monkeypatch.setenv("ANSIBLE_MCP_TEMPLATE_DIR", str(template_dir))
+        assert PlaybookGenerator().template_store.directory == template_dir
+
+    @pytest.mark.parametrize("precompute", [False, True])
+    def test_hot_reload(self, template_dir, precompute):
+        """Should serve the edited template after a reload, bypassing stale caches"""
+        generator = PlaybookGenerator(template_dir=str(template_dir), precompute=precompute)
+        context = PlaybookContext(
+            prompt="x", playbook_type=PlaybookType.DOCKER, requirements=["security"]
+        )
+        before = generator.generate(context)
+        path = template_dir / "docker.yml"
+        write(path, path.read_text().replace("Docker Environment Setup", "Edited Docker Setup"))
+
+        assert generator.reload_templates()
+        after = generator.generate(context)
+        assert "Edited Docker Setup" in after
+        assert after == before.replace("Docker Environment Setup", "Edited Docker Setup")
+        assert "docker" in generator.template_index.names
+
+    def test_polls_on_generate(self, template_dir):
+        """Should notice changed files once the poll interval has passed"""
+        generator = PlaybookGenerator(template_dir=str(template_dir), poll_interval=0)
+        context = PlaybookContext(prompt="x", playbook_type=PlaybookType.SYSTEM)
+        generator.generate(context)
+        path = template_dir / "system.yml"
+        write(path, path.read_text().replace("System Configuration", "Edited System"))
+        assert "Edited System" in generator.generate(context)
+
+    def test_stream_polls_like_generate(self, template_dir):
+        """Should run the same reload poll before streaming"""
+        generator = PlaybookGenerator(template_dir=str(template_dir), poll_interval=0)
+        context = PlaybookContext(prompt="x", playbook_type=PlaybookType.SYSTEM)
+        generator.generate(context)
+        path = template_dir / "system.yml"
+        write(path, path.read_text().replace("System Configuration", "Edited System"))
+        streamed = "".join(generator.generate_stream(context))
+        assert "Edited System" in streamed
+        assert streamed == generator.generate(context)
+        site = "".join(generator.generate_site_stream([context]))
+        assert "Edited System" in site
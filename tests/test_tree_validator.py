@@ -0,0 +1,162 @@
+"""
+Unit tests for validating a directory tree of playbooks
+"""
+
+import json
+import os
+
+import pytest
+
+from src.playbook_validator import PlaybookValidator, Rule, TASK
+from src import tree_validator
+from src.tree_validator import default_cache_path, validate_tree
+
+GOOD = "- hosts: all\n  tasks:\n    - name: Ping\n      ping: {}\n"
+WARN = "- hosts: all\n  tasks:\n    - ping: {}\n"
+BROKEN = "- hosts: [all\n"
+
+
+def write(path, text):
+    """Write ``text`` and move the mtime forward so the change is visible"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    existed = path.exists()
+    path.write_text(text)
+    if existed:
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.fixture(autouse=True)
+def cache_home(tmp_path_factory, monkeypatch):
+    """Keep default caches out of the real user cache directory"""
+    path = tmp_path_factory.mktemp("cache")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(path))
+    monkeypatch.delenv(tree_validator.CACHE_ENV_VAR, raising=False)
+    return path
+
+
+@pytest.fixture
+def tree(temp_dir):
+    write(temp_dir / "site.yml", GOOD)
+    write(temp_dir / "roles" / "web.yaml", WARN)
+    write(temp_dir / "broken.yml", BROKEN)
+    write(temp_dir / "README.md", "not a playbook")
+    write(temp_dir / ".git" / "hidden.yml", BROKEN)
+    return temp_dir
+
+
+def fail(*args, **kwargs):
+    raise AssertionError("validated a file that should have come from the cache")
+
+
+class TestValidateTree:
+    """Tests for validate_tree"""
+
+    def test_report(self, tree):
+        """Should validate playbook files only and report per file"""
+        report = validate_tree(str(tree))
+        assert [r.path for r in report.files] == ["broken.yml", "roles/web.yaml", "site.yml"]
+        assert [r.valid for r in report.files] == [False, True, True]
+        assert report.files[1].issues[0].rule == "task-name"
+        assert report.files[1].issues[0].line == 3
+        data = json.loads(json.dumps(report.to_dict()))
+        assert (data["files"], data["validated"], data["errors"], data["warnings"]) == (3, 3, 1, 1)
+        assert not data["valid"]
+
+    def test_cache_outside_tree(self, tree, cache_home):
+        """Should keep the default cache in the user cache directory"""
+        validate_tree(str(tree))
+        cache = default_cache_path(str(tree))
+        assert cache.startswith(str(cache_home)) and os.path.exists(cache)
+        assert [p.name for p in tree.iterdir() if p.suffix == ".json"] == []
+
+    def test_unchanged_tree_not_read(self, tree, monkeypatch):
+        """Should answer an unchanged tree from the cache without reading files"""
+        first = validate_tree(str(tree))
+        monkeypatch.setattr("src.tree_validator._FileChecker.__call__", fail)
+        second = validate_tree(str(tree))
+        assert all(result.cached for result in second.files)
+        assert [r.to_dict()["issues"] for r in second.files] == [
+            r.to_dict()["issues"] for r in first.files
+        ]
+
+    def test_same_content_not_revalidated(self, tree, monkeypatch):
+        """Should reuse results by content hash for touched or copied files"""
+        validate_tree(str(tree))
+        write(tree / "site.yml", GOOD)
+        write(tree / "copy.yml", WARN)
+        monkeypatch.setattr(PlaybookValidator, "validate", fail)
+        report = validate_tree(str(tree))
+        assert all(result.cached for result in report.files)
+
+    def test_changed_file_revalidated(self, tree):
+        """Should validate files whose content changed and drop deleted ones"""
+        cache = default_cache_path(str(tree))
+        validate_tree(str(tree))
+        write(tree / "broken.yml", GOOD)
+        (tree / "roles" / "web.yaml").unlink()
+        report = validate_tree(str(tree))
+        assert [(r.path, r.cached) for r in report.files] == [
+            ("broken.yml", True),
+            ("site.yml", True),
+        ]
+        assert report.valid
+        with open(cache) as handle:
+            stored = json.load(handle)
+        assert sorted(stored["files"]) == ["broken.yml", "site.yml"]
+        assert len(stored["results"]) == 1
+
+    def test_code_change_invalidates_cache(self, tree, monkeypatch):
+        """Should revalidate everything when the validation code differs"""
+        validate_tree(str(tree))
+        monkeypatch.setattr(tree_validator, "validator_version", lambda validator: "edited")
+        report = validate_tree(str(tree))
+        assert not any(result.cached for result in report.files)
+
+    def test_other_yaml_classified(self, tree):
+        """Should only check the text of YAML files that are not play lists"""
+        write(tree / "group_vars" / "all.yml", "ntp_server: pool.ntp.org\n")
+        write(tree / "inventory.yml", "all:\n  hosts:\n    web1:\n")
+        write(tree / "roles" / "web" / "tasks" / "main.yml", "- name: Ping\n  ansible.builtin.ping:\n")
+        write(tree / "host_vars" / "db.yml", "db_password: hunter2hunter2\n")
+        (tree / "broken.yml").unlink()
+        report = validate_tree(str(tree))
+        results = {r.path: r for r in report.files}
+        assert not results["group_vars/all.yml"].playbook and results["group_vars/all.yml"].valid
+        assert not results["inventory.yml"].playbook and results["inventory.yml"].valid
+        assert not results["roles/web/tasks/main.yml"].playbook
+        assert results["site.yml"].playbook
+        assert [i.rule for i in results["host_vars/db.yml"].issues] == ["hardcoded-secret"]
+        assert report.to_dict()["playbooks"] == 2
+
+    def test_rule_change_invalidates_cache(self, tree):
+        """Should revalidate everything when the rule set differs"""
+
+        class NoPing(Rule):
+            id = "no-ping"
+            events = (TASK,)
+
+            def check(self, element, reporter):
+                if "ping" in element.data:
+                    reporter.report(self, element, "Ping is not allowed")
+
+        validate_tree(str(tree))
+        report = validate_tree(str(tree), validator=PlaybookValidator([NoPing()]))
+        assert not any(result.cached for result in report.files)
+        assert [i.rule for i in report.files[2].issues] == ["no-ping"]
+
+    def test_workers_match_serial(self, tree, temp_dir):
+        """Should produce the same report with a process pool"""
+        for idx in range(8):
+            write(tree / "many" / f"play{idx}.yml", GOOD if idx % 2 else WARN + f"# {idx}\n")
+        serial = validate_tree(str(tree), cache_path=str(temp_dir / "serial.json"))
+        parallel = validate_tree(str(tree), workers=2, cache_path=str(temp_dir / "parallel.json"))
+        assert [r.to_dict() for r in parallel.files] == [r.to_dict() for r in serial.files]
+
+    def test_unreadable_content(self, tree):
+        """Should report files that are not UTF-8 as errors"""
+        (tree / "binary.yml").write_bytes(b"\xff\xfe\x00")
+        report = validate_tree(str(tree))
+        result = next(r for r in report.files if r.path == "binary.yml")
+        assert not result.valid
+        assert result.issues[0].rule == "io"
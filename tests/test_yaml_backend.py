@@ -0,0 +1,145 @@
+"""
+Unit tests for the YAML backend layer
+"""
+
+import pytest
+import yaml
+
+from src import yaml_backend
+from src.playbook_generator import PlaybookGenerator, PlaybookContext
+from src.playbook_model import freeze, thaw
+
+requires_libyaml = pytest.mark.skipif(
+    not yaml_backend.LIBYAML_AVAILABLE, reason="PyYAML built without libyaml"
+)
+
+
+@pytest.fixture
+def generator():
+    return PlaybookGenerator()
+
+
+class TestBackendSelection:
+    """Tests for choosing and falling back between backends"""
+
+    def test_python_backend_always_available(self):
+        """Should always provide the pure-Python backend"""
+        assert yaml_backend.resolve_backend("python").name == "python"
+
+    def test_auto_prefers_libyaml(self):
+        """Should pick libyaml when PyYAML was built with it"""
+        expected = "libyaml" if yaml_backend.LIBYAML_AVAILABLE else "python"
+        assert yaml_backend.resolve_backend("auto").name == expected
+
+    def test_env_var_selects_backend(self, monkeypatch):
+        """Should honour ANSIBLE_MCP_YAML_BACKEND"""
+        monkeypatch.setenv(yaml_backend.BACKEND_ENV_VAR, "python")
+        assert yaml_backend.resolve_backend().name == "python"
+
+    def test_missing_libyaml_falls_back(self, monkeypatch):
+        """Should fall back to Python when libyaml is requested but missing"""
+        monkeypatch.delitem(yaml_backend.BACKENDS, "libyaml", raising=False)
+        assert yaml_backend.resolve_backend("libyaml").name == "python"
+
+    def test_unknown_backend_rejected(self):
+        """Should reject unknown backend names"""
+        with pytest.raises(ValueError):
+            yaml_backend.resolve_backend("ruamel")
+
+    def test_use_backend_switches_active(self):
+        """Should expose the active backend after switching"""
+        previous = yaml_backend.active_backend()
+        try:
+            assert yaml_backend.use_backend("python") == "python"
+            assert yaml_backend.active_backend() == "python"
+        finally:
+            yaml_backend.use_backend(previous)
+
+
+class TestBackendOutput:
+    """Tests for backend output compatibility"""
+
+    def test_dump_matches_yaml_dump(self):
+        """Should emit the same bytes as yaml.dump for plain data"""
+        data = [{"name": "Test", "hosts": "all", "tasks": [{"ping": {}}]}]
+        expected = yaml.dump(data, default_flow_style=False, sort_keys=False)
+        assert yaml_backend.dump(freeze(data)) == expected
+
+    def test_dump_never_emits_aliases(self):
+        """Should inline shared nodes instead of using anchors"""
+        task = freeze({"name": "Task", "ping": {}})
+        output = yaml_backend.dump([{"tasks": (task, task)}])
+        assert "&id" not in output
+        assert "*id" not in output
+
+    @requires_libyaml
+    def test_templates_byte_identical_across_backends(self, generator):
+        """Should produce identical bytes for every built-in template"""
+        python = yaml_backend.resolve_backend("python")
+        libyaml = yaml_backend.resolve_backend("libyaml")
+        requirements = ["high_availability", "security", "monitoring", "backup"]
+
+        for playbook_type, source in generator.templates.items():
+            assert python.load(source) == libyaml.load(source)
+            context = PlaybookContext(
+                prompt="test", playbook_type=playbook_type, requirements=requirements
+            )
+            data = generator._enhance_with_requirements(
+                generator.parsed_templates[playbook_type], context
+            )
+            assert python.dump(data) == libyaml.dump(data)
+            assert python.dump(data) == python.dump(thaw(data))
+
+    @requires_libyaml
+    @pytest.mark.parametrize(
+        "value",
+        ["é ünïcode 🚀", "x" * 200, "a b " * 50, "line1\nline2\n", " lead", "{{ x }}", "yes", ""],
+    )
+    def test_scalars_byte_identical_across_backends(self, value):
+        """Should quote and wrap awkward scalars identically"""
+        data = [{"key": value}]
+        python = yaml_backend.resolve_backend("python")
+        libyaml = yaml_backend.resolve_backend("libyaml")
+        assert python.dump(data) == libyaml.dump(data)
+
+
+class TestDumpStream:
+    """Tests for incremental serialization"""
+
+    @pytest.mark.parametrize("name", sorted(yaml_backend.BACKENDS))
+    def test_stream_matches_dump(self, generator, name):
+        """Should concatenate to exactly what dump() produces"""
+        backend = yaml_backend.resolve_backend(name)
+        for plays in generator.parsed_templates.values():
+            assert "".join(backend.dump_stream(plays)) == backend.dump(plays)
+
+    @pytest.mark.parametrize("name", sorted(yaml_backend.BACKENDS))
+    def test_stream_handles_edge_values(self, name):
+        """Should match dump() for empty containers and odd scalars"""
+        backend = yaml_backend.resolve_backend(name)
+        plays = [
+            {"name": "x", "tasks": [], "vars": {}, "nested": [1, [2, 3], {"a": []}]},
+            {"name": "é\nmulti", "hosts": None, "become": True, "tasks": ({"ping": {}},)},
+        ]
+        assert "".join(backend.dump_stream(plays)) == backend.dump(plays)
+        assert "".join(backend.dump_stream([])) == backend.dump([])
+
+    def test_python_backend_yields_per_task(self, generator):
+        """Should yield a chunk for every task"""
+        backend = yaml_backend.resolve_backend("python")
+        plays = next(iter(generator.parsed_templates.values()))
+        chunks = list(backend.dump_stream(plays))
+        assert len(chunks) >= len(plays[0]["tasks"])
+
+    def test_stream_consumes_lazily(self):
+        """Should not pull the next play before the previous one is emitted"""
+        pulled = []
+
+        def plays():
+            for idx in range(3):
+                pulled.append(idx)
+                yield {"name": f"play {idx}", "hosts": "all", "tasks": [{"ping": {}}]}
+
+        stream = yaml_backend.resolve_backend("python").dump_stream(plays())
+        next(stream)
+        assert pulled == [0]
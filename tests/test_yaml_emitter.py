@@ -0,0 +1,183 @@
+"""
+Unit tests for the specialized playbook YAML emitter
+"""
+
+import itertools
+import random
+
+import pytest
+import yaml
+
+from src import yaml_emitter
+from src.playbook_generator import (
+    ENHANCED_REQUIREMENTS,
+    OutputFormat,
+    PlaybookContext,
+    PlaybookGenerator,
+    PlaybookType,
+)
+from src.playbook_model import thaw
+
+# Fragments chosen to hit every quoting rule: indicators, comments, mapping
+# separators, implicit types, Jinja, YAML line breaks and control characters
+FRAGMENTS = list("ab :#-?{}[]|>'\"%@`!&*,\\\t\n\r.~=<+01") + [
+    "\x85",
+    "\u2028",
+    "\u2029",
+    "\x00",
+    "\ufeff",
+    "\xe9",
+    "\U0001f600",
+    "{{ item }}",
+    "true",
+    "null",
+    "yes",
+    "0755",
+    "1e3",
+    "...",
+    "---",
+    "<<",
+]
+
+
+def random_string(rng):
+    return "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 8)))
+
+
+def random_value(rng, depth=0):
+    roll = rng.random()
+    if depth < 3 and roll < 0.2:
+        return {random_string(rng): random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))}
+    if depth < 3 and roll < 0.4:
+        return [random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    return rng.choice([
+        random_string(rng),
+        random_string(rng),
+        None,
+        True,
+        False,
+        rng.randint(-10**6, 10**6),
+        rng.random() * 10 ** rng.randint(-30, 30),
+    ])
+
+
+class TestRoundTrip:
+    """Output must load back to the data it was emitted from"""
+
+    @pytest.mark.parametrize("seed", range(4))
+    def test_fuzz_round_trip(self, seed):
+        """Should round-trip randomly generated documents"""
+        rng = random.Random(seed)
+        for _ in range(2000):
+            data = random_value(rng)
+            text = yaml_emitter.emit(data)
+            assert yaml.safe_load(text) == data, text
+
+    @pytest.mark.parametrize("value", [
+        "",
+        "{{ ansible_hostname }}",
+        "'{{ x }}'",
+        "key: value",
+        "value # not a comment",
+        "trailing:",
+        " padded ",
+        "0o755",
+        "0755",
+        "1_000",
+        "~",
+        "Yes",
+        "off",
+        "2024-01-01",
+        "...",
+        "line one\nline two",
+        "kept newline\n",
+        "kept newlines\n\n",
+        "\nleading newline",
+        "  indented\nblock",
+        "trailing space \nblock",
+        "tab\tinside",
+        "carriage\r\nreturn",
+        "next\x85line",
+        "separators\u2028\u2029",
+        "bom\ufeff",
+        "nul\x00",
+        "emoji \U0001f600",
+    ])
+    def test_tricky_strings(self, value):
+        """Should quote or block-format strings so they load unchanged"""
+        for data in (value, [value], {"key": value}, {value: 1}, [{"k": [value]}]):
+            assert yaml.safe_load(yaml_emitter.emit(data)) == data
+
+    @pytest.mark.parametrize("value", [0, -7, 1.5, -0.25, 1e20, 1e-05, float("inf"), -float("inf"), True, False, None])
+    def test_scalars(self, value):
+        """Should keep the implicit type of non-string scalars"""
+        assert yaml.safe_load(yaml_emitter.emit({"v": value})) == {"v": value}
+
+    def test_unsupported_type_rejected(self):
+        """Should refuse values outside the playbook subset"""
+        with pytest.raises(TypeError):
+            yaml_emitter.emit({"when": object()})
+
+
+class TestLayout:
+    """Output should look like the block style yaml.dump produces"""
+
+    def test_block_style(self):
+        """Should nest mappings and sequences like yaml.dump"""
+        data = [{"name": "web", "hosts": "all", "vars": {"port": 80, "users": []},
+                 "tasks": [{"name": "Install", "package": {"name": ["nginx"], "state": "present"}}]}]
+        assert yaml_emitter.emit(data) == yaml.safe_dump(
+            data, default_flow_style=False, sort_keys=False
+        )
+
+    def test_jinja_values_quoted(self):
+        """Should quote values that start with a Jinja expression"""
+        assert yaml_emitter.emit({"path": "{{ root }}/bin"}) == "path: '{{ root }}/bin'\n"
+        assert yaml_emitter.emit({"url": "http://{{ host }}"}) == "url: http://{{ host }}\n"
+
+    def test_multiline_literal_block(self):
+        """Should write multi-line strings as literal blocks"""
+        text = yaml_emitter.emit({"shell": "set -e\nmake install\n"})
+        assert text == "shell: |\n  set -e\n  make install\n"
+
+    def test_matches_yaml_dump_except_wrapping(self):
+        """Should match yaml.dump for templates whose lines need no wrapping"""
+        generator = PlaybookGenerator(use_cache=False)
+        for playbook_type in (PlaybookType.KUBERNETES, PlaybookType.SECURITY):
+            data = generator._build_playbook(
+                PlaybookContext(prompt="x", playbook_type=playbook_type)
+            )
+            assert yaml_emitter.emit(data) == yaml.safe_dump(
+                thaw(data), default_flow_style=False, sort_keys=False
+            )
+
+
+class TestGeneratorIntegration:
+    """Tests for the fast-yaml output format"""
+
+    @pytest.fixture
+    def generator(self):
+        return PlaybookGenerator(use_cache=False)
+
+    def test_templates_round_trip(self, generator):
+        """Should describe the same data as the PyYAML output for every combination"""
+        for playbook_type in generator.parsed_templates:
+            for n in range(len(ENHANCED_REQUIREMENTS) + 1):
+                for reqs in itertools.combinations(ENHANCED_REQUIREMENTS, n):
+                    context = PlaybookContext(
+                        prompt="x", playbook_type=playbook_type, requirements=list(reqs)
+                    )
+                    fast = generator.generate(context, OutputFormat.FAST_YAML)
+                    assert yaml.safe_load(fast) == yaml.safe_load(generator.generate(context))
+
+    def test_stream_matches_generate(self, generator):
+        """Should stream the exact fast-yaml text"""
+        context = generator.analyze_prompt("Deploy a secure monitored web app with backups")
+        streamed = "".join(generator.generate_stream(context, "fast-yaml"))
+        assert streamed == generator.generate(context, "fast-yaml")
+
+    def test_site_stream(self, generator):
+        """Should stream a multi-play document"""
+        contexts = [generator.analyze_prompt(p) for p in ("Install docker", "Harden ssh")]
+        text = "".join(generator.generate_site_stream(contexts, "fast-yaml"))
+        assert len(yaml.safe_load(text)) == 2
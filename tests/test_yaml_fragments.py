@@ -0,0 +1,110 @@
+"""
+Unit tests for pre-serialized YAML fragment splicing
+"""
+
+import itertools
+
+import pytest
+
+from src import yaml_backend
+from src.playbook_generator import (
+    ENHANCED_REQUIREMENTS,
+    PlaybookContext,
+    PlaybookGenerator,
+    PlaybookType,
+    SSHD_HANDLER,
+)
+from src.playbook_model import freeze, with_appended
+from src.yaml_fragments import Fragment, SplicedPlay, splice_template
+
+PLAY = freeze({
+    "name": "Web servers",
+    "hosts": "{{ target_hosts | default('web') }}",
+    "vars": {"port": 80, "packages": []},
+    "tasks": [{"name": "Install nginx", "package": {"name": "nginx"}}],
+    "handlers": [],
+})
+
+TASK = {"name": "Open port", "firewalld": {"port": "80/tcp"}}
+TASKS = Fragment.build("tasks", [TASK])
+HANDLER = Fragment.build("handlers", [SSHD_HANDLER], unique=True)
+
+
+class TestSplicedPlay:
+    """Splicing must reproduce yaml_backend.dump byte for byte"""
+
+    def test_unchanged_play(self):
+        """Should reproduce the play without fragments"""
+        assert SplicedPlay(PLAY).render([]) == yaml_backend.dump([PLAY])
+
+    def test_append_to_list_keys(self):
+        """Should append after existing items and fill empty lists"""
+        expected = with_appended(PLAY, "tasks", [TASK])
+        expected = with_appended(expected, "handlers", [SSHD_HANDLER])
+        rendered = SplicedPlay(PLAY).render([TASKS, HANDLER])
+        assert rendered == yaml_backend.dump([expected])
+
+    def test_missing_key_added_at_end(self):
+        """Should add a missing list key after the existing keys"""
+        play = freeze({"name": "x", "hosts": "all", "tasks": []})
+        rendered = SplicedPlay(play).render([HANDLER, TASKS])
+        expected = with_appended(play, "handlers", [SSHD_HANDLER])
+        expected = with_appended(expected, "tasks", [TASK])
+        assert rendered == yaml_backend.dump([expected])
+
+    def test_unique_fragment_deduplicated(self):
+        """Should skip a handler already in the template or already spliced"""
+        play = with_appended(PLAY, "handlers", [SSHD_HANDLER])
+        spliced = SplicedPlay(play)
+        assert spliced.render([HANDLER, HANDLER]) == yaml_backend.dump([play])
+        once = SplicedPlay(PLAY).render([HANDLER, HANDLER])
+        assert once.count("restart sshd") == 1
+
+    def test_repeated_fragment_appended_twice(self):
+        """Should append non-unique fragments every time"""
+        assert SplicedPlay(PLAY).render([TASKS, TASKS]).count("Open port") == 2
+
+    def test_multi_play_not_spliced(self):
+        """Should only splice single-play playbooks"""
+        assert splice_template((PLAY, PLAY)) is None
+        assert splice_template((PLAY,)) is not None
+
+
+class TestGeneratorSplicing:
+    """Tests for the generator's text fast path"""
+
+    @pytest.fixture
+    def generator(self):
+        return PlaybookGenerator(use_cache=False)
+
+    def test_every_combination_matches_dump(self, generator):
+        """Should match the full pipeline for all requirement orders and repeats"""
+        requirements = ENHANCED_REQUIREMENTS + ("security", "performance")
+        for playbook_type in generator.parsed_templates:
+            for n in range(4):
+                for reqs in itertools.permutations(requirements, n):
+                    context = PlaybookContext(
+                        prompt="x", playbook_type=playbook_type, requirements=list(reqs)
+                    )
+                    assert generator._splice(context) == yaml_backend.dump(
+                        generator._build_playbook(context)
+                    )
+
+    def test_generic_playbooks_not_spliced(self, generator):
+        """Should leave untemplated contexts to the full pipeline"""
+        context = PlaybookContext(prompt="x", playbook_type=PlaybookType.NETWORK)
+        assert generator._splice(context) is None
+
+    def test_custom_tasks_disable_splicing(self, generator, monkeypatch):
+        """Should fall back when the custom-task stage changes the playbook"""
+        extra = {"name": "Custom step", "debug": {"msg": "hi"}}
+
+        def add_custom(playbook_data, context):
+            return (with_appended(playbook_data[0], "tasks", [extra]),)
+
+        monkeypatch.setattr(generator, "_add_custom_tasks", add_custom)
+        context = PlaybookContext(
+            prompt="x", playbook_type=PlaybookType.DOCKER, requirements=["security"]
+        )
+        assert generator._splice(context) is None
+        assert "Custom step" in generator.generate(context)